@@ -0,0 +1,102 @@
+"""Cold start of a uvicorn worker, from process launch to the first served recommendation.
+
+Usage (from the backend directory):
+    python -m benchmarks.cold_start [--size 10000] [--runs 3] [--port 8765] [--snapshot]
+
+Writes a seeded synthetic corpus to a temporary directory, then launches
+`uvicorn recommendation_backend:app` with FAKE_FIRESTORE_DATA pointing at it
+and polls the worker. Reports, per run, the seconds from launch until
+/health/live answers (the app accepts connections), /health/ready returns 200
+(warm-up finished) and the first /recommend succeeds, plus the worker's own
+account of its warm-up phases from /health.
+
+Snapshots are off unless --snapshot is given; then every run shares one
+snapshot file, the first run writes it and later runs start from it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional
+
+from benchmarks.synthetic import generate_corpus, write_corpus
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def request(url: str, body: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """HTTP status of a GET (or a JSON POST), or None if the worker is not accepting connections"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def wait_for(check, started: float, timeout: float) -> float:
+    """Seconds since `started` at which check() first returned true"""
+    while time.perf_counter() - started < timeout:
+        if check():
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    raise TimeoutError(f"worker not ready after {timeout}s")
+
+
+def measure_run(data_dir: str, port: int, timeout: float, snapshot_path: str = '') -> Dict[str, Any]:
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, FAKE_FIRESTORE_DATA=data_dir, LOG_LEVEL='WARNING', CORPUS_SNAPSHOT_PATH=snapshot_path)
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'recommendation_backend:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        result = {
+            'live_s': wait_for(lambda: request(f"{base_url}/health/live") == 200, started, timeout),
+            'ready_s': wait_for(lambda: request(f"{base_url}/health/ready") == 200, started, timeout),
+            'first_recommend_s': wait_for(
+                lambda: request(f"{base_url}/recommend", {'query': 'python machine learning', 'use_cache': False}) == 200,
+                started, timeout)
+        }
+        with urllib.request.urlopen(f"{base_url}/health", timeout=5) as response:
+            result['worker'] = json.load(response)['startup']
+        if snapshot_path:
+            # Let the worker finish writing its snapshot before it is stopped
+            wait_for(lambda: os.path.exists(snapshot_path), started, timeout)
+        return result
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='total synthetic documents')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--timeout', type=float, default=300.0, help='seconds to wait for each milestone')
+    parser.add_argument('--snapshot', action='store_true', help='start later runs from the snapshot the first run writes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_corpus(generate_corpus(args.size, args.seed), data_dir)
+        snapshot_path = os.path.join(data_dir, 'corpus.snapshot') if args.snapshot else ''
+        for run in range(1, args.runs + 1):
+            result = measure_run(data_dir, args.port, args.timeout, snapshot_path)
+            phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in result['worker']['phase_seconds'].items())
+            print(f"run {run}: live {result['live_s']:.2f}s  ready {result['ready_s']:.2f}s  "
+                  f"first /recommend {result['first_recommend_s']:.2f}s  (worker: {phases})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Latency of a concurrent /recommend and /health mix served by one event loop.
+
+Usage (from the backend directory):
+    python -m benchmarks.concurrency [--scale 100] [--rate 30] [--duration 10] [--threads 4]
+
+Replays the same open-loop request schedule (Poisson arrivals, 75% /recommend,
+25% /health) twice against the fake Firestore client: once with scoring inline
+on the event loop (SCORING_THREADS=0, the old behaviour) and once with the
+scoring thread pool. Latency is measured from each request's scheduled arrival,
+so time spent waiting for a blocked event loop is included.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from corpus_store import COLLECTION_ITEM_TYPES
+from fake_firestore import FakeFirestoreClient
+
+SEED_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts', 'generated-data')
+
+QUERIES = [
+    'react', 'python data science', 'ml', 'fintech bangalore', 'iit professor robotics',
+    'web development', 'cybersecurity', 'ai', 'blockchain mumbai', 'senior developer google'
+]
+
+
+def scaled_seed_data(scale: int) -> Dict[str, List[dict]]:
+    """The seed documents repeated `scale` times with distinct ids"""
+    data = {}
+    for collection_name in COLLECTION_ITEM_TYPES:
+        with open(os.path.join(SEED_DATA_DIR, f'{collection_name}.json')) as f:
+            docs = json.load(f)
+        data[collection_name] = [dict(doc, id=f"{doc['id']}_{copy:05d}") for copy in range(scale) for doc in docs]
+    return data
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def request_schedule(rate: float, duration: float, seed: int) -> List[tuple]:
+    """(arrival offset in seconds, endpoint, query) triples for the open-loop mix"""
+    rng = random.Random(seed)
+    schedule = []
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        endpoint = 'recommend' if rng.random() < 0.75 else 'health'
+        schedule.append((offset, endpoint, rng.choice(QUERIES)))
+        offset += rng.expovariate(rate)
+    return schedule
+
+
+async def run_mix(backend, schedule: List[tuple]) -> Dict[str, List[float]]:
+    """Dispatch the schedule and collect latencies in milliseconds from scheduled arrival"""
+    latencies: Dict[str, List[float]] = {'recommend': [], 'health': []}
+
+    async def request(arrival: float, endpoint: str, query: str) -> None:
+        if endpoint == 'recommend':
+            await backend.recommend_profiles(backend.SearchInput(query=query, top_n=5))
+        else:
+            await backend.health_check()
+        latencies[endpoint].append((time.perf_counter() - arrival) * 1000)
+
+    started = time.perf_counter()
+    tasks = []
+    for offset, endpoint, query in schedule:
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(request(started + offset, endpoint, query)))
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def main_async(args) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        import recommendation_backend as backend
+        # Measure loading from Firestore, not from a snapshot left by an earlier run
+        backend.CORPUS_SNAPSHOT_PATH = ''
+        backend.db = FakeFirestoreClient(scaled_seed_data(args.scale))
+        await backend.start_corpus()
+
+    schedule = request_schedule(args.rate, args.duration, args.seed)
+    report = {'scale': args.scale, 'rate': args.rate, 'requests': len(schedule), 'modes': {}}
+    modes = [('inline', None), (f'threads={args.threads}', ThreadPoolExecutor(max_workers=args.threads))]
+    for mode, executor in modes:
+        backend.scoring_executor = executor
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies = await run_mix(backend, schedule)
+        elapsed = time.perf_counter() - started
+        total = sum(len(samples) for samples in latencies.values())
+        report['modes'][mode] = {
+            'throughput_rps': total / elapsed,
+            **{endpoint: {f'p{pct}_ms': percentile(samples, pct) for pct in (50, 95, 99)}
+               for endpoint, samples in latencies.items()}
+        }
+        if executor is not None:
+            executor.shutdown()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=100, help='copies of the seed corpus')
+    parser.add_argument('--rate', type=float, default=30.0, help='mean arrivals per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of arrivals')
+    parser.add_argument('--threads', type=int, default=4, help='scoring threads for the pooled run')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    for mode, stats in report['modes'].items():
+        print(f"{mode:>12}: {stats['throughput_rps']:.1f} req/s")
+        for endpoint in ('recommend', 'health'):
+            print(f"{'':>14}{endpoint:<10} p50 {stats[endpoint]['p50_ms']:8.2f} ms  "
+                  f"p95 {stats[endpoint]['p95_ms']:8.2f} ms  p99 {stats[endpoint]['p99_ms']:8.2f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Scaling of sharded scoring with the number of scoring processes.
+
+Usage (from the backend directory):
+    python -m benchmarks.sharded_scoring [--size 100000] [--processes 1 2 4 8] [--queries 200]
+                                         [--collection projects] [--top-n 5]
+
+Builds a seeded synthetic corpus in process, then for each process count
+starts a ShardedScorer with that many shard processes and replays the query
+log against one collection, one query at a time. Reports the mean and p95
+latency per query, queries per second and the speedup over scoring the whole
+collection in this process (the python engine's path below
+PARALLEL_SCORING_MIN_DOCUMENTS), and checks every sharded ranking against it.
+
+The curve flattens at the number of cores: beyond it the shards only take
+turns. Each shard process holds its share of the corpus and its own index,
+so memory grows by about one corpus copy whatever the process count.
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.synthetic import generate_corpus, generate_query_log
+from corpus_store import CorpusStore
+from fake_firestore import FakeFirestoreClient
+from query_parser import QUERY_CATEGORIES, QueryParser
+from search_index import CorpusIndex
+from sharded_scoring import ShardedScorer, rank_shard
+
+parse_search_query = QueryParser(QUERY_CATEGORIES).parse
+
+Query = Tuple[Dict[str, List[str]], int]
+
+
+def replay(rank, queries: List[Query]) -> Tuple[List[float], List[list]]:
+    """Per-query latencies and rankings of `rank(query)` over the query log"""
+    latencies = []
+    rankings = []
+    for query in queries:
+        started = time.perf_counter()
+        rankings.append(rank(query))
+        latencies.append(time.perf_counter() - started)
+    return latencies, rankings
+
+
+def report(label: str, latencies: List[float], baseline: float) -> None:
+    mean = statistics.mean(latencies)
+    p95 = sorted(latencies)[int(len(latencies) * 0.95)]
+    print(f"{label:>16}: mean {mean * 1000:8.2f} ms  p95 {p95 * 1000:8.2f} ms  "
+          f"{1 / mean:8.1f} q/s  speedup {baseline / mean:5.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000, help='total synthetic documents')
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1, 2 * (os.cpu_count() or 1)}))
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--collection', default='projects')
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    corpus = CorpusStore()
+    corpus_index = CorpusIndex(corpus)
+    corpus.load(FakeFirestoreClient(generate_corpus(args.size, args.seed)))
+    print(f"{corpus.count(args.collection)} {args.collection} documents indexed in "
+          f"{time.perf_counter() - started:.1f}s; {os.cpu_count()} cores")
+    queries = [(parse_search_query(query), args.top_n) for query in generate_query_log(args.queries, args.seed)]
+
+    index = corpus_index.indexes[args.collection]
+    latencies, expected = replay(lambda query: rank_shard(index, [query])[0][0], queries)
+    baseline = statistics.mean(latencies)
+    report('in process', latencies, baseline)
+
+    for processes in args.processes:
+        scorer = ShardedScorer(corpus, processes)
+        started = time.perf_counter()
+        scorer.start()
+        scorer.rank(args.collection, queries[:1])  # Wait for the shards to index their documents
+        startup = time.perf_counter() - started
+        try:
+            latencies, rankings = replay(lambda query: scorer.rank(args.collection, [query])[0][0], queries)
+        finally:
+            scorer.stop()
+        mismatches = sum(1 for ranking, reference in zip(rankings, expected) if ranking != reference)
+        report(f"{processes} processes", latencies, baseline)
+        print(f"{'':>16}  started in {startup:.1f}s, {mismatches} rankings differ from in process")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Latency, throughput and memory of the recommendation pipeline on a synthetic corpus.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite [--size 10000] [--queries 2000] [--concurrency 8] [--seed 7]
+                               [--output results.json] [--compare baseline.json]
+
+Generates a seeded corpus and query log (benchmarks.synthetic), injects it as
+an in-memory Firestore in place of recommendation_backend.db, and measures
+parse_search_query, calculate_similarity_score and /recommend (uncached, then
+replaying the query log with the result cache on). Each benchmark reports
+p50/p95/p99 latency, throughput and the process peak RSS so far. Write the
+report with --output and compare two commits with --compare.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.concurrency import percentile
+from benchmarks.synthetic import generate_corpus, generate_query_log
+from corpus_store import COLLECTION_ITEM_TYPES
+from fake_firestore import FakeFirestoreClient
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(latencies_ms: List[float], elapsed: float) -> Dict[str, Any]:
+    return {
+        'count': len(latencies_ms),
+        'p50_ms': percentile(latencies_ms, 50),
+        'p95_ms': percentile(latencies_ms, 95),
+        'p99_ms': percentile(latencies_ms, 99),
+        'mean_ms': sum(latencies_ms) / len(latencies_ms) if latencies_ms else 0.0,
+        'throughput_per_s': len(latencies_ms) / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def time_calls(func, arguments: List[tuple]) -> Dict[str, Any]:
+    """Call func once per argument tuple, timing each call"""
+    latencies = []
+    started = time.perf_counter()
+    for args in arguments:
+        call_started = time.perf_counter()
+        func(*args)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def time_requests(backend, queries: List[str], concurrency: int, use_cache: bool) -> Dict[str, Any]:
+    """Closed-loop /recommend calls from `concurrency` clients working through the query log"""
+    latencies = []
+    pending = iter(queries)
+
+    async def client() -> None:
+        for query in pending:
+            call_started = time.perf_counter()
+            await backend.recommend_profiles(backend.SearchInput(query=query, top_n=5, use_cache=use_cache))
+            latencies.append((time.perf_counter() - call_started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_suite(args) -> Dict[str, Any]:
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'size': args.size,
+            'queries': args.queries,
+            'concurrency': args.concurrency,
+            'seed': args.seed
+        },
+        'corpus': {},
+        'benchmarks': {}
+    }
+
+    started = time.perf_counter()
+    corpus = generate_corpus(args.size, args.seed)
+    queries = generate_query_log(args.queries, args.seed)
+    report['corpus']['generate_s'] = time.perf_counter() - started
+    report['corpus']['documents'] = {name: len(docs) for name, docs in corpus.items()}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import recommendation_backend as backend
+        # Measure loading from Firestore, not from a snapshot left by an earlier run
+        backend.CORPUS_SNAPSHOT_PATH = ''
+        backend.db = FakeFirestoreClient(corpus)
+        started = time.perf_counter()
+        await backend.start_corpus()
+    report['meta']['engine'] = backend.RECOMMENDATION_ENGINE
+    report['corpus']['load_s'] = time.perf_counter() - started
+    report['corpus']['peak_rss_mb'] = peak_rss_mb()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.query_parser.clear()
+        report['benchmarks']['parse_search_query'] = time_calls(backend.parse_search_query, [(q,) for q in queries])
+
+        rng = random.Random(args.seed)
+        collections = list(COLLECTION_ITEM_TYPES.items())
+        pairs = []
+        for query in queries:
+            collection_name, item_type = rng.choice(collections)
+            pairs.append((backend.parse_search_query(query), rng.choice(corpus[collection_name]), item_type))
+        report['benchmarks']['calculate_similarity_score'] = time_calls(backend.calculate_similarity_score, pairs)
+
+        report['benchmarks']['recommend_uncached'] = await time_requests(
+            backend, queries[:args.uncached_requests], args.concurrency, use_cache=False)
+        backend.result_cache.clear()
+        report['benchmarks']['recommend_query_log'] = await time_requests(
+            backend, queries, args.concurrency, use_cache=True)
+    return report
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    corpus = report['corpus']
+    documents = ", ".join(f"{name}={count}" for name, count in corpus['documents'].items())
+    print(f"corpus: {documents}; generated in {corpus['generate_s']:.2f} s, loaded in {corpus['load_s']:.2f} s")
+    for name, stats in report['benchmarks'].items():
+        line = (f"{name:<28} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput_per_s']:10.1f}/s")
+        if stats['peak_rss_mb'] is not None:
+            line += f"  rss {stats['peak_rss_mb']:7.1f} MB"
+        previous = (baseline or {}).get('benchmarks', {}).get(name)
+        if previous and previous['p50_ms'] and previous['p99_ms']:
+            line += (f"  | vs {baseline['meta'].get('commit') or 'baseline'}: p50 x{stats['p50_ms'] / previous['p50_ms']:.2f}"
+                     f" p99 x{stats['p99_ms'] / previous['p99_ms']:.2f}")
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='total synthetic documents (1k-1M)')
+    parser.add_argument('--queries', type=int, default=2000, help='entries in the replayed query log')
+    parser.add_argument('--uncached-requests', type=int, default=500, help='/recommend calls with the cache bypassed')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent /recommend clients')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    report = asyncio.run(run_suite(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Seeded synthetic corpus and query log generator.
+
+Usage (from the backend directory):
+    python -m benchmarks.synthetic --size 10000 [--queries 5000] [--seed 7] --output-dir /tmp/corpus
+
+Documents follow the shapes produced by scripts/generateAndUploadData.js for
+the projects, startups, mentors and faculty collections, split in the same
+proportions as scripts/generated-data. The same seed always produces the same
+corpus and query log. The output directory can be served with
+FAKE_FIRESTORE_DATA, and queries.txt can be replayed with
+parity_check.py --query-log.
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List
+
+# Share of each collection in scripts/generated-data (42/15/25/20 documents)
+COLLECTION_SHARES = {'projects': 42, 'startups': 15, 'mentors': 25, 'faculty': 20}
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ishaan', 'Arjun', 'Ananya', 'Diya', 'Saanvi', 'Meera', 'Kavya',
+               'Rohan', 'Priya', 'Neha', 'Rahul', 'Sneha', 'Vikram', 'Pooja', 'Karan', 'Aisha', 'Nikhil',
+               'Elvira', 'Lynn', 'Marcus', 'Olivia', 'Ethan', 'Sofia', 'Liam', 'Maya', 'Noah', 'Zara']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Patel', 'Mehta', 'Rao', 'Das',
+              'Shandilya', 'Roy', 'Bose', 'Kulkarni', 'Menon', 'Singh', 'Bruen', 'Okuneva', 'Hilll', 'Gutkowski']
+CITIES = ['Bangalore', 'Mumbai', 'Delhi', 'Hyderabad', 'Chennai', 'Pune', 'Ahmedabad', 'Jaipur', 'Kolkata', 'Lucknow']
+INSTITUTES = ['IIT Delhi', 'IIT Bombay', 'IIT Madras', 'IIT Kanpur', 'IIT Kharagpur', 'IIT Roorkee', 'IIT Guwahati',
+              'IIT Hyderabad', 'IIITDM Kancheepuram', 'NIT Trichy', 'BITS Pilani']
+DEPARTMENTS = ['Computer Science', 'Electrical Engineering', 'Mechanical Engineering', 'Civil Engineering',
+               'Chemical Engineering', 'Biotechnology', 'Mathematics', 'Physics']
+RESEARCH_AREAS = ['Artificial Intelligence', 'Machine Learning', 'Data Science', 'Robotics', 'IoT', 'Cybersecurity',
+                  'Blockchain', 'Quantum Computing', 'Biomedical Engineering', 'Renewable Energy', 'Nanotechnology',
+                  'Computer Vision', 'AI/ML']
+FACULTY_DESIGNATIONS = ['Assistant Professor', 'Associate Professor', 'Professor', 'Head of Department']
+EXPERTISE = ['Full Stack Development', 'Mobile Development', 'AI/ML', 'Data Science', 'DevOps', 'UI/UX',
+             'Product Management', 'Startup Strategy', 'Investment', 'Marketing', 'Sales', 'Operations']
+COMPANIES = ['Google', 'Microsoft', 'Amazon', 'Meta', 'Apple', 'Netflix', 'Uber', 'Airbnb', 'Stripe', 'Shopify',
+             'Notion', 'Figma', 'IIITDM Kancheepuram']
+TITLE_LEVELS = ['Senior', 'Lead', 'Principal', 'Central', 'Regional', 'Chief', 'Dynamic', 'Internal', 'Product']
+TITLE_AREAS = ['Solutions', 'Security', 'Data', 'Web', 'Branding', 'Operations', 'Configuration', 'Accounts']
+TITLE_ROLES = ['Engineer', 'Developer', 'Designer', 'Strategist', 'Architect', 'Manager', 'Consultant', 'Mentor']
+PROJECT_DOMAINS = ['AI/ML', 'Healthcare', 'Fintech', 'Edtech', 'Environment', 'E-commerce', 'Robotics', 'IoT',
+                   'Cybersecurity', 'Blockchain', 'Data Science', 'Mobile Development']
+STARTUP_DOMAINS = ['Healthcare', 'Fintech', 'Edtech', 'Environment', 'AI/ML', 'E-commerce', 'Logistics',
+                   'Real Estate', 'Entertainment', 'Food Tech']
+PROJECT_SKILLS = ['React', 'Node.js', 'Python', 'Machine Learning', 'C++', 'Java', 'UI/UX', 'DevOps', 'Blockchain',
+                  'IoT', 'Robotics', 'Data Science', 'Android', 'iOS', 'Flutter', 'TensorFlow', 'PyTorch', 'Docker',
+                  'AWS', 'MongoDB']
+PROJECT_TITLES = ['Smart {domain} Platform', 'Advanced {domain} System', 'Intelligent {domain} Solution',
+                  'Modern {domain} Application', 'Innovative {domain} Platform', 'Next-Gen {domain} System',
+                  'AI-Powered {domain} Tool', 'Cloud-Based {domain} Solution']
+PROJECT_DESCRIPTIONS = [
+    "A comprehensive {domain} project that leverages {skills} to solve real-world problems. Perfect for students interested in {domain}.",
+    "Innovative {domain} solution using cutting-edge {skills}. This project offers hands-on experience in {domain} development.",
+    "Advanced {domain} application built with {skills}. Ideal for students looking to gain expertise in {domain} technologies.",
+    "Modern {domain} platform developed using {skills}. Provides practical experience in {domain} implementation.",
+    "Robust {domain} system utilizing {skills}. Great opportunity to work on meaningful {domain} projects."
+]
+STARTUP_DESCRIPTIONS = [
+    "Revolutionary {domain} platform that transforms how people interact with technology.",
+    "Innovative {domain} solution designed to address modern challenges in the industry.",
+    "Cutting-edge {domain} company focused on creating sustainable and scalable solutions.",
+    "Leading {domain} startup that leverages technology to solve real-world problems.",
+    "Pioneering {domain} platform that empowers users with advanced capabilities."
+]
+MISSION_ADJECTIVES = ['Self-enabling', 'Upgradable', 'Expanded', 'Fully-configurable', 'Synergized', 'Robust', 'Scalable']
+MISSION_NOUNS = ['focus group', 'workforce', 'hardware', 'migration', 'product', 'platform', 'ecosystem']
+MENTOR_BIOS = [
+    "Senior {designation} at {currentCompany} with {experience} years of experience in {expertise}. Passionate about mentoring and helping others grow.",
+    "Experienced professional working as {designation} at {currentCompany}. Expert in {expertise} with {experience} years in the industry.",
+    "Tech leader and {designation} at {currentCompany}. Specialized in {expertise} with {experience} years of hands-on experience."
+]
+FACULTY_BIOS = [
+    "{designation} at {institute} with {experience} years of experience in {researchAreas}. Published {publications} research papers.",
+    "Experienced {designation} specializing in {researchAreas}. Currently working at {institute} with {experience} years of academic experience.",
+    "Distinguished {designation} with {experience} years at {institute}. Research focus on {researchAreas}."
+]
+
+
+def collection_sizes(size: int) -> Dict[str, int]:
+    """Split a total document count across the collections in seed-data proportions"""
+    total_share = sum(COLLECTION_SHARES.values())
+    sizes = {name: max(1, size * share // total_share) for name, share in COLLECTION_SHARES.items()}
+    sizes['projects'] += max(0, size - sum(sizes.values()))
+    return sizes
+
+
+def timestamp(rng: random.Random) -> Dict[str, int]:
+    """A Firestore timestamp as exported to JSON"""
+    return {'_seconds': rng.randint(1700000000, 1760000000), '_nanoseconds': rng.randrange(0, 10 ** 9, 10 ** 6)}
+
+
+def person_name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def generate_projects(rng: random.Random, count: int) -> List[dict]:
+    docs = []
+    for index in range(count):
+        domain = rng.choice(PROJECT_DOMAINS)
+        skills = rng.sample(PROJECT_SKILLS, rng.randint(2, 5))
+        created = timestamp(rng)
+        # Like the JS generator's String.replace, only the first {domain} of a description is filled in
+        docs.append({
+            'id': f"project_{index + 1:06d}",
+            'title': rng.choice(PROJECT_TITLES).replace('{domain}', domain),
+            'type': rng.choice(['Student', 'Startup', 'Research']),
+            'domain': domain,
+            'skillsRequired': skills,
+            'status': rng.choice(['Open', 'In Progress', 'Completed', 'On Hold']),
+            'description': rng.choice(PROJECT_DESCRIPTIONS).replace('{domain}', domain, 1).replace('{skills}', ', '.join(skills)),
+            'duration': rng.choice(['1 Month', '2 Months', '3 Months', '6 Months']),
+            'teamSize': rng.randint(2, 8),
+            'difficulty': rng.choice(['Beginner', 'Intermediate', 'Advanced']),
+            'createdAt': created,
+            'updatedAt': created
+        })
+    return docs
+
+
+def generate_startups(rng: random.Random, count: int) -> List[dict]:
+    docs = []
+    for index in range(count):
+        domain = rng.choice(STARTUP_DOMAINS)
+        created = timestamp(rng)
+        founder = person_name(rng)
+        docs.append({
+            'id': f"startup_{index + 1:06d}",
+            'name': f"{rng.choice(LAST_NAMES)}, {rng.choice(LAST_NAMES)} and {rng.choice(LAST_NAMES)}",
+            'domain': domain,
+            'founder': founder,
+            'email': f"{founder.replace(' ', '_')}{rng.randint(1, 99)}@gmail.com",
+            'location': rng.choice(CITIES),
+            'description': rng.choice(STARTUP_DESCRIPTIONS).replace('{domain}', domain),
+            'teamSize': rng.randint(5, 50),
+            'website': f"https://{rng.choice(LAST_NAMES).lower()}-{rng.randint(1, 999)}.org/",
+            'foundedYear': rng.randint(2018, 2024),
+            'funding': rng.choice(['Bootstrapped', 'Seed', 'Series A', 'Series B']),
+            'logo': f"https://loremflickr.com/640/480?lock={rng.getrandbits(48)}",
+            'mission': f"{rng.choice(MISSION_ADJECTIVES)} {rng.choice(MISSION_NOUNS)}",
+            'createdAt': created,
+            'updatedAt': created
+        })
+    return docs
+
+
+def generate_mentors(rng: random.Random, count: int) -> List[dict]:
+    docs = []
+    for index in range(count):
+        name = person_name(rng)
+        company = rng.choice(COMPANIES)
+        designation = f"{rng.choice(TITLE_LEVELS)} {rng.choice(TITLE_AREAS)} {rng.choice(TITLE_ROLES)}"
+        experience = rng.randint(3, 20)
+        expertise = rng.sample(EXPERTISE, rng.randint(2, 4))
+        created = timestamp(rng)
+        handle = name.lower().replace(' ', '')
+        docs.append({
+            'id': f"mentor_{index + 1:06d}",
+            'name': name,
+            'email': f"{handle}{rng.randint(1, 99)}@gmail.com",
+            'expertise': expertise,
+            'experience': experience,
+            'bio': rng.choice(MENTOR_BIOS).format(designation=designation, currentCompany=company,
+                                                  experience=experience, expertise=', '.join(expertise)),
+            'currentCompany': company,
+            'designation': designation,
+            'hourlyRate': rng.randint(1000, 5000),
+            'rating': round(rng.uniform(3.5, 5.0), 1),
+            'totalSessions': rng.randint(10, 100),
+            'profilePic': f"https://avatars.githubusercontent.com/u/{rng.randint(10 ** 6, 10 ** 8)}",
+            'linkedin': f"https://linkedin.com/in/{handle}",
+            'github': f"https://github.com/{handle}",
+            'availability': rng.choice(['Available', 'Limited', 'Not Available']),
+            'createdAt': created,
+            'updatedAt': created
+        })
+    return docs
+
+
+def generate_faculty(rng: random.Random, count: int) -> List[dict]:
+    docs = []
+    for index in range(count):
+        name = person_name(rng)
+        institute = rng.choice(INSTITUTES)
+        designation = rng.choice(FACULTY_DESIGNATIONS)
+        experience = rng.randint(5, 25)
+        publications = rng.randint(10, 100)
+        areas = rng.sample(RESEARCH_AREAS, rng.randint(1, 3))
+        created = timestamp(rng)
+        docs.append({
+            'id': f"faculty_{index + 1:06d}",
+            'name': name,
+            'email': f"{name.lower().replace(' ', '.')}@{institute.split()[-1].lower()}.ac.in",
+            'institute': institute,
+            'department': rng.choice(DEPARTMENTS),
+            'researchAreas': areas,
+            'bio': rng.choice(FACULTY_BIOS).format(designation=designation, institute=institute, experience=experience,
+                                                   researchAreas=', '.join(areas), publications=publications),
+            'designation': designation,
+            'experience': experience,
+            'publications': publications,
+            'profilePic': f"https://avatars.githubusercontent.com/u/{rng.randint(10 ** 6, 10 ** 8)}",
+            'website': f"https://faculty.{institute.split()[-1].lower()}.ac.in/{name.split()[0].lower()}",
+            'createdAt': created,
+            'updatedAt': created
+        })
+    return docs
+
+
+GENERATORS = {
+    'projects': generate_projects,
+    'startups': generate_startups,
+    'mentors': generate_mentors,
+    'faculty': generate_faculty
+}
+
+
+def generate_corpus(size: int, seed: int = 7) -> Dict[str, List[dict]]:
+    """About `size` documents across the four recommendation collections"""
+    rng = random.Random(seed)
+    return {name: GENERATORS[name](rng, count) for name, count in collection_sizes(size).items()}
+
+
+def generate_query_log(count: int, seed: int = 7, distinct: int = 500) -> List[str]:
+    """Search box queries with a Zipf-like popularity skew over `distinct` phrases.
+
+    About a fifth of the entries are typing prefixes of a popular phrase, the
+    way the debounced search-as-you-type box sends them.
+    """
+    rng = random.Random(seed)
+    topics = PROJECT_SKILLS + PROJECT_DOMAINS + STARTUP_DOMAINS + EXPERTISE + RESEARCH_AREAS
+    qualifiers = CITIES + COMPANIES + INSTITUTES + ['senior', 'professor', 'mentor', 'research', 'startup', 'remote']
+    phrases = []
+    seen = set()
+    while len(phrases) < distinct:
+        words = [rng.choice(topics)]
+        if rng.random() < 0.5:
+            words.append(rng.choice(qualifiers))
+        if rng.random() < 0.2:
+            words.append(rng.choice(topics))
+        phrase = rng.choice([' ', ', ', ' ']).join(words).lower() if rng.random() < 0.8 else ' '.join(words)
+        if phrase not in seen:
+            seen.add(phrase)
+            phrases.append(phrase)
+    weights = [1.0 / rank for rank in range(1, len(phrases) + 1)]
+
+    queries = []
+    for phrase in rng.choices(phrases, weights=weights, k=count):
+        if rng.random() < 0.2 and len(phrase) > 4:
+            phrase = phrase[:rng.randint(3, len(phrase) - 1)]
+        queries.append(phrase)
+    return queries
+
+
+def write_corpus(corpus: Dict[str, List[dict]], output_dir: str) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    for name, docs in corpus.items():
+        with open(os.path.join(output_dir, f'{name}.json'), 'w') as f:
+            json.dump(docs, f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='total documents across the four collections')
+    parser.add_argument('--queries', type=int, default=5000, help='entries in the query log')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output-dir', required=True)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.size, args.seed)
+    write_corpus(corpus, args.output_dir)
+    with open(os.path.join(args.output_dir, 'queries.txt'), 'w') as f:
+        f.writelines(query + '\n' for query in generate_query_log(args.queries, args.seed))
+    counts = ", ".join(f"{name}={len(docs)}" for name, docs in corpus.items())
+    print(f"✅ Wrote {counts} and {args.queries} queries to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
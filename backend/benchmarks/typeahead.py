@@ -0,0 +1,66 @@
+"""Latency of /suggest completions as a user types, and of keeping them current.
+
+Usage (from the backend directory):
+    python -m benchmarks.typeahead [--size 100000] [--queries 500] [--limit 5]
+
+Builds a seeded synthetic corpus in process, then types every word of the
+query log one character at a time and looks up the completions of each
+prefix, the way a debounced search box would. Reports the build time, the
+mean, p50 and p99 lookup latency, and the cost of a document edit followed by
+a lookup that refills the caches the edit cleared.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.synthetic import generate_corpus, generate_query_log
+from corpus_store import CHANGE_MODIFIED, CorpusStore
+from fake_firestore import FakeFirestoreClient
+from typeahead import SuggestIndex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000, help='total synthetic documents')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--edits', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    corpus = CorpusStore()
+    corpus.load(FakeFirestoreClient(generate_corpus(args.size, args.seed)))
+    suggestions = SuggestIndex(corpus)
+    started = time.perf_counter()
+    suggestions.rebuild()
+    print(f"{len(suggestions)} distinct values from {args.size} documents indexed in {time.perf_counter() - started:.2f}s")
+
+    prefixes = [word[:end] for query in generate_query_log(args.queries, args.seed)
+                for word in query.split() for end in range(1, len(word) + 1)]
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        suggestions.suggest(prefix, args.limit)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"{len(prefixes)} lookups: mean {statistics.mean(latencies) * 1e6:.1f} us  "
+          f"p50 {latencies[len(latencies) // 2] * 1e6:.1f} us  p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us")
+
+    rng = random.Random(args.seed)
+    documents = corpus.documents('mentors')
+    values = ['Quantum Computing', 'Robotics', 'Leadership', 'Data Science']
+    latencies = []
+    for doc_id, data in rng.sample(documents, min(len(documents), args.edits)):
+        value = rng.choice(values)
+        started = time.perf_counter()
+        corpus.apply_change('mentors', CHANGE_MODIFIED, doc_id, dict(data, expertise=[value]))
+        suggestions.suggest(value[:2], args.limit)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"{len(latencies)} edits then lookups: mean {statistics.mean(latencies) * 1e6:.1f} us  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Memory of several uvicorn workers, each loading the corpus itself or sharing one snapshot.
+
+Usage (from the backend directory):
+    python -m benchmarks.workers [--size 10000] [--workers 1 2 4] [--queries 200] [--port 8766]
+
+Writes a seeded synthetic corpus to a temporary directory, then for each
+worker count launches `uvicorn recommendation_backend:app --workers N` twice:
+once with every worker loading the corpus from the (fake) Firestore, once
+with CORPUS_SHARING=1 so one leader loads it and the others attach to its
+snapshot. After every worker reports ready and the query log has been
+replayed against the pool, it reads each worker's RSS and PSS (resident
+memory with shared pages divided among the processes mapping them) from
+/proc and reports the mean per worker and the number of workers that read
+the corpus from Firestore.
+
+Every worker still seeds its own in-memory Firestore client from the JSON
+files at import, so both modes carry that fixed cost.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from benchmarks.cold_start import BACKEND_DIR, request
+from benchmarks.synthetic import generate_corpus, generate_query_log, write_corpus
+
+
+def health(base_url: str) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(f"{base_url}/health", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+def worker_memory(pid: int) -> Dict[str, float]:
+    """RSS and PSS of a process in MB"""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                memory[name.lower()] = int(value.split()[0]) / 1024
+    return memory
+
+
+def wait_for_workers(base_url: str, workers: int, timeout: float) -> Dict[int, Dict[str, Any]]:
+    """/health reports of every worker once all of them are ready, keyed on pid"""
+    started = time.perf_counter()
+    reports: Dict[int, Dict[str, Any]] = {}
+    while time.perf_counter() - started < timeout:
+        report = health(base_url)
+        if report is not None and report.get('ready'):
+            reports[report['sharing']['pid']] = report
+            if len(reports) == workers:
+                return reports
+        time.sleep(0.02)
+    raise TimeoutError(f"{len(reports)} of {workers} workers ready after {timeout}s")
+
+
+def measure(data_dir: str, workers: int, sharing: bool, queries: List[str], port: int,
+            timeout: float) -> Dict[str, Any]:
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, FAKE_FIRESTORE_DATA=data_dir, LOG_LEVEL='WARNING',
+               CORPUS_SNAPSHOT_PATH=os.path.join(data_dir, f'corpus-{workers}.snapshot') if sharing else '',
+               CORPUS_SHARING='1' if sharing else '0')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'recommendation_backend:app', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        reports = wait_for_workers(base_url, workers, timeout)
+        for query in queries:
+            request(f"{base_url}/recommend", {'query': query, 'use_cache': False})
+        memory = [worker_memory(pid) for pid in reports]
+        return {
+            'rss_mb': sum(m['rss'] for m in memory) / len(memory),
+            'pss_mb': sum(m['pss'] for m in memory) / len(memory),
+            'loaders': sum(1 for report in reports.values() if report['sharing']['role'] != 'follower')
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='total synthetic documents')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--queries', type=int, default=200, help='queries replayed before memory is read')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--timeout', type=float, default=300.0, help='seconds to wait for every worker to be ready')
+    args = parser.parse_args()
+
+    queries = generate_query_log(args.queries, args.seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_corpus(generate_corpus(args.size, args.seed), data_dir)
+        for workers in args.workers:
+            for sharing in (False, True):
+                result = measure(data_dir, workers, sharing, queries, args.port, args.timeout)
+                print(f"{workers} workers, {'shared snapshot' if sharing else 'own corpus    '}: "
+                      f"per worker rss {result['rss_mb']:7.1f} MB  pss {result['pss_mb']:7.1f} MB  "
+                      f"corpus loaded from Firestore by {result['loaders']} worker(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import heapq
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from corpus_store import CHANGE_REMOVED, COLLECTION_ITEM_TYPES, CorpusStore
+from doc_records import FIELD_SCHEMA, DocRecord, build_record, prepare_query, select_top_matches
+from search_index import CorpusIndex
+
+# Term frequency saturation and field length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Rows per block, the unit that top_matches bounds and skips
+BLOCK_ROWS = 128
+# Upper bounds are computed apart from the scores they bound; the slack keeps rounding from making them too tight
+BOUND_SLACK = 1 + 1e-9
+
+# Runs of letters and digits; punctuation never joins a term, in documents or queries
+TERM_PATTERN = re.compile(r'[^\W_]+')
+
+# (query weight * idf, postings) per query term
+ScoringTerm = Tuple[float, Dict[int, Tuple[Tuple[int, int], ...]]]
+# field_id -> (highest tf, shortest field length) over a term's postings in one block
+FieldBounds = Dict[int, Tuple[int, int]]
+
+
+def bm25_terms(text: str) -> List[str]:
+    """Lowercased terms of a document field or query token, split on whitespace and punctuation"""
+    return TERM_PATTERN.findall(text.lower())
+
+
+class BM25Collection:
+    """Term postings and field length statistics of one collection, ranked with BM25F.
+
+    A document's term frequency is summed over its fields, each weighted like
+    calculate_similarity_score weights it and normalized by the field's length
+    against the collection average, before the BM25 saturation is applied once
+    per term. Postings map row -> ((field_id, tf), ...). Rows only ever grow,
+    so each term's postings iterate in row order.
+
+    top_matches terminates early the way block-max WAND does: rows are grouped
+    in blocks of BLOCK_ROWS, each term keeps a bound of its contribution to
+    any document of a block, and blocks are scored in decreasing order of
+    their summed bounds until the next one cannot reach the current top N.
+    """
+
+    def __init__(self, item_type: str):
+        self.item_type = item_type
+        self.weights = tuple(spec.weight for spec in FIELD_SCHEMA[item_type])
+        self.lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, Tuple[Tuple[int, int], ...]]] = {}
+        # term -> block -> (rows, FieldBounds), built on first use and dropped when one
+        # of the term's documents is removed, since bounds only ever widen
+        self._blocks: Dict[str, Dict[int, Tuple[List[int], FieldBounds]]] = {}
+        self._rows: Dict[str, int] = {}
+        # row -> (doc_id, field lengths, terms)
+        self._row_docs: Dict[int, Tuple[str, Tuple[int, ...], Tuple[str, ...]]] = {}
+        self._field_lengths = [0] * len(self.weights)
+        self._next_row = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, record: DocRecord) -> None:
+        """Index a document's terms, replacing any previous version of it"""
+        lengths = [0] * len(self.weights)
+        counts: Dict[str, Dict[int, int]] = {}
+        for field_id, text, _, _ in record.fields:
+            words = bm25_terms(text)
+            lengths[field_id] += len(words)
+            for word in words:
+                field_counts = counts.setdefault(word, {})
+                field_counts[field_id] = field_counts.get(field_id, 0) + 1
+
+        with self.lock:
+            self.remove(record.doc_id)
+            row = self._next_row
+            self._next_row += 1
+            for term, field_counts in counts.items():
+                entry = tuple(field_counts.items())
+                self._postings.setdefault(term, {})[row] = entry
+                blocks = self._blocks.get(term)
+                if blocks is not None:
+                    rows, bounds = blocks.setdefault(row // BLOCK_ROWS, ([], {}))
+                    rows.append(row)
+                    widen_bounds(bounds, entry, lengths)
+            self._rows[record.doc_id] = row
+            self._row_docs[row] = (record.doc_id, tuple(lengths), tuple(counts))
+            for field_id, length in enumerate(lengths):
+                self._field_lengths[field_id] += length
+
+    def remove(self, doc_id: str) -> None:
+        with self.lock:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                return
+            _, lengths, terms = self._row_docs.pop(row)
+            for term in terms:
+                postings = self._postings[term]
+                del postings[row]
+                self._blocks.pop(term, None)
+                if not postings:
+                    del self._postings[term]
+            for field_id, length in enumerate(lengths):
+                self._field_lengths[field_id] -= length
+
+    def query_weights(self, categorized_tokens: Dict[str, List[str]]) -> Dict[str, float]:
+        """Query term -> weight: the words of every token, boosted by its category bonus"""
+        weights: Dict[str, float] = {}
+        for _, token, _, bonus in prepare_query(categorized_tokens, self.item_type)[0]:
+            for word in bm25_terms(token):
+                weights[word] = max(weights.get(word, 0.0), bonus or 1.0)
+        return weights
+
+    def _score_row(self, row: int, terms: List[ScoringTerm], averages: List[float]) -> float:
+        lengths = self._row_docs[row][1]
+        score = 0.0
+        for weight, postings in terms:
+            entry = postings.get(row)
+            if entry is not None:
+                tf = 0.0
+                for field_id, count in entry:
+                    tf += self.weights[field_id] * count / (1 - BM25_B + BM25_B * lengths[field_id] / averages[field_id])
+                score += weight * tf / (BM25_K1 + tf)
+        return score
+
+    def _scoring_terms(self, categorized_tokens: Dict[str, List[str]]) -> List[Tuple[str, float]]:
+        """(term, query weight * idf) for the query terms that occur in the collection, in query order"""
+        count = len(self._rows)
+        terms = []
+        for term, weight in self.query_weights(categorized_tokens).items():
+            postings = self._postings.get(term)
+            if postings:
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                terms.append((term, weight * idf))
+        return terms
+
+    def _averages(self) -> List[float]:
+        count = len(self._rows)
+        return [total / count if count else 0.0 for total in self._field_lengths]
+
+    def score_all(self, categorized_tokens: Dict[str, List[str]]) -> List[Tuple[str, float]]:
+        """(doc_id, score) of every document containing a query term, without pruning"""
+        with self.lock:
+            terms = self._scoring_terms(categorized_tokens)
+            averages = self._averages()
+            scoring = [(weight, self._postings[term]) for term, weight in terms]
+            rows = set().union(*(postings for _, postings in scoring))
+            return [(self._row_docs[row][0], self._score_row(row, scoring, averages)) for row in sorted(rows)]
+
+    def _term_blocks(self, term: str) -> Dict[int, Tuple[List[int], FieldBounds]]:
+        blocks = self._blocks.get(term)
+        if blocks is None:
+            blocks = self._blocks[term] = {}
+            for row, entry in self._postings[term].items():
+                rows, bounds = blocks.setdefault(row // BLOCK_ROWS, ([], {}))
+                rows.append(row)
+                widen_bounds(bounds, entry, self._row_docs[row][1])
+        return blocks
+
+    def _bound(self, bounds: FieldBounds, weight: float, averages: List[float]) -> float:
+        """Upper bound of a term's contribution to any document of a block"""
+        tf = 0.0
+        for field_id, (max_tf, min_length) in bounds.items():
+            tf += self.weights[field_id] * max_tf / (1 - BM25_B + BM25_B * min_length / averages[field_id])
+        return weight * tf / (BM25_K1 + tf) * BOUND_SLACK
+
+    def top_matches(self, categorized_tokens: Dict[str, List[str]], top_n: int) -> Tuple[List[Tuple[str, float]], int]:
+        """Top (doc_id, score) pairs by BM25F, ties broken by document id, and the number of documents scored"""
+        with self.lock:
+            terms = self._scoring_terms(categorized_tokens)
+            if top_n <= 0 or not terms:
+                return [], 0
+            averages = self._averages()
+            scoring = [(weight, self._postings[term]) for term, weight in terms]
+            term_blocks = [self._term_blocks(term) for term, _ in terms]
+            block_bounds: Dict[int, float] = {}
+            for (_, weight), blocks in zip(terms, term_blocks):
+                for block, (_, bounds) in blocks.items():
+                    block_bounds[block] = block_bounds.get(block, 0.0) + self._bound(bounds, weight, averages)
+
+            best: List[float] = []  # Min-heap of the top_n scores so far
+            threshold = 0.0
+            matches = []
+            scored = 0
+            # Most promising blocks first; once a block's bound is below the N-th best score, so are the rest.
+            # Ties with the threshold are still scored, since the document id decides between them.
+            for bound, block in sorted(((bound, block) for block, bound in block_bounds.items()), reverse=True):
+                if bound < threshold:
+                    break
+                rows = set()
+                for blocks in term_blocks:
+                    entry = blocks.get(block)
+                    if entry is not None:
+                        rows.update(entry[0])
+                for row in rows:
+                    score = self._score_row(row, scoring, averages)
+                    if len(best) < top_n:
+                        heapq.heappush(best, score)
+                    elif score > best[0]:
+                        heapq.heapreplace(best, score)
+                    if len(best) == top_n:
+                        threshold = best[0]
+                    if score >= threshold:
+                        matches.append((self._row_docs[row][0], score))
+                scored += len(rows)
+            return select_top_matches(matches, top_n), scored
+
+
+def widen_bounds(bounds: FieldBounds, entry: Tuple[Tuple[int, int], ...], lengths: Tuple[int, ...]) -> None:
+    """Widen FieldBounds to cover one posting"""
+    for field_id, tf in entry:
+        max_tf, min_length = bounds.get(field_id, (tf, lengths[field_id]))
+        bounds[field_id] = (max(max_tf, tf), min(min_length, lengths[field_id]))
+
+
+class BM25Engine:
+    """BM25F rankings per collection, built from the index's records on first use and then
+    kept current from the corpus change events"""
+
+    def __init__(self, store: CorpusStore, index: CorpusIndex):
+        self.index = index
+        self._lock = threading.Lock()
+        self._collections: Dict[str, BM25Collection] = {}
+        store.subscribe(self.on_change)
+
+    def on_change(self, collection: str, change_type: str, doc_id: str,
+                  data: Optional[Dict]) -> None:
+        # Until a collection is built its changes are skipped: the index it is built from already has them
+        bm25 = self._collections.get(collection)
+        if bm25 is None:
+            return
+        if change_type == CHANGE_REMOVED:
+            bm25.remove(doc_id)
+        else:
+            bm25.add(build_record(doc_id, data or {}, bm25.item_type))
+
+    def collection(self, name: str) -> BM25Collection:
+        """Postings and statistics of a collection, building them from the index if needed"""
+        bm25 = self._collections.get(name)
+        if bm25 is not None:
+            return bm25
+        with self._lock:
+            bm25 = self._collections.get(name)
+            if bm25 is None:
+                bm25 = BM25Collection(COLLECTION_ITEM_TYPES[name])
+                # Registered before the records are read, so changes from then on queue up behind the build
+                with bm25.lock:
+                    self._collections[name] = bm25
+                    _, records = self.index.indexes[name].snapshot_records()
+                    for record in records:
+                        bm25.add(record)
+            return bm25
+
+    def invalidate(self) -> None:
+        """Drop every collection, e.g. after the index was replaced by a snapshot without change events"""
+        with self._lock:
+            self._collections = {}
+
+    def top_matches(self, collection: str, categorized_tokens: Dict[str, List[str]],
+                    top_n: int) -> Tuple[List[Tuple[str, float]], int]:
+        return self.collection(collection).top_matches(categorized_tokens, top_n)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        collections = dict(self._collections)
+        return {name: {"documents": len(bm25), "terms": len(bm25._postings)} for name, bm25 in collections.items()}
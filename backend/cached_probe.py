@@ -0,0 +1,59 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from single_flight import SingleFlight
+
+
+class CachedProbe:
+    """Result of a blocking probe, refreshed at most once every refresh_seconds.
+
+    The probe runs on the default executor and concurrent callers share one
+    refresh. A failed refresh is cached for the same interval so a failing
+    backend is not hammered; callers keep getting the last good value, or the
+    error when there has never been one.
+    """
+
+    def __init__(self, probe: Callable[[], Any], refresh_seconds: float):
+        self.probe = probe
+        self.refresh_seconds = refresh_seconds
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+        self.refreshes = 0
+        self._has_value = False
+        self._expires = 0.0
+        self._flights = SingleFlight()
+
+    async def get(self) -> Any:
+        if time.monotonic() >= self._expires:
+            await self._flights.do('refresh', self._refresh)
+        if not self._has_value:
+            raise RuntimeError(self.error)
+        return self.value
+
+    async def _refresh(self) -> None:
+        try:
+            value = await asyncio.get_running_loop().run_in_executor(None, self.probe)
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+        else:
+            self.value = value
+            self.error = None
+            self._has_value = True
+        self.refreshes += 1
+        self.checked_at = datetime.now()
+        self._expires = time.monotonic() + self.refresh_seconds
+
+    def invalidate(self) -> None:
+        """Refresh on the next get()"""
+        self._expires = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "refresh_seconds": self.refresh_seconds,
+            "refreshes": self.refreshes,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "error": self.error
+        }
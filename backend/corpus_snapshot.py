@@ -0,0 +1,412 @@
+"""Versioned on-disk snapshot of the resident corpus and its search indexes.
+
+Layout: an 8-byte magic, the header length as a little-endian uint64, a JSON
+header, then 8-byte aligned sections. The header records the corpus version
+the snapshot was taken at, the field schema and projections it was built with,
+and for every collection the offset, length and dtype of each section
+(relative to the first section):
+
+    doc_ids, doc_id_offsets          document ids (UTF-8) and their character offsets
+    documents, document_offsets      one JSON document per row and their byte offsets
+    <table>_keys, <table>_key_offsets  postings keys of the gram and value tables
+    <table>_offsets                   where each key's postings start in the arrays below
+    <table>_rows, <table>_masks       ascending document rows and field masks
+
+Numeric sections are read in place through mmap, so loading a snapshot
+decodes the key lists but never copies the postings. Attaching one goes
+further and decodes documents only when they are read, which lets every
+worker on a host share one copy of the corpus through the page cache.
+"""
+import base64
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+from google.cloud.firestore_v1 import GeoPoint
+from google.cloud.firestore_v1.base_document import BaseDocumentReference
+
+from corpus_store import CHANGE_ADDED, CHANGE_MODIFIED, CHANGE_REMOVED, COLLECTION_ITEM_TYPES, CorpusStore
+from doc_records import FIELD_SCHEMA
+from fast_json import orjson
+from search_index import CorpusIndex, FrozenPostings, IndexExport, SnapshotLayer
+
+MAGIC = b'CUPSNAP\x01'
+FORMAT_VERSION = 1
+_ALIGNMENT = 8
+_TYPE_TAG = '__snapshot_type__'
+_TABLES = ('grams', 'values')
+
+
+class SnapshotError(Exception):
+    """The file is not a snapshot this build can use"""
+
+
+class CollectionSnapshot(NamedTuple):
+    """One collection's documents, in the row order of its index export"""
+    item_type: str
+    index: IndexExport
+    documents: Dict[str, Dict[str, Any]]
+
+
+def schema_fingerprint(projections: Dict[str, Any]) -> str:
+    """Changes whenever the scored fields or the resident projections change"""
+    description = repr((sorted(FIELD_SCHEMA.items()), sorted((projections or {}).items())))
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()[:16]
+
+
+class SnapshotReference:
+    """A Firestore document reference read back from a snapshot, without the client a live one is bound to;
+    compares equal to any reference to the same path, so reloading the document does not change it"""
+    __slots__ = ('path',)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (SnapshotReference, BaseDocumentReference)):
+            return self.path == other.path
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __repr__(self) -> str:
+        return f"SnapshotReference({self.path!r})"
+
+
+def _tag(value: Any) -> Any:
+    # Firestore values without a JSON form must come back as equal values, or every
+    # reload would see the documents holding them as modified
+    if isinstance(value, datetime):
+        return {_TYPE_TAG: 'datetime', 'value': value.isoformat()}
+    if isinstance(value, GeoPoint):
+        return {_TYPE_TAG: 'geopoint', 'latitude': value.latitude, 'longitude': value.longitude}
+    if isinstance(value, (SnapshotReference, BaseDocumentReference)):
+        return {_TYPE_TAG: 'reference', 'path': value.path}
+    if isinstance(value, (bytes, bytearray)):
+        return {_TYPE_TAG: 'bytes', 'value': base64.b64encode(value).decode('ascii')}
+    return str(value)
+
+
+def _untag(value: Any) -> Any:
+    if isinstance(value, dict):
+        kind = value.get(_TYPE_TAG)
+        if kind == 'datetime':
+            return datetime.fromisoformat(value['value'])
+        if kind == 'geopoint':
+            return GeoPoint(value['latitude'], value['longitude'])
+        if kind == 'reference':
+            return SnapshotReference(value['path'])
+        if kind == 'bytes':
+            return base64.b64decode(value['value'])
+        return {key: _untag(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_untag(item) for item in value]
+    return value
+
+
+def encode_document(data: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_tag, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_tag, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_document(raw: bytes) -> Dict[str, Any]:
+    raw = bytes(raw)  # A memoryview of the mapping would compare items, not bytes, in the tag test below
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    # Only documents holding a tagged value pay for the walk
+    return _untag(data) if _TYPE_TAG.encode('utf-8') in raw else data
+
+
+def _string_sections(strings: List[str]) -> Tuple[bytes, np.ndarray]:
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    return ''.join(strings).encode('utf-8'), offsets
+
+
+def _mask_dtype(masks: np.ndarray) -> np.dtype:
+    largest = int(masks.max()) if len(masks) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if largest <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def write_snapshot(path: str, collections: Dict[str, CollectionSnapshot], corpus_version: int,
+                   collection_versions: Dict[str, int], last_updated: Optional[datetime],
+                   projections: Dict[str, Any], publisher: Optional[str] = None) -> int:
+    """Write a snapshot atomically (temporary file, then rename); returns its size in bytes.
+    `publisher` identifies the process that wrote it, for readers that share the file."""
+    sections: List[bytes] = []
+    position = 0
+    header_collections = {}
+
+    def add_section(descriptors: Dict[str, Any], name: str, data: Any) -> None:
+        nonlocal position
+        if isinstance(data, np.ndarray):
+            raw, dtype = data.tobytes(), data.dtype.str
+        else:
+            raw, dtype = bytes(data), None
+        descriptors[name] = {'offset': position, 'length': len(raw), 'dtype': dtype}
+        padding = -len(raw) % _ALIGNMENT
+        sections.append(raw + b'\0' * padding)
+        position += len(raw) + padding
+
+    for name, collection in collections.items():
+        index = collection.index
+        descriptors: Dict[str, Any] = {}
+        doc_id_text, doc_id_offsets = _string_sections(index.doc_ids)
+        add_section(descriptors, 'doc_ids', doc_id_text)
+        add_section(descriptors, 'doc_id_offsets', doc_id_offsets)
+
+        encoded = [encode_document(collection.documents[doc_id]) for doc_id in index.doc_ids]
+        document_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(raw) for raw in encoded], out=document_offsets[1:])
+        add_section(descriptors, 'documents', b''.join(encoded))
+        add_section(descriptors, 'document_offsets', document_offsets)
+
+        for table_name, table in zip(_TABLES, (index.grams, index.values)):
+            key_text, key_offsets = _string_sections(table.keys)
+            add_section(descriptors, f'{table_name}_keys', key_text)
+            add_section(descriptors, f'{table_name}_key_offsets', key_offsets)
+            add_section(descriptors, f'{table_name}_offsets', table.offsets.astype(np.int64))
+            add_section(descriptors, f'{table_name}_rows', table.rows.astype(np.uint32))
+            add_section(descriptors, f'{table_name}_masks', table.masks.astype(_mask_dtype(table.masks)))
+
+        header_collections[name] = {
+            'item_type': collection.item_type,
+            'documents': len(index.doc_ids),
+            'index_version': index.version,
+            'sections': descriptors
+        }
+
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'corpus_version': corpus_version,
+        'collection_versions': collection_versions,
+        'last_updated': last_updated.isoformat() if last_updated else None,
+        'schema': schema_fingerprint(projections),
+        'publisher': publisher,
+        'collections': header_collections
+    }).encode('utf-8')
+    prefix = MAGIC + len(header).to_bytes(8, 'little') + header
+    prefix += b'\0' * (-len(prefix) % _ALIGNMENT)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(prefix)
+            for section in sections:
+                f.write(section)
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers that already mapped the old file keep it; new readers see the new one
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.unlink(temporary_path)
+        except OSError:
+            pass
+        raise
+    return len(prefix) + position
+
+
+class Snapshot:
+    """A memory-mapped snapshot file; numeric sections are zero-copy views of the mapping"""
+
+    def __init__(self, path: str, projections: Optional[Dict[str, Any]] = None):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Changes whenever a writer renames a new snapshot into place
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"{path} is not a corpus snapshot")
+        header_length = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], 'little')
+        header_end = len(MAGIC) + 8 + header_length
+        self.header = json.loads(self._mmap[len(MAGIC) + 8:header_end])
+        if self.header.get('format') != FORMAT_VERSION:
+            raise SnapshotError(f"{path} has snapshot format {self.header.get('format')}, expected {FORMAT_VERSION}")
+        if projections is not None and self.header.get('schema') != schema_fingerprint(projections):
+            raise SnapshotError(f"{path} was written for a different field schema or projection")
+        self._data_start = header_end + (-header_end % _ALIGNMENT)
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromisoformat(self.header['created_at'])
+
+    @property
+    def last_updated(self) -> Optional[datetime]:
+        value = self.header.get('last_updated')
+        return datetime.fromisoformat(value) if value else None
+
+    @property
+    def collections(self) -> List[str]:
+        return list(self.header['collections'])
+
+    @property
+    def publisher(self) -> Optional[str]:
+        return self.header.get('publisher')
+
+    def _section(self, collection: str, name: str) -> Dict[str, Any]:
+        return self.header['collections'][collection]['sections'][name]
+
+    def array(self, collection: str, name: str) -> np.ndarray:
+        section = self._section(collection, name)
+        dtype = np.dtype(section['dtype'])
+        return np.frombuffer(self._mmap, dtype=dtype, count=section['length'] // dtype.itemsize,
+                             offset=self._data_start + section['offset'])
+
+    def raw(self, collection: str, name: str) -> memoryview:
+        section = self._section(collection, name)
+        start = self._data_start + section['offset']
+        return memoryview(self._mmap)[start:start + section['length']]
+
+    def strings(self, collection: str, name: str, offsets_name: str) -> List[str]:
+        text = bytes(self.raw(collection, name)).decode('utf-8')
+        offsets = self.array(collection, offsets_name).tolist()
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def document(self, collection: str, row: int) -> Dict[str, Any]:
+        offsets = self.array(collection, 'document_offsets')
+        start = self._data_start + self._section(collection, 'documents')['offset']
+        return decode_document(self._mmap[start + int(offsets[row]):start + int(offsets[row + 1])])
+
+    def documents(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        """Every document of a collection, decoded; see SnapshotDocuments for a lazy view"""
+        doc_ids = self.strings(collection, 'doc_ids', 'doc_id_offsets')
+        offsets = self.array(collection, 'document_offsets').tolist()
+        raw = self.raw(collection, 'documents')
+        return {doc_id: decode_document(bytes(raw[start:end]))
+                for doc_id, start, end in zip(doc_ids, offsets, offsets[1:])}
+
+    def postings(self, collection: str, table: str) -> FrozenPostings:
+        return FrozenPostings(
+            self.strings(collection, f'{table}_keys', f'{table}_key_offsets'),
+            self.array(collection, f'{table}_offsets'),
+            self.array(collection, f'{table}_rows'),
+            self.array(collection, f'{table}_masks')
+        )
+
+    def layer(self, collection: str, documents: Optional[Dict[str, Dict[str, Any]]] = None) -> SnapshotLayer:
+        """Frozen index layer of a collection. Records are built from `documents` when
+        they were already decoded, otherwise from the mapping on demand."""
+        doc_ids = self.strings(collection, 'doc_ids', 'doc_id_offsets')
+        if documents is not None:
+            document = lambda row: documents[doc_ids[row]]
+        else:
+            document = lambda row: self.document(collection, row)
+        return SnapshotLayer(doc_ids, self.postings(collection, 'grams'), self.postings(collection, 'values'), document)
+
+
+class SnapshotDocuments(Mapping):
+    """Read-only doc_id -> document view of one collection, decoding a document each time it is read"""
+
+    def __init__(self, snapshot: Snapshot, collection: str):
+        self.doc_ids = snapshot.strings(collection, 'doc_ids', 'doc_id_offsets')
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+        self._offsets = snapshot.array(collection, 'document_offsets')
+        self._raw = snapshot.raw(collection, 'documents')
+
+    def document(self, row: int) -> Dict[str, Any]:
+        return decode_document(self._raw[int(self._offsets[row]):int(self._offsets[row + 1])])
+
+    def __getitem__(self, doc_id: str) -> Dict[str, Any]:
+        return self.document(self.rows[doc_id])
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.doc_ids)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+
+def snapshot_changes(previous: Snapshot, current: Snapshot,
+                     collections: List[str]) -> List[Tuple[str, str, str, Optional[Dict[str, Any]]]]:
+    """(collection, change type, doc_id, data) changes that turn the documents of `previous` into those
+    of `current`. Encoded documents are compared in place, so only added and modified ones are decoded."""
+    changes = []
+    for name in collections:
+        before, after = previous.raw(name, 'documents'), current.raw(name, 'documents')
+        if previous.raw(name, 'doc_ids') == current.raw(name, 'doc_ids') and before == after:
+            continue
+        before_offsets = previous.array(name, 'document_offsets').tolist()
+        before_rows = {doc_id: row for row, doc_id in enumerate(previous.strings(name, 'doc_ids', 'doc_id_offsets'))}
+        after_offsets = current.array(name, 'document_offsets').tolist()
+        for row, doc_id in enumerate(current.strings(name, 'doc_ids', 'doc_id_offsets')):
+            encoded = after[after_offsets[row]:after_offsets[row + 1]]
+            before_row = before_rows.pop(doc_id, None)
+            if before_row is None:
+                changes.append((name, CHANGE_ADDED, doc_id, decode_document(encoded)))
+            elif before[before_offsets[before_row]:before_offsets[before_row + 1]] != encoded:
+                changes.append((name, CHANGE_MODIFIED, doc_id, decode_document(encoded)))
+        changes.extend((name, CHANGE_REMOVED, doc_id, None) for doc_id in before_rows)
+    return changes
+
+
+def save_snapshot(path: str, corpus: CorpusStore, corpus_index: CorpusIndex, attempts: int = 20,
+                  publisher: Optional[str] = None) -> Optional[int]:
+    """Snapshot the corpus and its indexes at one consistent version; returns the file size,
+    or None if changes kept arriving while it was being captured"""
+    for _ in range(attempts):
+        captured = corpus.capture()
+        if captured is None:
+            time.sleep(0.05)
+            continue
+        version, collection_versions, last_updated, documents = captured
+        exports = {name: corpus_index.indexes[name].export() for name in corpus.collections}
+        # Every index change follows a corpus version bump, so an unchanged version means the
+        # exports saw exactly the captured documents
+        if corpus.version != version or corpus.notifying:
+            continue
+        if any(len(exports[name].doc_ids) != len(documents[name]) for name in corpus.collections):
+            continue
+        collections = {
+            name: CollectionSnapshot(COLLECTION_ITEM_TYPES[name], exports[name], documents[name])
+            for name in corpus.collections
+        }
+        return write_snapshot(path, collections, version, collection_versions, last_updated, corpus.projections, publisher)
+    return None
+
+
+def restore_snapshot(path: str, corpus: CorpusStore, corpus_index: CorpusIndex, attach: bool = False,
+                     publisher: Optional[str] = None) -> Snapshot:
+    """Load a snapshot into the corpus and its indexes, replacing what they hold.
+
+    Restored documents are decoded up front; attached ones stay in the mapping
+    and are decoded when read. The corpus is stale until its next load(),
+    unless `publisher` is given and wrote the snapshot.
+    """
+    snapshot = Snapshot(path, corpus.projections)
+    missing = set(corpus.collections) - set(snapshot.collections)
+    if missing:
+        raise SnapshotError(f"{path} has no {', '.join(sorted(missing))} collection")
+    # Decode everything before touching the corpus so a bad file leaves it as it was
+    documents: Dict[str, Mapping[str, Dict[str, Any]]] = {}
+    layers = {}
+    for name in corpus.collections:
+        if attach:
+            attached = documents[name] = SnapshotDocuments(snapshot, name)
+            layers[name] = SnapshotLayer(attached.doc_ids, snapshot.postings(name, 'grams'),
+                                         snapshot.postings(name, 'values'), attached.document)
+        else:
+            documents[name] = snapshot.documents(name)
+            layers[name] = snapshot.layer(name, dict(documents[name]))
+    for name in corpus.collections:
+        corpus_index.indexes[name].restore(layers[name], snapshot.header['collections'][name]['index_version'])
+    corpus.restore(documents, snapshot.header['corpus_version'], snapshot.header['collection_versions'],
+                   snapshot.last_updated, stale=publisher is None or snapshot.publisher != publisher)
+    return snapshot
@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Firestore collection name -> recommendation category it feeds
+COLLECTION_ITEM_TYPES = {
+    'projects': 'student_projects',
+    'startups': 'startup_projects',
+    'mentors': 'mentor_profiles',
+    'faculty': 'research_projects'
+}
+
+CHANGE_ADDED = 'ADDED'
+CHANGE_MODIFIED = 'MODIFIED'
+CHANGE_REMOVED = 'REMOVED'
+
+# subscriber(collection, change_type, doc_id, data) - data is None for removals
+ChangeSubscriber = Callable[[str, str, str, Optional[Dict[str, Any]]], None]
+
+
+class CorpusStore:
+    """Resident copy of the recommendation collections kept current by Firestore listeners"""
+
+    def __init__(self, collections: Optional[List[str]] = None,
+                 projections: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.collections = list(collections or COLLECTION_ITEM_TYPES.keys())
+        # collection -> field paths kept resident; collections without one keep whole documents
+        self.projections = dict(projections or {})
+        self._docs: Dict[str, Mapping[str, Dict[str, Any]]] = {name: {} for name in self.collections}
+        self._lock = threading.RLock()
+        self._watches = []
+        self._subscribers: List[ChangeSubscriber] = []
+        self.loaded = False
+        self.version = 0
+        self.collection_versions = {name: 0 for name in self.collections}
+        self.last_updated: Optional[datetime] = None
+        # collection -> seconds its last full read took
+        self.fetch_seconds: Dict[str, float] = {}
+        # True while serving documents restored from a snapshot that no load() has confirmed yet
+        self.stale = False
+        # Change notifications handed to subscribers but not yet finished
+        self._notifying = 0
+
+    def load(self, db, max_workers: int = 1) -> None:
+        """Read every collection once and replace the resident documents"""
+        def fetch(name: str) -> Dict[str, Dict[str, Any]]:
+            started = time.perf_counter()
+            query = db.collection(name)
+            if self.projections.get(name):
+                query = query.select(list(self.projections[name]))
+            docs = {doc.id: doc.to_dict() or {} for doc in query.stream()}
+            self.fetch_seconds[name] = time.perf_counter() - started
+            return docs
+
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(self.collections)),
+                                    thread_name_prefix='corpus-fetch') as executor:
+                fetched = dict(zip(self.collections, executor.map(fetch, self.collections)))
+        else:
+            fetched = {name: fetch(name) for name in self.collections}
+
+        changes = []
+        with self._lock:
+            for name, docs in fetched.items():
+                previous = self._docs[name]
+                for doc_id in previous.keys() - docs.keys():
+                    changes.append((name, CHANGE_REMOVED, doc_id, None))
+                for doc_id, data in docs.items():
+                    if doc_id not in previous:
+                        changes.append((name, CHANGE_ADDED, doc_id, data))
+                    elif previous[doc_id] != data:
+                        changes.append((name, CHANGE_MODIFIED, doc_id, data))
+                self._docs[name] = docs
+                self.collection_versions[name] += 1
+            self.version += 1
+            self.loaded = True
+            self.stale = False
+            self.last_updated = datetime.now()
+            subscribers = list(self._subscribers)
+            self._notifying += 1
+
+        try:
+            for change in changes:
+                self._notify(subscribers, *change)
+        finally:
+            self._finish_notifying()
+
+    def restore(self, documents: Dict[str, Mapping[str, Dict[str, Any]]], version: int,
+                collection_versions: Dict[str, int], last_updated: Optional[datetime], stale: bool = True) -> None:
+        """Adopt documents restored from a snapshot without notifying subscribers.
+
+        Subscribers are expected to restore their own state from the same
+        snapshot. Mappings are kept as given, so they may be read-only views
+        of the snapshot; load() replaces them, and until then the corpus is
+        stale unless the caller knows the snapshot is current.
+        """
+        with self._lock:
+            for name in self.collections:
+                self._docs[name] = documents.get(name, {})
+                self.collection_versions[name] = collection_versions.get(name, 0)
+            self.version = version
+            self.last_updated = last_updated
+            self.loaded = True
+            self.stale = stale
+
+    def capture(self) -> Optional[Tuple[int, Dict[str, int], Optional[datetime], Dict[str, Dict[str, Dict[str, Any]]]]]:
+        """(version, collection versions, last update, shallow copy of every collection),
+        or None while subscribers are still being told about a change"""
+        with self._lock:
+            if self._notifying:
+                return None
+            return (self.version, dict(self.collection_versions), self.last_updated,
+                    {name: dict(docs) for name, docs in self._docs.items()})
+
+    @property
+    def notifying(self) -> bool:
+        return self._notifying > 0
+
+    def _finish_notifying(self) -> None:
+        with self._lock:
+            self._notifying -= 1
+
+    def start_listeners(self, db) -> None:
+        """Attach an on_snapshot listener to each collection"""
+        self.stop_listeners()
+        for name in self.collections:
+            watch = db.collection(name).on_snapshot(self._make_snapshot_callback(name))
+            self._watches.append(watch)
+
+    def stop_listeners(self) -> None:
+        """Detach all running on_snapshot listeners"""
+        watches, self._watches = self._watches, []
+        for watch in watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"⚠️ Error stopping corpus listener: {e}")
+
+    def _make_snapshot_callback(self, collection: str):
+        def on_snapshot(col_snapshot, changes, read_time):
+            for change in changes:
+                doc = change.document
+                data = None if change.type.name == CHANGE_REMOVED else (doc.to_dict() or {})
+                self.apply_change(collection, change.type.name, doc.id, data)
+        return on_snapshot
+
+    def project(self, collection: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Restrict a document to the collection's resident fields"""
+        fields = self.projections.get(collection)
+        if not fields:
+            return data
+        return {field: data[field] for field in fields if field in data}
+
+    @property
+    def projected(self) -> bool:
+        return any(self.projections.get(name) for name in self.collections)
+
+    def apply_change(self, collection: str, change_type: str, doc_id: str,
+                     data: Optional[Dict[str, Any]] = None) -> bool:
+        """Apply one added/modified/removed document, returning whether the corpus changed"""
+        if data is not None:
+            # Listeners deliver whole documents; edits to unprojected fields compare equal and are skipped
+            data = self.project(collection, data)
+        with self._lock:
+            docs = self._docs.get(collection)
+            if docs is None:
+                return False
+
+            if change_type == CHANGE_REMOVED:
+                if doc_id not in docs:
+                    return False
+                del docs[doc_id]
+            else:
+                # The first snapshot of a listener replays every document as ADDED
+                if docs.get(doc_id) == data:
+                    return False
+                change_type = CHANGE_MODIFIED if doc_id in docs else CHANGE_ADDED
+                docs[doc_id] = data
+
+            self.collection_versions[collection] += 1
+            self.version += 1
+            self.last_updated = datetime.now()
+            subscribers = list(self._subscribers)
+            self._notifying += 1
+
+        try:
+            self._notify(subscribers, collection, change_type, doc_id, data)
+        finally:
+            self._finish_notifying()
+        return True
+
+    def subscribe(self, callback: ChangeSubscriber) -> None:
+        """Register a callback invoked for every document change"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _notify(self, subscribers: List[ChangeSubscriber], collection: str, change_type: str,
+                doc_id: str, data: Optional[Dict[str, Any]]) -> None:
+        for callback in subscribers:
+            try:
+                callback(collection, change_type, doc_id, data)
+            except Exception as e:
+                logger.exception(f"❌ Corpus subscriber failed for {collection}/{doc_id}: {e}")
+
+    def documents(self, collection: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Snapshot of (doc_id, data) pairs for a collection; the dicts must not be mutated"""
+        with self._lock:
+            return list(self._docs.get(collection, {}).items())
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Return a single resident document or None"""
+        with self._lock:
+            return self._docs.get(collection, {}).get(doc_id)
+
+    @property
+    def listening(self) -> bool:
+        """Whether on_snapshot listeners are keeping the corpus current"""
+        watches = self._watches
+        return bool(watches) and all(watch.is_active for watch in watches)
+
+    def count(self, collection: str) -> int:
+        """Number of resident documents in a collection"""
+        with self._lock:
+            return len(self._docs.get(collection, {}))
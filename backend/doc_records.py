@@ -0,0 +1,221 @@
+import heapq
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fuzzy_match import sequence_ratio
+
+
+class FieldSpec(NamedTuple):
+    name: str
+    key: str
+    weight: float
+    # 'text' fields are skipped when falsy, 'str' fields are stringified first
+    # (so a missing value is skipped but None becomes "None"), 'list' fields
+    # contribute one entry per element
+    kind: str
+
+
+# Scored fields and weights per item type, in the order calculate_similarity_score reads them
+FIELD_SCHEMA = {
+    'student_projects': (
+        FieldSpec('title', 'title', 3.0, 'text'),
+        FieldSpec('description', 'description', 1.5, 'text'),
+        FieldSpec('domain', 'domain', 2.5, 'text'),
+        FieldSpec('difficulty', 'difficulty', 1.0, 'text'),
+        FieldSpec('type', 'type', 1.0, 'text'),
+        FieldSpec('skill', 'skillsRequired', 2.0, 'list')
+    ),
+    'startup_projects': (
+        FieldSpec('name', 'name', 3.0, 'text'),
+        FieldSpec('description', 'description', 1.5, 'text'),
+        FieldSpec('domain', 'domain', 2.5, 'text'),
+        FieldSpec('location', 'location', 1.5, 'text'),
+        FieldSpec('mission', 'mission', 2.0, 'text'),
+        FieldSpec('founder', 'founder', 1.0, 'text'),
+        FieldSpec('funding', 'funding', 0.5, 'text')
+    ),
+    'mentor_profiles': (
+        FieldSpec('name', 'name', 2.0, 'text'),
+        FieldSpec('bio', 'bio', 1.5, 'text'),
+        FieldSpec('currentCompany', 'currentCompany', 2.0, 'text'),
+        FieldSpec('designation', 'designation', 1.5, 'text'),
+        FieldSpec('experience', 'experience', 1.0, 'str'),
+        FieldSpec('expertise', 'expertise', 3.0, 'list')
+    ),
+    'research_projects': (
+        FieldSpec('name', 'name', 2.0, 'text'),
+        FieldSpec('bio', 'bio', 1.5, 'text'),
+        FieldSpec('department', 'department', 2.0, 'text'),
+        FieldSpec('institute', 'institute', 1.5, 'text'),
+        FieldSpec('designation', 'designation', 1.5, 'text'),
+        FieldSpec('experience', 'experience', 1.0, 'str'),
+        FieldSpec('researchArea', 'researchAreas', 3.0, 'list')
+    )
+}
+
+# Fields a client needs to render a result, returned by the compact response view
+DISPLAY_FIELDS = {
+    'student_projects': ('title', 'description', 'domain'),
+    'startup_projects': ('name', 'title', 'description', 'domain', 'logo'),
+    'mentor_profiles': ('name', 'fullName', 'email', 'designation', 'currentCompany', 'profilePic'),
+    'research_projects': ('name', 'title', 'designation', 'institute', 'profilePic')
+}
+
+
+def projected_fields(item_type: str) -> Tuple[str, ...]:
+    """Document fields kept resident for an item type: the scored fields, then display fields"""
+    fields = [spec.key for spec in FIELD_SCHEMA[item_type]]
+    fields.extend(field for field in DISPLAY_FIELDS[item_type] if field not in fields)
+    return tuple(fields)
+
+
+# Query category boosts applied to a token's best field score
+CATEGORY_BONUSES = {
+    ('skills', 'student_projects'): 1.2,
+    ('skills', 'mentor_profiles'): 1.2,
+    ('domains', 'student_projects'): 1.2,
+    ('domains', 'startup_projects'): 1.2,
+    ('companies', 'mentor_profiles'): 1.2,
+    ('institutes', 'research_projects'): 1.2,
+    ('locations', 'startup_projects'): 1.2
+}
+
+MULTI_TOKEN_BONUS = 1.1
+
+# (field_id, lowercased text, word set, weight)
+RecordField = Tuple[int, str, frozenset, float]
+# (category, lowercased token, token word set, category bonus or None)
+QueryToken = Tuple[str, str, frozenset, Optional[float]]
+
+
+class DocRecord:
+    """Pre-normalized scored fields of one document"""
+
+    __slots__ = ('doc_id', 'fields')
+
+    def __init__(self, doc_id: Optional[str], fields: Tuple[RecordField, ...]):
+        self.doc_id = doc_id
+        self.fields = fields
+
+
+def iter_list_field(value: Any) -> Iterable[Any]:
+    """Iterate a list-valued field the way the scorer does, tolerating missing values"""
+    if value is None:
+        return ()
+    try:
+        return iter(value)
+    except TypeError:
+        return ()
+
+
+def build_record(doc_id: Optional[str], item_data: Dict[str, Any], item_type: str) -> DocRecord:
+    """Normalize a raw document into a DocRecord using the item type's field schema"""
+    fields = []
+    for field_id, spec in enumerate(FIELD_SCHEMA[item_type]):
+        if spec.kind == 'list':
+            values = iter_list_field(item_data.get(spec.key, []))
+        elif spec.kind == 'str':
+            values = (str(item_data.get(spec.key, '')),)
+        else:
+            values = (item_data.get(spec.key, ''),)
+        for value in values:
+            if value:
+                text = str(value).lower()
+                fields.append((field_id, text, frozenset(text.split()), spec.weight))
+    return DocRecord(doc_id, tuple(fields))
+
+
+def prepare_query(categorized_tokens: Dict[str, List[str]], item_type: str) -> Tuple[Tuple[QueryToken, ...], int]:
+    """Normalize parsed query tokens once per item type; returns (tokens, total token count)"""
+    prepared = []
+    total_tokens = 0
+    for category, tokens in categorized_tokens.items():
+        bonus = CATEGORY_BONUSES.get((category, item_type))
+        for token in tokens:
+            total_tokens += 1
+            if token:
+                token_lower = token.lower()
+                prepared.append((category, token_lower, frozenset(token_lower.split()), bonus))
+    return tuple(prepared), total_tokens
+
+
+def field_similarity(token: str, token_words: frozenset, text: str, words: frozenset,
+                     min_similarity: float = 0.0) -> float:
+    """Similarity of a lowercased query token to a lowercased field and their word sets: exact 1.0,
+    containment 0.8, word overlap up to 0.6, then the fuzzy ratio up to 0.4.
+
+    Results below min_similarity may be underestimated, which lets the fuzzy
+    fallback stop early when it cannot beat the best field so far.
+    """
+    if token == text:
+        return 1.0
+    if token in text or text in token:
+        return 0.8
+    if token_words and words:
+        intersection = len(token_words & words)
+        return intersection / (len(token_words) + len(words) - intersection) * 0.6
+    return sequence_ratio(token, text, min_similarity / 0.4) * 0.4
+
+
+def score_record(query: Tuple[Tuple[QueryToken, ...], int], record: DocRecord,
+                 token_scores: Optional[Dict[str, float]] = None) -> float:
+    """Score a DocRecord against a query from prepare_query.
+
+    token_scores, when given, memoizes each token's best field score for this
+    record so several queries scored against it share the field comparisons.
+    """
+    tokens, total_tokens = query
+    fields = record.fields
+    score = 0.0
+    for _, token, token_words, bonus in tokens:
+        max_token_score = token_scores.get(token) if token_scores is not None else None
+        if max_token_score is None:
+            max_token_score = 0.0
+            for _, text, words, weight in fields:
+                token_score = field_similarity(token, token_words, text, words, max_token_score / weight) * weight
+                if token_score > max_token_score:
+                    max_token_score = token_score
+            if token_scores is not None:
+                token_scores[token] = max_token_score
+        if bonus is not None:
+            max_token_score *= bonus
+        score += max_token_score
+
+    # Bonus for having multiple matching tokens
+    if total_tokens > 1 and score > 0:
+        score *= MULTI_TOKEN_BONUS
+    return score
+
+
+def select_top_matches(matches: Iterable[Tuple[str, float]], top_n: int) -> List[Tuple[str, float]]:
+    """Best top_n (doc_id, score) pairs by score, ties broken by document id, in O(top_n) memory"""
+    return heapq.nsmallest(top_n, matches, key=lambda match: (-match[1], match[0]))
+
+
+class TopMatches:
+    """Best top_n (doc_id, score) pairs of a stream of matches, ordered like select_top_matches.
+
+    Matches are buffered and merged into the top N every batch_size of them,
+    so memory stays O(top_n + batch_size) however many documents match.
+    """
+
+    def __init__(self, top_n: int, batch_size: int = 4096):
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.matched = 0
+        self._top: List[Tuple[str, float]] = []
+        self._pending: List[Tuple[str, float]] = []
+
+    def add(self, doc_id: str, score: float) -> None:
+        self.matched += 1
+        self._pending.append((doc_id, score))
+        if len(self._pending) >= self.batch_size:
+            self._merge()
+
+    def _merge(self) -> None:
+        if self._pending:
+            self._top = select_top_matches(self._top + self._pending, self.top_n)
+            self._pending = []
+
+    def top(self) -> List[Tuple[str, float]]:
+        self._merge()
+        return self._top
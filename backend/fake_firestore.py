@@ -0,0 +1,246 @@
+import copy
+import heapq
+import itertools
+import json
+import os
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ChangeType(Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class FakeDocumentSnapshot:
+    """Mimics google.cloud.firestore.DocumentSnapshot"""
+
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+    def project(self, field_paths: List[str]) -> 'FakeDocumentSnapshot':
+        if self._data is None:
+            return self
+        return FakeDocumentSnapshot(self.id, {field: self._data[field] for field in field_paths if field in self._data})
+
+
+class FakeDocumentChange:
+    """Mimics google.cloud.firestore.DocumentChange"""
+
+    def __init__(self, change_type: ChangeType, document: FakeDocumentSnapshot):
+        self.type = change_type
+        self.document = document
+
+
+class FakeWatch:
+    """Handle returned by on_snapshot"""
+
+    def __init__(self, collection: 'FakeCollectionReference', callback: Callable):
+        self._collection = collection
+        self.callback = callback
+        self.active = True
+
+    @property
+    def is_active(self) -> bool:
+        return self.active
+
+    def unsubscribe(self) -> None:
+        self.active = False
+        self._collection._remove_watch(self)
+
+
+class FakeAggregationResult:
+    """Mimics google.cloud.firestore_v1.aggregation.AggregationResult"""
+
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregationQuery:
+    """count() over a fake query; get() returns one list of results like the SDK"""
+
+    def __init__(self, query: 'FakeQuery', alias: Optional[str]):
+        self._query = query
+        self._alias = alias or 'field_1'
+
+    def get(self) -> List[List[FakeAggregationResult]]:
+        count = self._query._collection._count(self._query._limit)
+        return [[FakeAggregationResult(self._alias, count)]]
+
+
+class FakeQuery:
+    """Read-only view over a fake collection"""
+
+    def __init__(self, collection: 'FakeCollectionReference', limit: Optional[int] = None,
+                 field_paths: Optional[List[str]] = None):
+        self._collection = collection
+        self._limit = limit
+        self._field_paths = field_paths
+
+    def limit(self, count: int) -> 'FakeQuery':
+        return FakeQuery(self._collection, count, self._field_paths)
+
+    def select(self, field_paths: List[str]) -> 'FakeQuery':
+        """Project returned documents onto the given top-level fields"""
+        return FakeQuery(self._collection, self._limit, list(field_paths))
+
+    def count(self, alias: Optional[str] = None) -> FakeAggregationQuery:
+        """Aggregation count that, like Firestore, does not read the documents"""
+        return FakeAggregationQuery(self, alias)
+
+    def stream(self):
+        snapshots = self._collection._sorted_snapshots(self._limit)
+        if self._field_paths is not None:
+            snapshots = [snap.project(self._field_paths) for snap in snapshots]
+        return iter(snapshots)
+
+    def get(self) -> List[FakeDocumentSnapshot]:
+        return list(self.stream())
+
+
+class FakeDocumentReference:
+    """Mimics google.cloud.firestore.DocumentReference"""
+
+    def __init__(self, collection: 'FakeCollectionReference', doc_id: str):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self) -> FakeDocumentSnapshot:
+        return FakeDocumentSnapshot(self.id, self._collection._docs.get(self.id))
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        existing = self._collection._docs.get(self.id)
+        if merge and existing is not None:
+            merged = dict(existing)
+            merged.update(data)
+            data = merged
+        self._collection._write(self.id, copy.deepcopy(data))
+
+    def update(self, data: Dict[str, Any]) -> None:
+        if self.id not in self._collection._docs:
+            raise KeyError(f"No document to update: {self._collection.id}/{self.id}")
+        self.set(data, merge=True)
+
+    def delete(self) -> None:
+        self._collection._delete(self.id)
+
+
+class FakeCollectionReference(FakeQuery):
+    """In-memory collection that emits snapshot change events to its listeners"""
+
+    _auto_ids = itertools.count(1)
+
+    def __init__(self, client: 'FakeFirestoreClient', name: str):
+        super().__init__(self)
+        self._client = client
+        self.id = name
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._watches: List[FakeWatch] = []
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentReference:
+        if doc_id is None:
+            doc_id = f"auto_{next(self._auto_ids):08d}"
+        return FakeDocumentReference(self, doc_id)
+
+    def add(self, data: Dict[str, Any]):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def on_snapshot(self, callback: Callable) -> FakeWatch:
+        """Register a listener; like Firestore, the first call replays every document as ADDED"""
+        watch = FakeWatch(self, callback)
+        with self._client._lock:
+            self._watches.append(watch)
+            snapshots = self._sorted_snapshots()
+        changes = [FakeDocumentChange(ChangeType.ADDED, snap) for snap in snapshots]
+        callback(snapshots, changes, None)
+        return watch
+
+    def _remove_watch(self, watch: FakeWatch) -> None:
+        with self._client._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _sorted_snapshots(self, limit: Optional[int] = None) -> List[FakeDocumentSnapshot]:
+        with self._client._lock:
+            doc_ids = sorted(self._docs) if limit is None else heapq.nsmallest(limit, self._docs)
+            return [FakeDocumentSnapshot(doc_id, self._docs[doc_id]) for doc_id in doc_ids]
+
+    def _count(self, limit: Optional[int] = None) -> int:
+        with self._client._lock:
+            return len(self._docs) if limit is None else min(limit, len(self._docs))
+
+    def _write(self, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._client._lock:
+            change_type = ChangeType.MODIFIED if doc_id in self._docs else ChangeType.ADDED
+            self._docs[doc_id] = data
+        self._emit(FakeDocumentChange(change_type, FakeDocumentSnapshot(doc_id, data)))
+
+    def _delete(self, doc_id: str) -> None:
+        with self._client._lock:
+            data = self._docs.pop(doc_id, None)
+        if data is not None:
+            self._emit(FakeDocumentChange(ChangeType.REMOVED, FakeDocumentSnapshot(doc_id, data)))
+
+    def _emit(self, change: FakeDocumentChange) -> None:
+        with self._client._lock:
+            watches = list(self._watches)
+        if not watches:
+            return
+        snapshots = self._sorted_snapshots()
+        for watch in watches:
+            if watch.active:
+                watch.callback(snapshots, [change], None)
+
+
+class FakeFirestoreClient:
+    """Local stand-in for firestore.client() used to exercise the backend without Firebase"""
+
+    def __init__(self, data: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self._lock = threading.RLock()
+        self._collections: Dict[str, FakeCollectionReference] = {}
+        for name, docs in (data or {}).items():
+            self.seed(name, docs)
+
+    @classmethod
+    def from_directory(cls, path: str) -> 'FakeFirestoreClient':
+        """Client seeded from <collection>.json files holding lists of documents, e.g. scripts/generated-data"""
+        client = cls()
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith('.json'):
+                with open(os.path.join(path, filename)) as f:
+                    client.seed(filename[:-len('.json')], json.load(f))
+        return client
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollectionReference(self, name)
+            return self._collections[name]
+
+    def get_all(self, references: List[FakeDocumentReference], field_paths: Optional[List[str]] = None):
+        """Batch read of document references, like firestore.Client.get_all"""
+        for ref in references:
+            snapshot = ref.get()
+            yield snapshot.project(field_paths) if field_paths is not None else snapshot
+
+    def seed(self, name: str, docs: List[Dict[str, Any]]) -> None:
+        """Bulk-load documents without emitting change events; each dict's 'id' becomes its doc id"""
+        collection = self.collection(name)
+        with self._lock:
+            for index, doc in enumerate(docs):
+                data = copy.deepcopy(doc)
+                doc_id = str(data.pop('id', f"{name}_{index:06d}"))
+                collection._docs[doc_id] = data
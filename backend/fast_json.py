@@ -0,0 +1,21 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+
+def _encode_default(value: Any) -> Any:
+    """Firestore timestamps and other non-JSON values, rendered the way FastAPI would"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON for a response body"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_encode_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
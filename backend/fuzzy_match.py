@@ -0,0 +1,100 @@
+import os
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Tuple
+
+# 'fast' uses the bit-parallel LCS ratio below, 'difflib' keeps SequenceMatcher.ratio()
+FUZZY_MATCHER = os.environ.get('FUZZY_MATCHER', 'fast').lower()
+
+
+def length_ratio_bound(a: str, b: str) -> float:
+    """Upper bound of any matching-characters ratio from the string lengths alone"""
+    total = len(a) + len(b)
+    return 2.0 * min(len(a), len(b)) / total if total else 1.0
+
+
+def char_overlap_bound(a: str, b: str) -> float:
+    """Upper bound from the shared character multiset (difflib's quick_ratio)"""
+    total = len(a) + len(b)
+    if not total:
+        return 1.0
+    counts = Counter(a)
+    matches = 0
+    for ch in b:
+        available = counts.get(ch, 0)
+        if available > 0:
+            counts[ch] = available - 1
+            matches += 1
+    return 2.0 * matches / total
+
+
+def lcs_length(a: str, b: str, min_length: int = 0) -> int:
+    """Longest common subsequence length using the bit-parallel Allison-Dix recurrence.
+
+    Returns early with a value below min_length once that length is unreachable.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0
+    positions: Dict[str, int] = {}
+    for i, ch in enumerate(a):
+        positions[ch] = positions.get(ch, 0) | (1 << i)
+
+    full = (1 << len(a)) - 1
+    row = full
+    remaining = len(b)
+    for ch in b:
+        matches = positions.get(ch)
+        remaining -= 1
+        if matches:
+            common = row & matches
+            row = ((row + common) | (row - common)) & full
+        # Every remaining character can add at most one to the LCS
+        if min_length and remaining % 8 == 0:
+            current = len(a) - bin(row).count('1')
+            if current + remaining < min_length:
+                return current
+    return len(a) - bin(row).count('1')
+
+
+def lcs_ratio(a: str, b: str, min_ratio: float = 0.0) -> float:
+    """2 * LCS / (len(a) + len(b)), or an underestimate once it cannot reach min_ratio"""
+    total = len(a) + len(b)
+    if not total:
+        return 1.0
+    min_length = int(min_ratio * total / 2.0)
+    return 2.0 * lcs_length(a, b, min_length) / total
+
+
+def sequence_ratio(a: str, b: str, min_ratio: float = 0.0) -> float:
+    """Similarity ratio in [0, 1] with early exit.
+
+    When the true ratio is below min_ratio the returned value is some number
+    below min_ratio as well, so callers that only keep the best score can pass
+    the score they need to beat.
+    """
+    if min_ratio > 0.0 and length_ratio_bound(a, b) < min_ratio:
+        return 0.0
+    if char_overlap_bound(a, b) < max(min_ratio, 1e-12):
+        return 0.0
+    if FUZZY_MATCHER == 'difflib':
+        return SequenceMatcher(None, a, b).ratio()
+    return lcs_ratio(a, b, min_ratio)
+
+
+def ratio_drift(pairs: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+    """Compare the fast ratio with SequenceMatcher.ratio() over string pairs"""
+    diffs: List[float] = []
+    for a, b in pairs:
+        total = len(a) + len(b)
+        fast = 2.0 * lcs_length(a, b) / total if total else 1.0
+        diffs.append(fast - SequenceMatcher(None, a, b).ratio())
+    if not diffs:
+        return {'pairs': 0, 'max_drift': 0.0, 'mean_drift': 0.0, 'changed': 0}
+    return {
+        'pairs': len(diffs),
+        'max_drift': max(abs(diff) for diff in diffs),
+        'mean_drift': sum(abs(diff) for diff in diffs) / len(diffs),
+        'changed': sum(1 for diff in diffs if abs(diff) > 1e-12)
+    }
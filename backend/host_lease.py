@@ -0,0 +1,72 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # No flock (Windows): every worker leads itself
+    fcntl = None
+
+
+class HostLease:
+    """Exclusive flock on a lock file, held by at most one process on the host.
+
+    The kernel releases the lock when the holder exits, however it exits, so
+    a process that keeps calling try_acquire() takes over from a dead holder.
+    The holder writes its identity into the file; others read it with holder().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Stamped on whatever the holder publishes, so readers can tell it from a previous holder's output
+        self.token = uuid.uuid4().hex
+        self.acquired_at: Optional[datetime] = None
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self.acquired_at is not None
+
+    @property
+    def supported(self) -> bool:
+        return fcntl is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lease if nobody holds it; never blocks"""
+        if self.held:
+            return True
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self.acquired_at = datetime.now()
+            identity = json.dumps({"token": self.token, "pid": os.getpid(),
+                                   "acquired_at": self.acquired_at.isoformat()}).encode('utf-8')
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, identity, 0)
+            self._fd = fd
+        else:
+            self.acquired_at = datetime.now()
+        return True
+
+    def holder(self) -> Optional[Dict[str, Any]]:
+        """Identity of the current holder, or of the last one if it has exited without a successor"""
+        if fcntl is None:
+            return {"token": self.token, "pid": os.getpid()} if self.held else None
+        try:
+            with open(self.path, 'rb') as f:
+                return json.loads(f.read() or b'null')
+        except (OSError, ValueError):  # Missing, or caught mid-write
+            return None
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.acquired_at = None
@@ -0,0 +1,577 @@
+"""Compare alternative scoring paths against the reference scorer on a fixed corpus.
+
+Usage:
+    python parity_check.py [--check all|vectorized|fuzzy|parser|listeners|sharded|bm25|suggest|snapshot] [--queries 500] [--top-n 5] [--seed 7]
+                           [--query-log queries.txt]
+
+The corpus is the seed data in ../scripts/generated-data, loaded through the
+fake Firestore client; queries are sampled from the corpus vocabulary. The
+parser check also mutates category keywords and replays --query-log (one query
+per line) when given. The listeners check writes through the fake client and
+follows each ADDED, MODIFIED and REMOVED event into the corpus and its index. The sharded check ranks on three scoring shard processes
+before and after editing the corpus, and after a reset that edits race. The bm25 check compares the early-terminating
+BM25 top N against scoring every matching document, and the incrementally
+maintained postings against ones built afresh after the edits. The suggest check
+compares /suggest completions with a scan of every document's values, before
+and after edits, and after a rebuild that edits race. The snapshot check round-trips the index through an
+on-disk snapshot, edits both copies the same way and compares them, then
+compares a copy attached read-only to a snapshot of the edited one.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore
+
+from bm25_scoring import BM25Collection, BM25Engine
+from corpus_snapshot import restore_snapshot, save_snapshot, snapshot_changes
+from corpus_store import CHANGE_ADDED, CHANGE_MODIFIED, CHANGE_REMOVED, COLLECTION_ITEM_TYPES, CorpusStore
+from doc_records import FIELD_SCHEMA, prepare_query, projected_fields, score_record, select_top_matches
+from fake_firestore import FakeFirestoreClient
+import fuzzy_match
+from query_parser import QUERY_CATEGORIES, QueryParser, reference_parse
+from search_index import CorpusIndex
+from sharded_scoring import ShardedScorer
+from typeahead import MAX_KEY_CHARS, SuggestIndex, document_values, value_key
+from vector_scoring import VectorEngine
+
+# Parses like the app with the default vocabulary, without importing the app and its logging setup
+parse_search_query = QueryParser(QUERY_CATEGORIES).parse
+
+SEED_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'generated-data')
+
+# Queries that exercise substring, number and category-keyword matching
+FIXED_QUERIES = [
+    'react', 'ml', 'ai ml', 'fintech bangalore', 'python, data science', 'iit professor',
+    'senior developer', 'rust', 'quantum', '10', 'google mentor', 'research; robotics',
+    'web development  mumbai', 'e-commerce', 'ui/ux', 'series a', 'computer science'
+]
+
+
+def load_seed_data() -> Dict[str, List[Dict]]:
+    data = {}
+    for collection_name in COLLECTION_ITEM_TYPES:
+        with open(os.path.join(SEED_DATA_DIR, f'{collection_name}.json')) as f:
+            data[collection_name] = json.load(f)
+    return data
+
+
+def load_seed_corpus() -> Tuple[CorpusStore, CorpusIndex]:
+    """Resident corpus and index built from the repository's generated seed data"""
+    data = load_seed_data()
+    store = CorpusStore()
+    index = CorpusIndex(store)
+    store.load(FakeFirestoreClient(data))
+    return store, index
+
+
+def generate_queries(store: CorpusStore, count: int, seed: int) -> List[str]:
+    """Fixed queries plus random word and word-fragment combinations from the corpus"""
+    rng = random.Random(seed)
+    vocabulary = set()
+    for collection_name in store.collections:
+        for _, data in store.documents(collection_name):
+            for value in data.values():
+                for item in (value if isinstance(value, list) else [value]):
+                    if isinstance(item, (str, int)):
+                        vocabulary.update(str(item).lower().split())
+    vocabulary = sorted(vocabulary)
+
+    queries = list(FIXED_QUERIES)
+    while len(queries) < count:
+        words = []
+        for _ in range(rng.randint(1, 4)):
+            word = rng.choice(vocabulary)
+            if len(word) > 3 and rng.random() < 0.3:
+                start = rng.randint(0, len(word) - 2)
+                word = word[start:start + rng.randint(2, len(word) - start)]
+            words.append(word)
+        queries.append(rng.choice([' ', ', ', '; ']).join(words))
+    return queries[:count]
+
+
+def reference_rankings(store: CorpusStore, index: CorpusIndex, categorized_tokens: Dict[str, List[str]],
+                       top_n: int) -> Dict[str, List[Tuple[str, float]]]:
+    """Full scan of every document with the record scorer, ties in document id order"""
+    rankings = {}
+    for collection_name, item_type in COLLECTION_ITEM_TYPES.items():
+        prepared_query = prepare_query(categorized_tokens, item_type)
+        search_index = index.indexes[collection_name]
+        matches = []
+        for record in search_index.get_records(sorted(search_index.doc_ids())):
+            score = score_record(prepared_query, record)
+            if score > 0.1:
+                matches.append((record.doc_id, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        rankings[collection_name] = matches[:top_n]
+    return rankings
+
+
+def check_vectorized(store: CorpusStore, index: CorpusIndex, queries: List[str], top_n: int, seed: int) -> int:
+    """Count queries where the vectorized engine ranks differently from the reference, on the loaded
+    corpus and then on a copy edited between queries"""
+    mismatches = compare_vectorized(VectorEngine(store, index), store, index, queries, top_n)
+    # Early edits are scored on top of the encoding, later ones after background re-encodes
+    store, index = load_seed_corpus()
+    engine = VectorEngine(store, index, reencode_after=8)
+    rng = random.Random(seed)
+
+    def edit() -> None:
+        for collection_name in store.collections:
+            documents = store.documents(collection_name)
+            doc_id, data = rng.choice(documents)
+            change_type = rng.choice([CHANGE_ADDED, CHANGE_MODIFIED, CHANGE_REMOVED])
+            if change_type == CHANGE_ADDED:
+                doc_id = f"{doc_id}_copy{rng.randint(0, 10 ** 6)}"
+            store.apply_change(collection_name, change_type, doc_id,
+                               dict(data, title=f"{data.get('title', '')} quantum robotics"))
+
+    return mismatches + compare_vectorized(engine, store, index, queries, top_n, edit)
+
+
+def compare_vectorized(engine: VectorEngine, store: CorpusStore, index: CorpusIndex, queries: List[str], top_n: int,
+                       edit=None) -> int:
+    mismatches = 0
+    for position, query in enumerate(queries):
+        if edit is not None and position % 2 == 0:
+            edit()
+        categorized_tokens = parse_search_query(query)
+        expected = reference_rankings(store, index, categorized_tokens, top_n)
+        for collection_name in COLLECTION_ITEM_TYPES:
+            actual = engine.top_matches(collection_name, categorized_tokens, top_n)
+            if actual != expected[collection_name]:
+                mismatches += 1
+                print(f"❌ vectorized mismatch for {query!r} in {collection_name}{' after edits' if edit else ''}:")
+                print(f"   expected {expected[collection_name]}")
+                print(f"   got      {actual}")
+    return mismatches
+
+
+def check_fuzzy(store: CorpusStore, index: CorpusIndex, queries: List[str], top_n: int, seed: int) -> int:
+    """Report fast-ratio drift from difflib and count rankings it changes"""
+    rng = random.Random(seed)
+    texts = [text for search_index in index.indexes.values()
+             for record in search_index.snapshot_records()[1] for _, text, _, _ in record.fields]
+    pairs = []
+    for query in queries:
+        for tokens in parse_search_query(query).values():
+            for token in tokens:
+                pairs.extend((token, rng.choice(texts)) for _ in range(5))
+    drift = fuzzy_match.ratio_drift(pairs)
+    print(f"📊 fast ratio vs difflib over {drift['pairs']} token/field pairs: "
+          f"{drift['changed']} differ, max drift {drift['max_drift']:.4f}, mean drift {drift['mean_drift']:.6f}")
+
+    previous = fuzzy_match.FUZZY_MATCHER
+    mismatches = 0
+    try:
+        for query in queries:
+            categorized_tokens = parse_search_query(query)
+            fuzzy_match.FUZZY_MATCHER = 'difflib'
+            expected = reference_rankings(store, index, categorized_tokens, top_n)
+            fuzzy_match.FUZZY_MATCHER = 'fast'
+            actual = reference_rankings(store, index, categorized_tokens, top_n)
+            for collection_name in COLLECTION_ITEM_TYPES:
+                if actual[collection_name] != expected[collection_name]:
+                    mismatches += 1
+                    print(f"❌ fuzzy ranking drift for {query!r} in {collection_name}:")
+                    print(f"   difflib {expected[collection_name]}")
+                    print(f"   fast    {actual[collection_name]}")
+    finally:
+        fuzzy_match.FUZZY_MATCHER = previous
+    return mismatches
+
+
+def check_snapshot(store: CorpusStore, index: CorpusIndex, queries: List[str], top_n: int, seed: int) -> int:
+    """Count queries whose candidates or rankings differ between the index and copies loaded from snapshots:
+    one restored and then edited like the index, and one attached to a snapshot of the edited index.
+    The changes between the two snapshots must also turn the first one's documents into the second's,
+    and a document holding Firestore's non-JSON values must read back equal from both."""
+    typed_collection = store.collections[0]
+    client = firestore.Client(project='parity-check', credentials=AnonymousCredentials())
+    typed = {'title': 'typed values', 'created': datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+             'location': firestore.GeoPoint(12.97, 77.59), 'owner': client.document('mentors/typed'),
+             'related': [client.document('faculty/typed')], 'avatar': b'\x89PNG\x00'}
+    store.apply_change(typed_collection, CHANGE_ADDED, 'typed_values', typed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'corpus.snapshot')
+        size = save_snapshot(path, store, index)
+        restored_store = CorpusStore()
+        restored_index = CorpusIndex(restored_store)
+        first = restore_snapshot(path, restored_store, restored_index)
+        print(f"📊 snapshot of {sum(store.count(name) for name in store.collections)} documents: {size} bytes")
+
+        # The same edits on both sides move documents out of the restored copy's frozen base layer
+        rng = random.Random(seed)
+        for collection_name in store.collections:
+            documents = store.documents(collection_name)
+            for doc_id, data in rng.sample(documents, min(len(documents), 10)):
+                change_type = rng.choice([CHANGE_MODIFIED, CHANGE_REMOVED])
+                changed = dict(data, description=f"{data.get('description', '')} quantum robotics")
+                for target in (store, restored_store):
+                    target.apply_change(collection_name, change_type, doc_id, changed)
+            donor_id, donor = rng.choice(documents)
+            for target in (store, restored_store):
+                target.apply_change(collection_name, CHANGE_ADDED, f'{donor_id}-copy', dict(donor))
+
+        # The edited restored copy exports its frozen and mutable layers together
+        save_snapshot(path, restored_store, restored_index)
+        attached_store = CorpusStore()
+        attached_index = CorpusIndex(attached_store)
+        second = restore_snapshot(path, attached_store, attached_index, attach=True)
+
+        mismatches = 0
+        for label, other_store in (('restored', restored_store), ('attached', attached_store)):
+            if other_store.get(typed_collection, 'typed_values') != typed:
+                mismatches += 1
+                print(f"❌ {label} document with Firestore values reads back as {other_store.get(typed_collection, 'typed_values')}")
+        changes = snapshot_changes(first, second, store.collections)
+        documents = {name: first.documents(name) for name in store.collections}
+        for collection_name, change_type, doc_id, data in changes:
+            if change_type == CHANGE_REMOVED:
+                del documents[collection_name][doc_id]
+            else:
+                documents[collection_name][doc_id] = data
+        for collection_name in store.collections:
+            if documents[collection_name] != dict(store.documents(collection_name)):
+                mismatches += 1
+                print(f"❌ changes between the snapshots do not reproduce {collection_name}")
+        print(f"📊 {len(changes)} changes between the snapshots")
+        for label, other_store, other_index in (('restored', restored_store, restored_index),
+                                                ('attached', attached_store, attached_index)):
+            for collection_name in COLLECTION_ITEM_TYPES:
+                if sorted(index.indexes[collection_name].doc_ids()) != sorted(other_index.indexes[collection_name].doc_ids()):
+                    mismatches += 1
+                    print(f"❌ {label} index of {collection_name} holds different documents")
+            for query in queries:
+                categorized_tokens = parse_search_query(query)
+                tokens = [token for category_tokens in categorized_tokens.values() for token in category_tokens]
+                expected = reference_rankings(store, index, categorized_tokens, top_n)
+                actual = reference_rankings(other_store, other_index, categorized_tokens, top_n)
+                for collection_name in COLLECTION_ITEM_TYPES:
+                    if (index.indexes[collection_name].candidates(tokens) != other_index.indexes[collection_name].candidates(tokens)
+                            or actual[collection_name] != expected[collection_name]):
+                        mismatches += 1
+                        print(f"❌ {label} index differs for {query!r} in {collection_name}:")
+                        print(f"   expected {expected[collection_name]}")
+                        print(f"   got      {actual[collection_name]}")
+        return mismatches
+
+
+def check_sharded(store: CorpusStore, index: CorpusIndex, queries: List[str], top_n: int, seed: int) -> int:
+    """Count queries whose rankings from the scoring shards differ from the reference, one at a time
+    and in batches, before and after the same edits reach both, and after a reset that edits race"""
+    scorer = ShardedScorer(store, 3)
+    scorer.start()
+    rng = random.Random(seed)
+
+    def edit() -> None:
+        for collection_name in store.collections:
+            documents = store.documents(collection_name)
+            for doc_id, data in rng.sample(documents, min(len(documents), 10)):
+                store.apply_change(collection_name, rng.choice([CHANGE_MODIFIED, CHANGE_REMOVED]), doc_id,
+                                   dict(data, title=f"{data.get('title', '')} quantum robotics"))
+
+    try:
+        mismatches = 0
+        for label in ('loaded', 'edited', 'reset'):
+            if label == 'edited':
+                edit()
+            elif label == 'reset':
+                resetting = threading.Thread(target=scorer.reset)
+                resetting.start()
+                edit()
+                resetting.join()
+            parsed = [parse_search_query(query) for query in queries]
+            expected = [reference_rankings(store, index, categorized_tokens, top_n) for categorized_tokens in parsed]
+            for collection_name in COLLECTION_ITEM_TYPES:
+                batches = [
+                    scorer.rank(collection_name, [(categorized_tokens, top_n) for categorized_tokens in parsed[start:start + 8]])
+                    for start in range(0, len(parsed), 8)
+                ]
+                single = [scorer.rank(collection_name, [(categorized_tokens, top_n)])[0] for categorized_tokens in parsed]
+                batched = [result for batch in batches for result in batch]
+                for query, rankings, (top, _, _), (batch_top, _, _) in zip(queries, expected, single, batched):
+                    if top != rankings[collection_name] or batch_top != rankings[collection_name]:
+                        mismatches += 1
+                        print(f"❌ {label} shards differ for {query!r} in {collection_name}:")
+                        print(f"   expected {rankings[collection_name]}")
+                        print(f"   got      {top} (batched {batch_top})")
+        return mismatches
+    finally:
+        scorer.stop()
+
+
+def check_bm25(store: CorpusStore, index: CorpusIndex, queries: List[str], top_n: int, seed: int) -> int:
+    """Count queries whose BM25 top N differs from a full scan, before and after edits, whose
+    scores after the edits differ from postings built from scratch, or that miss a document
+    holding the query term followed by punctuation"""
+    engine = BM25Engine(store, index)
+    mismatches = 0
+    for label in ('loaded', 'edited'):
+        if label == 'edited':
+            rng = random.Random(seed)
+            for collection_name in store.collections:
+                documents = store.documents(collection_name)
+                for doc_id, data in rng.sample(documents, min(len(documents), 10)):
+                    store.apply_change(collection_name, rng.choice([CHANGE_MODIFIED, CHANGE_REMOVED]), doc_id,
+                                       dict(data, title=f"{data.get('title', '')} quantum robotics"))
+        parsed = [parse_search_query(query) for query in queries]
+        for collection_name, item_type in COLLECTION_ITEM_TYPES.items():
+            bm25 = engine.collection(collection_name)
+            rebuilt = BM25Collection(item_type)
+            if label == 'edited':
+                for record in index.indexes[collection_name].snapshot_records()[1]:
+                    rebuilt.add(record)
+            for query, categorized_tokens in zip(queries, parsed):
+                top, _ = bm25.top_matches(categorized_tokens, top_n)
+                expected = select_top_matches(bm25.score_all(categorized_tokens), top_n)
+                if label == 'edited':
+                    # Rows are numbered in a different order, so only the scores per document must agree
+                    scores = dict(bm25.score_all(categorized_tokens))
+                    rebuilt_scores = dict(rebuilt.score_all(categorized_tokens))
+                    drift = max((abs(score - rebuilt_scores.get(doc_id, 0.0)) for doc_id, score in scores.items()), default=0.0)
+                    if scores.keys() != rebuilt_scores.keys() or drift > 1e-9:
+                        mismatches += 1
+                        print(f"❌ incremental BM25 differs from a rebuild for {query!r} in {collection_name} (drift {drift:g})")
+                        continue
+                if top != expected:
+                    mismatches += 1
+                    print(f"❌ {label} BM25 top N differs for {query!r} in {collection_name}:")
+                    print(f"   expected {expected}")
+                    print(f"   got      {top}")
+
+    # Punctuation right after a word must not keep the document from matching the bare query term
+    for collection_name, item_type in COLLECTION_ITEM_TYPES.items():
+        field = next(spec.key for spec in FIELD_SCHEMA[item_type] if spec.kind == 'text')
+        store.apply_change(collection_name, CHANGE_ADDED, 'punctuation_check', {field: 'Qwertyplan, roadmap. (Strategy!)'})
+        bm25 = engine.collection(collection_name)
+        for query in ('qwertyplan', 'roadmap', 'Strategy', 'qwertyplan.'):
+            top, _ = bm25.top_matches(parse_search_query(query), top_n)
+            if 'punctuation_check' not in {doc_id for doc_id, _ in top}:
+                mismatches += 1
+                print(f"❌ BM25 misses a punctuated match for {query!r} in {collection_name}: {top}")
+        store.apply_change(collection_name, CHANGE_REMOVED, 'punctuation_check', None)
+    return mismatches
+
+
+def scan_suggestions(store: CorpusStore, prefix: str, limit: int) -> List[Tuple[str, int, List[str]]]:
+    """(key, documents, fields) of the values with a word starting with the prefix, by a scan of every document"""
+    counts: Dict[str, Dict[str, int]] = {}
+    for collection_name in store.collections:
+        for _, data in store.documents(collection_name):
+            for field, key in document_values(data):
+                counts.setdefault(key, {})
+                counts[key][field] = counts[key].get(field, 0) + 1
+    prefix = value_key(prefix)[:MAX_KEY_CHARS]
+    matching = sorted(
+        (-sum(fields.values()), key) for key, fields in counts.items()
+        if any(word.startswith(prefix) for word in [key] + [key[i + 1:i + 1 + MAX_KEY_CHARS] for i, char in enumerate(key) if char == ' '])
+    )
+    return [(key, -count, sorted(counts[key])) for count, key in matching[:limit]]
+
+
+def check_suggest(store: CorpusStore, queries: List[str], seed: int) -> int:
+    """Count prefixes whose completions differ from a scan, before and after edits, after a rebuild
+    that edits raced on another thread, and after adding and removing a value whose indexed word
+    starts repeat once truncated to MAX_KEY_CHARS"""
+    suggestions = SuggestIndex(store)
+    suggestions.rebuild()
+    rng = random.Random(seed)
+    prefixes = sorted({word[:rng.randint(1, len(word))] for query in queries for word in query.split()}
+                      | {'ab', 'ab ab'})
+    repeated = ' '.join(['ab'] * 40)
+
+    def edit() -> None:
+        for collection_name in store.collections:
+            documents = store.documents(collection_name)
+            for doc_id, data in rng.sample(documents, min(len(documents), 10)):
+                store.apply_change(collection_name, rng.choice([CHANGE_MODIFIED, CHANGE_REMOVED]), doc_id,
+                                   dict(data, domain=rng.choice(['Quantum Robotics', 'Marine Biology']), location='Leh'))
+
+    mismatches = 0
+    for label in ('loaded', 'edited', 'rebuilt', 'repeated words added', 'repeated words removed'):
+        if label == 'edited':
+            edit()
+        elif label == 'repeated words added':
+            store.apply_change(store.collections[0], CHANGE_ADDED, 'repeated_words', {'skillsRequired': [repeated]})
+        elif label == 'repeated words removed':
+            store.apply_change(store.collections[0], CHANGE_REMOVED, 'repeated_words', None)
+        elif label == 'rebuilt':
+            rebuilding = threading.Thread(target=suggestions.rebuild)
+            rebuilding.start()
+            edit()
+            rebuilding.join()
+        for prefix in prefixes:
+            try:
+                got = [(value_key(suggestion['text']), suggestion['count'], suggestion['fields'])
+                       for suggestion in suggestions.suggest(prefix, 5)]
+            except KeyError as e:  # A value left half removed from the trie
+                got = f"KeyError: {e}"
+            expected = scan_suggestions(store, prefix, 5)
+            if got != expected:
+                mismatches += 1
+                print(f"❌ {label} completions differ for {prefix!r}:")
+                print(f"   expected {expected}")
+                print(f"   got      {got}")
+    return mismatches
+
+
+def keyword_queries(count: int, seed: int) -> List[str]:
+    """Queries built from category keywords, their fragments and keywords embedded in longer words"""
+    rng = random.Random(seed)
+    keywords = sorted({keyword for keywords in QUERY_CATEGORIES.values() for keyword in keywords})
+    queries = []
+    while len(queries) < count:
+        words = []
+        for _ in range(rng.randint(1, 5)):
+            word = rng.choice(keywords)
+            roll = rng.random()
+            if roll < 0.3:
+                start = rng.randint(0, len(word) - 1)
+                word = word[start:start + rng.randint(1, len(word) - start)]
+            elif roll < 0.6:
+                word = rng.choice(keywords)[:rng.randint(0, 4)] + word + rng.choice(keywords)[-rng.randint(0, 4):]
+            elif roll < 0.7:
+                word = word.upper()
+            words.append(word)
+        queries.append(rng.choice([' ', ', ', ';', '  ', '\t']).join(words))
+    return queries
+
+
+def check_listeners() -> int:
+    """Count failed expectations while writes through the fake client reach a projected corpus and its index
+    as listener events: set of a new document, update, update of an unprojected field, identical set, delete"""
+    client = FakeFirestoreClient(load_seed_data())
+    store = CorpusStore(projections={name: projected_fields(item_type) for name, item_type in COLLECTION_ITEM_TYPES.items()})
+    index = CorpusIndex(store)
+    store.load(client)
+    failures = 0
+
+    def expect(label: str, condition: bool) -> None:
+        nonlocal failures
+        if not condition:
+            failures += 1
+            print(f"❌ listeners: {label}")
+
+    version = store.version
+    store.start_listeners(client)
+    # The first snapshot replays every document as ADDED, all of them already resident
+    expect("the initial replay changed the corpus", store.version == version)
+    try:
+        for collection_name, item_type in COLLECTION_ITEM_TYPES.items():
+            field = FIELD_SCHEMA[item_type][0].key
+            reference = client.collection(collection_name).document('listener_check')
+
+            version = store.version
+            reference.set({field: 'Zyxquark Lab', 'unprojectedNote': 'kept out'})
+            expect(f"ADDED did not reach {collection_name}", store.version == version + 1
+                   and store.get(collection_name, 'listener_check') == {field: 'Zyxquark Lab'})
+            expect(f"ADDED is not indexed in {collection_name}",
+                   index.indexes[collection_name].candidates(['zyxquark']) == {'listener_check'})
+
+            version = store.version
+            reference.update({field: 'Qwvortex Lab'})
+            expect(f"MODIFIED did not reach {collection_name}", store.version == version + 1
+                   and store.get(collection_name, 'listener_check') == {field: 'Qwvortex Lab'})
+            expect(f"MODIFIED is not reindexed in {collection_name}",
+                   index.indexes[collection_name].candidates(['zyxquark']) == set()
+                   and index.indexes[collection_name].candidates(['qwvortex']) == {'listener_check'})
+
+            version = store.version
+            reference.update({'unprojectedNote': 'edited'})
+            reference.set(client.collection(collection_name).document('listener_check').get().to_dict())
+            expect(f"unprojected or identical writes moved the version of {collection_name}", store.version == version)
+
+            version = store.version
+            reference.delete()
+            expect(f"REMOVED did not reach {collection_name}", store.version == version + 1
+                   and store.get(collection_name, 'listener_check') is None)
+            expect(f"REMOVED is still indexed in {collection_name}",
+                   index.indexes[collection_name].candidates(['qwvortex']) == set())
+    finally:
+        store.stop_listeners()
+    return failures
+
+
+def check_parser(queries: List[str]) -> int:
+    """Count queries the compiled parser categorizes differently from the nested keyword scan"""
+    mismatches = 0
+    for query in queries:
+        expected = reference_parse(query, QUERY_CATEGORIES)
+        # The second call is served from the parse memo
+        for actual in (parse_search_query(query), parse_search_query(query)):
+            if actual != expected or list(actual) != list(expected):
+                mismatches += 1
+                print(f"❌ parser mismatch for {query!r}:")
+                print(f"   expected {expected}")
+                print(f"   got      {actual}")
+                break
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', choices=['all', 'vectorized', 'fuzzy', 'parser', 'listeners', 'sharded', 'bm25',
+                                            'suggest', 'snapshot'], default='all')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--query-log', help='file of logged queries, one per line, for the parser check')
+    args = parser.parse_args()
+
+    store, index = load_seed_corpus()
+    queries = generate_queries(store, args.queries, args.seed)
+    failed = False
+    if args.check in ('all', 'vectorized'):
+        mismatches = check_vectorized(store, index, queries, args.top_n, args.seed)
+        print(f"{'✅' if not mismatches else '❌'} vectorized engine: {mismatches} mismatched rankings over {len(queries)} queries")
+        failed = failed or bool(mismatches)
+    if args.check in ('all', 'fuzzy'):
+        mismatches = check_fuzzy(store, index, queries, args.top_n, args.seed)
+        print(f"{'✅' if not mismatches else '❌'} fast fuzzy matcher: {mismatches} rankings changed over {len(queries)} queries")
+        failed = failed or bool(mismatches)
+    if args.check in ('all', 'parser'):
+        parser_queries = queries + keyword_queries(args.queries * 10, args.seed)
+        if args.query_log:
+            with open(args.query_log) as f:
+                parser_queries.extend(line.rstrip('\n') for line in f)
+        mismatches = check_parser(parser_queries)
+        print(f"{'✅' if not mismatches else '❌'} compiled query parser: {mismatches} mismatched parses over {len(parser_queries)} queries")
+        failed = failed or bool(mismatches)
+    if args.check in ('all', 'listeners'):
+        failures = check_listeners()
+        print(f"{'✅' if not failures else '❌'} corpus listeners: {failures} failed expectations")
+        failed = failed or bool(failures)
+    # The last four edit the corpus, so each starts from a fresh copy of the seed data
+    if args.check in ('all', 'sharded'):
+        store, index = load_seed_corpus()
+        mismatches = check_sharded(store, index, queries, args.top_n, args.seed)
+        print(f"{'✅' if not mismatches else '❌'} sharded scoring: {mismatches} mismatched rankings over {len(queries)} queries")
+        failed = failed or bool(mismatches)
+    if args.check in ('all', 'bm25'):
+        store, index = load_seed_corpus()
+        mismatches = check_bm25(store, index, queries, args.top_n, args.seed)
+        print(f"{'✅' if not mismatches else '❌'} BM25 early termination: {mismatches} mismatched queries over {len(queries)} queries")
+        failed = failed or bool(mismatches)
+    if args.check in ('all', 'suggest'):
+        store, index = load_seed_corpus()
+        mismatches = check_suggest(store, queries, args.seed)
+        print(f"{'✅' if not mismatches else '❌'} typeahead completions: {mismatches} mismatched prefixes")
+        failed = failed or bool(mismatches)
+    if args.check in ('all', 'snapshot'):
+        store, index = load_seed_corpus()
+        mismatches = check_snapshot(store, index, queries, args.top_n, args.seed)
+        print(f"{'✅' if not mismatches else '❌'} snapshot restore and attach: {mismatches} mismatched queries over {len(queries)} queries")
+        failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
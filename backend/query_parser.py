@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SPLIT = re.compile(r'[;,\n\t]+|\s{2,}|\s+')
+
+GENERAL_CATEGORY = 'general'
+
+# Default query categories and their associated keywords
+QUERY_CATEGORIES = {
+    'skills': ['skill', 'technology', 'tech', 'programming', 'language', 'framework', 'tool', 'expertise', 'proficient', 'know', 'learn', 'master'],
+    'domains': ['domain', 'field', 'area', 'industry', 'sector', 'vertical', 'category', 'type', 'kind'],
+    'locations': ['location', 'place', 'city', 'remote', 'onsite', 'hybrid', 'bangalore', 'mumbai', 'delhi', 'hyderabad', 'chennai', 'pune'],
+    'companies': ['company', 'startup', 'organization', 'firm', 'enterprise', 'corporate', 'google', 'microsoft', 'amazon', 'meta', 'apple'],
+    'institutes': ['college', 'university', 'institute', 'iit', 'nit', 'bits', 'school', 'academy'],
+    'roles': ['role', 'position', 'job', 'title', 'designation', 'professor', 'mentor', 'student', 'developer', 'engineer'],
+    'experience': ['experience', 'years', 'senior', 'junior', 'fresher', 'expert', 'beginner', 'intermediate', 'advanced'],
+    'projects': ['project', 'work', 'build', 'develop', 'create', 'implement', 'design', 'research', 'study']
+}
+
+_NO_CATEGORY = float('inf')
+
+
+def tokenize_query(query: str) -> List[str]:
+    """Lowercased query tokens, split the way parse_search_query always has"""
+    tokens = TOKEN_SPLIT.split(query.lower().strip())
+    return [t.strip() for t in tokens if t.strip() and len(t) > 1]
+
+
+def reference_parse(query: str, categories: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """The original nested keyword scan, kept as the parity reference for CategoryMatcher"""
+    categorized_tokens = {category: [] for category in categories}
+    categorized_tokens[GENERAL_CATEGORY] = []
+    for token in tokenize_query(query):
+        for category, keywords in categories.items():
+            if any(keyword in token or token in keyword for keyword in keywords):
+                categorized_tokens[category].append(token)
+                break
+        else:
+            categorized_tokens[GENERAL_CATEGORY].append(token)
+    return categorized_tokens
+
+
+class CategoryMatcher:
+    """Compiled category vocabulary: the first category with a keyword that
+    contains the token or is contained in it, without scanning every keyword.
+
+    Tokens contained in a keyword are looked up in a table of every keyword
+    substring; keywords contained in a token are found with an Aho-Corasick
+    automaton, flattened into a DFA so a scan is one dict lookup per character.
+    Each state records the earliest category it matches, so the
+    smaller of the two answers is the first category the nested scan would hit.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        self._substring_category: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[float] = [_NO_CATEGORY]
+        for index, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                for start in range(len(keyword)):
+                    for end in range(start + 1, len(keyword) + 1):
+                        self._substring_category.setdefault(keyword[start:end], index)
+                self._add_keyword(keyword, index)
+        self._transitions = self._build_transitions()
+
+    def _add_keyword(self, keyword: str, index: int) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                self._goto.append({})
+                self._output.append(_NO_CATEGORY)
+                next_state = len(self._goto) - 1
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = min(self._output[state], index)
+
+    def _build_transitions(self) -> List[Dict[str, int]]:
+        goto, output = self._goto, self._output
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque()
+        for state in goto[0].values():
+            output[state] = min(output[state], output[0])
+            queue.append(state)
+        # Breadth-first, so a state's failure state is complete before the state itself
+        while queue:
+            state = queue.popleft()
+            transitions[state] = dict(transitions[fail[state]])
+            transitions[state].update(goto[state])
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0)
+                # A state also matches every keyword that ends at its failure state
+                output[next_state] = min(output[next_state], output[fail[next_state]])
+                queue.append(next_state)
+        return transitions
+
+    def _first_contained_keyword(self, token: str) -> float:
+        transitions, output = self._transitions, self._output
+        best = output[0]
+        state = 0
+        for char in token:
+            state = transitions[state].get(char, 0)
+            if output[state] < best:
+                best = output[state]
+                if best == 0:
+                    break
+        return best
+
+    def category_of(self, token: str) -> Optional[str]:
+        """First category matching the token, or None for the general bucket"""
+        index = min(self._substring_category.get(token, _NO_CATEGORY), self._first_contained_keyword(token))
+        return self.categories[index] if index != _NO_CATEGORY else None
+
+
+class QueryParser:
+    """parse_search_query backed by a CategoryMatcher, an LRU memo of parsed
+    queries and an optional vocabulary file that is reloaded when it changes"""
+
+    def __init__(self, categories: Dict[str, List[str]], vocabulary_path: Optional[str] = None,
+                 memo_size: int = 4096, check_interval: float = 5.0):
+        self.default_categories = categories
+        self.vocabulary_path = vocabulary_path
+        self.memo_size = memo_size
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._memo: 'OrderedDict[str, Tuple[Tuple[str, Tuple[str, ...]], ...]]' = OrderedDict()
+        self._vocabulary_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.matcher = CategoryMatcher(categories)
+        self.vocabulary_version = 0
+        self.hits = 0
+        self.misses = 0
+        if vocabulary_path:
+            self.reload()
+
+    def reload(self) -> bool:
+        """Recompile the vocabulary file; a missing or invalid file keeps the current vocabulary"""
+        if not self.vocabulary_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.vocabulary_path)
+            with open(self.vocabulary_path) as f:
+                categories = json.load(f)
+            if not isinstance(categories, dict) or not all(
+                isinstance(keywords, list) and all(isinstance(keyword, str) for keyword in keywords)
+                for keywords in categories.values()
+            ):
+                raise ValueError("expected an object mapping each category to a list of keywords")
+            matcher = CategoryMatcher(categories)
+        except Exception as e:
+            logger.warning(f"⚠️ Keeping current query vocabulary, could not load {self.vocabulary_path}: {e}")
+            return False
+        with self._lock:
+            self.matcher = matcher
+            self._memo.clear()
+            self._vocabulary_mtime = mtime
+            self.vocabulary_version += 1
+        logger.info(f"✅ Query vocabulary loaded from {self.vocabulary_path}: {len(categories)} categories")
+        return True
+
+    def _check_vocabulary(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.path.getmtime(self.vocabulary_path)
+        except OSError:
+            return
+        if mtime != self._vocabulary_mtime:
+            self.reload()
+
+    def parse(self, query: str) -> Dict[str, List[str]]:
+        """Parse search query into categorized tokens"""
+        if self.vocabulary_path:
+            self._check_vocabulary()
+        with self._lock:
+            parsed = self._memo.get(query)
+            if parsed is not None:
+                self._memo.move_to_end(query)
+                self.hits += 1
+            else:
+                self.misses += 1
+            matcher = self.matcher
+        if parsed is None:
+            parsed = self._parse(query, matcher)
+            if self.memo_size > 0:
+                with self._lock:
+                    if matcher is self.matcher:
+                        self._memo[query] = parsed
+                        while len(self._memo) > self.memo_size:
+                            self._memo.popitem(last=False)
+        # Callers get their own lists; the memo keeps tuples
+        return {category: list(tokens) for category, tokens in parsed}
+
+    @staticmethod
+    def _parse(query: str, matcher: CategoryMatcher) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+        categorized_tokens = {category: [] for category in matcher.categories}
+        categorized_tokens[GENERAL_CATEGORY] = []
+        for token in tokenize_query(query):
+            categorized_tokens[matcher.category_of(token) or GENERAL_CATEGORY].append(token)
+        return tuple((category, tuple(tokens)) for category, tokens in categorized_tokens.items())
+
+    def clear(self) -> None:
+        """Drop every memoized parse"""
+        with self._lock:
+            self._memo.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._memo),
+                "max_entries": self.memo_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "vocabulary_path": self.vocabulary_path,
+                "vocabulary_version": self.vocabulary_version
+            }
@@ -1,17 +1,47 @@
+import time
+
+# Reference point for cold-start timings, taken before the heavy imports below
+PROCESS_STARTED = time.perf_counter()
+
 import json
+import logging
 import os
-from typing import List, Dict, Any
-from fastapi import FastAPI, Query, HTTPException
+import threading
+from itertools import islice
+from typing import List, Dict, Any, AsyncIterator, Iterable, NamedTuple, Optional, Tuple
+from fastapi import FastAPI, Query, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
-import re
 import firebase_admin
 from firebase_admin import credentials, firestore
 from datetime import datetime
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from difflib import SequenceMatcher
+from bm25_scoring import BM25Engine
+from cached_probe import CachedProbe
+from corpus_snapshot import SnapshotError, restore_snapshot, save_snapshot, snapshot_changes
+from corpus_store import CorpusStore, COLLECTION_ITEM_TYPES
+from fake_firestore import FakeFirestoreClient
+from search_index import CorpusIndex
+from sharded_scoring import ShardedScorer
+from doc_records import DISPLAY_FIELDS, TopMatches, build_record, prepare_query, projected_fields, score_record, select_top_matches
+import fast_json
+from host_lease import HostLease
+from metrics import MetricsRegistry
+from query_parser import QUERY_CATEGORIES, QueryParser
+from result_cache import ResultCache, query_cache_key
+from single_flight import SingleFlight
+from structured_logging import configure_logging
+from typeahead import SuggestIndex
+from vector_scoring import VectorEngine
+from warmup import (PHASE_CONNECTING, PHASE_FOLLOWING, PHASE_LOADING, PHASE_READY, PHASE_RESTORING, Readiness,
+                    retry_with_backoff)
+
+# LOG_FORMAT=json emits one JSON object per line for log shippers
+configure_logging(os.environ.get('LOG_LEVEL', 'INFO'), os.environ.get('LOG_FORMAT', 'text'))
+logger = logging.getLogger('recommendation_backend')
 
 app = FastAPI(title="CollabUp Recommendation System", version="1.0.0")
 
@@ -24,44 +54,454 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Firebase Admin SDK
-try:
-    print("🔧 Initializing Firebase Admin SDK...")
-    cred = credentials.Certificate("serviceAccountKey.json")
-    print("✅ Service account key loaded successfully")
+def init_firebase():
+    """Initialize the Firebase Admin SDK and check the connection with a test read"""
+    logger.info("🔧 Initializing Firebase Admin SDK...")
+    try:
+        cred = credentials.Certificate("serviceAccountKey.json")
+    except FileNotFoundError:
+        raise RuntimeError("serviceAccountKey.json not found in backend directory")
+    logger.info("✅ Service account key loaded successfully")
     
     # Check if Firebase app is already initialized
     try:
         firebase_admin.get_app()
-        print("⚠️ Firebase app already initialized, using existing app")
+        logger.warning("⚠️ Firebase app already initialized, using existing app")
     except ValueError:
         firebase_admin.initialize_app(cred)
-        print("✅ Firebase app initialized successfully")
+        logger.info("✅ Firebase app initialized successfully")
     
-    db = firestore.client()
-    print("✅ Firestore client created successfully")
+    client = firestore.client()
+    logger.info("✅ Firestore client created successfully")
     
     # Test the connection
+    test_count = len(list(client.collection('projects').limit(1).stream()))
+    logger.info(f"✅ Firebase connection test successful. Found {test_count} documents in projects collection")
+    return client
+
+# Set by the background warm-up once Firebase is initialized
+db = None
+
+# Serve from an in-memory Firestore seeded with JSON files instead of Firebase,
+# e.g. FAKE_FIRESTORE_DATA=../scripts/generated-data for local development and benchmarks
+FAKE_FIRESTORE_DATA = os.environ.get('FAKE_FIRESTORE_DATA')
+if FAKE_FIRESTORE_DATA:
+    db = FakeFirestoreClient.from_directory(FAKE_FIRESTORE_DATA)
+    logger.info(f"🧪 Using in-memory Firestore seeded from {FAKE_FIRESTORE_DATA}")
+
+# Threads used to fetch the collections concurrently at startup
+FETCH_THREADS = int(os.environ.get('FETCH_THREADS', '4'))
+# Threads that score collections off the event loop; 0 scores inline on the loop
+SCORING_THREADS = int(os.environ.get('SCORING_THREADS', '4'))
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix='scoring') if SCORING_THREADS > 0 else None
+
+# Recommendation results keyed on the parsed query, dropped when the corpus version moves
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.environ.get('RESULT_CACHE_TTL', '300')),
+    max_bytes=int(os.environ.get('RESULT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+)
+
+# Largest number of queries accepted by /recommend/batch
+MAX_BATCH_QUERIES = int(os.environ.get('MAX_BATCH_QUERIES', '32'))
+
+# Identical /recommend queries that arrive while one is being computed share its result
+recommendation_flights = SingleFlight()
+
+# Resident copy of the collections, kept current by Firestore listeners. With
+# CORPUS_PROJECTION on, only the scored and display fields are read and kept.
+CORPUS_PROJECTION = os.environ.get('CORPUS_PROJECTION', '1') != '0'
+corpus = CorpusStore(projections={
+    collection_name: projected_fields(item_type) for collection_name, item_type in COLLECTION_ITEM_TYPES.items()
+} if CORPUS_PROJECTION else None)
+corpus_index = CorpusIndex(corpus)
+
+# Scoring engine: 'python' scores index candidates record by record,
+# 'vectorized' scores whole collections at once with NumPy
+RECOMMENDATION_ENGINE = os.environ.get('RECOMMENDATION_ENGINE', 'python').lower()
+vector_engine = VectorEngine(corpus, corpus_index)
+
+# Ranking a request uses unless it asks for another: 'similarity' is the engine's
+# fuzzy field similarity, 'bm25' ranks by BM25F over term postings kept per collection
+RANKING_SIMILARITY = 'similarity'
+RANKING_BM25 = 'bm25'
+RANKINGS = (RANKING_SIMILARITY, RANKING_BM25)
+RECOMMENDATION_RANKING = os.environ.get('RECOMMENDATION_RANKING', RANKING_SIMILARITY).lower()
+bm25_engine = BM25Engine(corpus, corpus_index)
+
+# /suggest completions from a prefix trie over skills, domains, expertise, research
+# areas, locations, institutes and companies; at most SUGGEST_MAX_RESULTS per lookup
+SUGGEST_MAX_RESULTS = int(os.environ.get('SUGGEST_MAX_RESULTS', '10'))
+suggest_index = SuggestIndex(corpus, SUGGEST_MAX_RESULTS)
+
+# The python engine scores collections of PARALLEL_SCORING_MIN_DOCUMENTS or more on
+# SCORING_PROCESSES processes, each holding a shard of every collection; they are
+# started once a collection reaches that size. Off by default: every uvicorn worker
+# would start its own pool with its own copy of the corpus. Fewer than 2 turns it off.
+SCORING_PROCESSES = int(os.environ.get('SCORING_PROCESSES', '1'))
+PARALLEL_SCORING_MIN_DOCUMENTS = int(os.environ.get('PARALLEL_SCORING_MIN_DOCUMENTS', '20000'))
+sharded_scorer = (ShardedScorer(corpus, SCORING_PROCESSES)
+                  if SCORING_PROCESSES > 1 and RECOMMENDATION_ENGINE == 'python' else None)
+# Held while the shards start, so warm-up and the request path never start them twice
+shard_start_lock = threading.Lock()
+
+# Per-stage latency histograms and document counters served on /metrics;
+# METRICS_ENABLED=0 stops recording them on the request path
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+metrics_registry = MetricsRegistry()
+stage_seconds = metrics_registry.histogram(
+    'recommendation_stage_seconds', 'Time spent in each recommendation pipeline stage', ('stage', 'collection'))
+request_seconds = metrics_registry.histogram(
+    'recommendation_request_seconds', 'Recommendation request latency by endpoint', ('endpoint',))
+documents_scanned = metrics_registry.counter(
+    'recommendation_documents_scanned_total', 'Documents scored against a query', ('collection',))
+documents_matched = metrics_registry.counter(
+    'recommendation_documents_matched_total', 'Scored documents above the recommendation threshold', ('collection',))
+corpus_documents = metrics_registry.gauge(
+    'recommendation_corpus_documents', 'Resident documents per collection', ('collection',))
+corpus_fetch_seconds = metrics_registry.gauge(
+    'recommendation_corpus_fetch_seconds', 'Duration of the last full read of each collection', ('collection',))
+corpus_version_gauge = metrics_registry.gauge('recommendation_corpus_version', 'Resident corpus version')
+cache_lookups = metrics_registry.counter(
+    'recommendation_cache_lookups_total', 'Result cache and query parse memo lookups', ('cache', 'result'))
+result_cache_bytes = metrics_registry.gauge('recommendation_result_cache_bytes', 'Serialized bytes held by the result cache')
+collapsed_requests = metrics_registry.counter(
+    'recommendation_collapsed_requests_total', 'Requests that shared an identical in-flight computation')
+corpus_stale = metrics_registry.gauge(
+    'recommendation_corpus_stale', '1 while serving a restored snapshot that Firestore has not confirmed yet')
+corpus_leader = metrics_registry.gauge(
+    'recommendation_corpus_leader', '1 on a worker that loads the corpus itself, 0 on one attached to a leader\'s snapshots')
+startup_seconds = metrics_registry.gauge(
+    'recommendation_startup_seconds', 'Seconds from process start until the worker was warm or first served a request',
+    ('milestone',))
+
+def observe_stage(stage: str, collection_name: str, seconds: float) -> None:
+    """Record the duration of one pipeline stage"""
+    if METRICS_ENABLED:
+        stage_seconds.observe(seconds, stage, collection_name)
+
+def count_documents(collection_name: str, scanned: int, matched: int) -> None:
+    """Record how many documents were scored and how many cleared the threshold"""
+    if METRICS_ENABLED:
+        documents_scanned.inc(collection_name, amount=scanned)
+        documents_matched.inc(collection_name, amount=matched)
+
+def observe_request(endpoint: str, started: float) -> None:
+    """Record the latency of a request that began at time.perf_counter() `started`"""
+    if METRICS_ENABLED:
+        request_seconds.observe(time.perf_counter() - started, endpoint)
+
+# Firebase init and corpus loading are retried with exponential backoff;
+# WARMUP_ATTEMPTS=0 keeps retrying until they succeed
+WARMUP_ATTEMPTS = int(os.environ.get('WARMUP_ATTEMPTS', '5'))
+WARMUP_BACKOFF_SECONDS = float(os.environ.get('WARMUP_BACKOFF_SECONDS', '1'))
+WARMUP_MAX_BACKOFF_SECONDS = float(os.environ.get('WARMUP_MAX_BACKOFF_SECONDS', '30'))
+readiness = Readiness(PROCESS_STARTED)
+warmup_task = None
+
+# The corpus and its indexes are snapshotted to this file and restored from it at
+# startup, so a restarted worker serves at once, and keeps serving the last known
+# corpus while Firestore is unreachable; an empty path turns snapshots off
+CORPUS_SNAPSHOT_PATH = os.environ.get(
+    'CORPUS_SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'corpus.snapshot'))
+# How often the snapshot is rewritten when the indexes have changed
+CORPUS_SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get('CORPUS_SNAPSHOT_INTERVAL_SECONDS', '300'))
+restored_snapshot = None
+snapshot_task = None
+# Index versions of the snapshot on disk, so an unchanged corpus is not written again
+snapshot_versions = None
+snapshot_stats: Dict[str, Any] = {"written_at": None, "bytes": None, "seconds": None, "error": None}
+# When Firestore stopped confirming the loaded corpus, which is then served stale until it does again
+corpus_outage_since: Optional[datetime] = None
+reload_task = None
+probe_task = None
+
+# With CORPUS_SHARING=1 the workers of one host share the snapshot file. The worker
+# holding the lease next to it loads the corpus, listens to Firestore and republishes
+# the snapshot every CORPUS_PUBLISH_SECONDS if it changed; the others attach to each
+# published snapshot read-only and take over the lease if the leader exits.
+CORPUS_SHARING = os.environ.get('CORPUS_SHARING', '0') != '0' and bool(CORPUS_SNAPSHOT_PATH)
+CORPUS_PUBLISH_SECONDS = float(os.environ.get('CORPUS_PUBLISH_SECONDS', '5'))
+CORPUS_ATTACH_POLL_SECONDS = float(os.environ.get('CORPUS_ATTACH_POLL_SECONDS', '1'))
+host_lease = HostLease(CORPUS_SNAPSHOT_PATH + '.lock') if CORPUS_SHARING else None
+if host_lease is not None and not host_lease.supported:
+    # Without flock every worker would hold the lease at once; each loads its own corpus instead
+    logger.warning("⚠️ CORPUS_SHARING needs flock, which this platform lacks; workers will not share the corpus")
+    host_lease = None
+
+def index_versions() -> Tuple[int, ...]:
+    return tuple(corpus_index.indexes[name].version for name in corpus.collections)
+
+def corpus_role() -> str:
+    """'leader' or 'follower' when workers share the corpus, otherwise 'standalone'"""
+    if host_lease is None:
+        return 'standalone'
+    return 'leader' if host_lease.held else 'follower'
+
+async def connect_firestore() -> None:
+    global db
+    db = await asyncio.get_running_loop().run_in_executor(None, init_firebase)
+
+async def load_corpus() -> None:
+    """Load the corpus, subscribe to incremental changes and warm the scoring engine"""
+    loop = asyncio.get_running_loop()
+    logger.info("📊 Loading recommendation corpus...")
+    await loop.run_in_executor(None, corpus.load, db, FETCH_THREADS)
+    corpus.start_listeners(db)
+    await warm_scoring(reset=False)
+    counts = ", ".join(f"{name}={corpus.count(name)}" for name in corpus.collections)
+    logger.info(f"✅ Corpus loaded (version {corpus.version}): {counts}")
+
+def track_firestore_outage() -> None:
+    """Serve the loaded corpus as stale while the Firestore probe fails or a listener has stopped,
+    reloading it in the background once the listeners are gone; clears when both recover"""
+    global corpus_outage_since, reload_task
+    if corpus_role() == 'follower' or not readiness.ready or not corpus.loaded:
+        return
+    listening = corpus.listening
+    if firestore_probe.error is None and listening:
+        if corpus_outage_since is not None:
+            corpus_outage_since = None
+            corpus.stale = False
+            logger.info("✅ Firestore is confirming the corpus again")
+        return
+    if corpus_outage_since is None:
+        corpus_outage_since = datetime.now()
+        corpus.stale = True
+        logger.warning(f"⚠️ {'Corpus listeners stopped' if not listening else 'Firestore probe failed'}; "
+                       f"serving the corpus stale")
+    if not listening and (reload_task is None or reload_task.done()):
+        # The listeners do not come back by themselves; a reload resyncs the corpus and restarts them
+        reload_task = asyncio.ensure_future(retry_with_backoff(
+            'corpus_reload', load_corpus, readiness, 0, WARMUP_BACKOFF_SECONDS, WARMUP_MAX_BACKOFF_SECONDS))
+
+async def watch_firestore() -> None:
+    """Refresh the Firestore probe on its own schedule, so an outage marks the corpus stale
+    even when no health checks arrive"""
+    while True:
+        await asyncio.sleep(max(firestore_probe.refresh_seconds, 1.0))
+        if db:
+            try:
+                await firestore_probe.get()
+            except Exception:  # Kept in firestore_probe.error, which the tracking below reads
+                pass
+        track_firestore_outage()
+
+async def restore_corpus() -> None:
+    """Serve the last snapshot until Firestore answers; a missing or unusable snapshot is skipped"""
+    global restored_snapshot, snapshot_versions
+    if not CORPUS_SNAPSHOT_PATH or not os.path.exists(CORPUS_SNAPSHOT_PATH):
+        return
+    readiness.enter(PHASE_RESTORING)
+    loop = asyncio.get_running_loop()
+    try:
+        restored_snapshot = await loop.run_in_executor(None, restore_snapshot, CORPUS_SNAPSHOT_PATH, corpus, corpus_index)
+    except (OSError, ValueError, SnapshotError) as e:
+        logger.warning(f"⚠️ Ignoring corpus snapshot {CORPUS_SNAPSHOT_PATH}: {e}")
+        return
+    snapshot_versions = index_versions()
+    await warm_scoring(reset=True)
+    counts = ", ".join(f"{name}={corpus.count(name)}" for name in corpus.collections)
+    logger.info(f"💾 Restored corpus snapshot from {restored_snapshot.created_at.isoformat()}: {counts}")
+
+async def attach_published(attached: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """Attach to the snapshot file if it was replaced since the one identified by `attached`;
+    returns the identity of the file now attached"""
+    global restored_snapshot
     try:
-        test_collection = db.collection('projects').limit(1).stream()
-        test_count = len(list(test_collection))
-        print(f"✅ Firebase connection test successful. Found {test_count} documents in projects collection")
+        stat = os.stat(CORPUS_SNAPSHOT_PATH)
+    except FileNotFoundError:  # The leader has not published yet
+        return attached
+    if (stat.st_ino, stat.st_mtime_ns) == attached:
+        return attached
+    # Only a snapshot published by the live leader is current; one left by an earlier leader is stale
+    leader = (host_lease.holder() or {}).get('token')
+    loop = asyncio.get_running_loop()
+    # Nothing but attaching changes a follower's corpus, so the snapshot it holds is what engines keeping
+    # their own copies were built from, and they can take the difference to the new one
+    previous = restored_snapshot if restored_snapshot is not None and \
+        restored_snapshot.header['corpus_version'] == corpus.version else None
+    try:
+        snapshot = await loop.run_in_executor(
+            None, lambda: restore_snapshot(CORPUS_SNAPSHOT_PATH, corpus, corpus_index, attach=True, publisher=leader))
+    except (OSError, ValueError, SnapshotError) as e:
+        logger.warning(f"⚠️ Ignoring corpus snapshot {CORPUS_SNAPSHOT_PATH}: {e}")
+        return (stat.st_ino, stat.st_mtime_ns)
+    restored_snapshot = snapshot
+    changes = None
+    if previous is not None:
+        changes = await loop.run_in_executor(None, snapshot_changes, previous, snapshot, corpus.collections)
+    await warm_scoring(reset=True, changes=changes)
+    logger.info(f"🔗 Attached corpus snapshot version {corpus.version}{' (stale)' if corpus.stale else ''}")
+    return snapshot.identity
+
+async def warm_scoring(reset: bool, changes: Optional[List[Tuple[str, str, str, Optional[Dict[str, Any]]]]] = None) -> None:
+    """Build what the configured engine, ranking and /suggest read before the first request asks;
+    `reset` means a restored or attached snapshot replaced the corpus without change events, and
+    `changes`, when known, are the documents that differ from the snapshot it replaced"""
+    loop = asyncio.get_running_loop()
+    if reset:
+        vector_engine.invalidate()
+        bm25_engine.invalidate()
+    if changes is not None:
+        await loop.run_in_executor(None, suggest_index.apply, changes)
+    await loop.run_in_executor(None, suggest_index.rebuild if reset and changes is None else suggest_index.warm)
+    if RECOMMENDATION_ENGINE == 'vectorized':
+        await loop.run_in_executor(None, lambda: [vector_engine.view(name) for name in corpus.collections])
+    if RECOMMENDATION_RANKING == RANKING_BM25:
+        await loop.run_in_executor(None, lambda: [bm25_engine.collection(name) for name in corpus.collections])
+    await sync_scoring_shards(reset, changes)
+
+async def sync_scoring_shards(reset: bool, changes: Optional[List[Tuple[str, str, str, Optional[Dict[str, Any]]]]] = None) -> None:
+    """Start the scoring shards once a collection is large enough; with `reset`, bring running shards
+    up to a corpus a restored or attached snapshot replaced without change events, by its `changes`
+    when they are known and by resending the corpus otherwise"""
+    if sharded_scorer is None or sharded_scorer.error is not None:
+        return
+    loop = asyncio.get_running_loop()
+    if sharded_scorer.ready:
+        if changes is not None:
+            sharded_scorer.apply(changes)
+        elif reset:
+            await loop.run_in_executor(None, sharded_scorer.reset)
+        return
+    if max(corpus.count(name) for name in corpus.collections) >= PARALLEL_SCORING_MIN_DOCUMENTS:
+        await loop.run_in_executor(None, start_scoring_shards)
+
+def start_scoring_shards() -> None:
+    """Start the scoring shards unless they are running, starting or failed; requests score in process until then"""
+    if not shard_start_lock.acquire(blocking=False):
+        return
+    try:
+        if sharded_scorer.ready or sharded_scorer.error is not None:
+            return
+        started = time.perf_counter()
+        try:
+            sharded_scorer.start()
+        except Exception as e:  # Scoring in process still works, so this must not fail the warm-up
+            sharded_scorer.error = str(e)
+            sharded_scorer.stop()
+            logger.error(f"❌ Starting the scoring shards failed, scoring in process: {e}")
+            return
+        logger.info(f"⚙️ Scoring collections of {PARALLEL_SCORING_MIN_DOCUMENTS}+ documents on "
+                    f"{SCORING_PROCESSES} processes (started in {time.perf_counter() - started:.2f}s)")
+    finally:
+        shard_start_lock.release()
+
+async def follow_leader() -> None:
+    """Serve the snapshots the host's corpus leader publishes until this worker takes over the lease"""
+    readiness.enter(PHASE_FOLLOWING)
+    # Followers never read the corpus from Firestore, but hydrated responses still need a client
+    connecting = None
+    if not db:
+        connecting = asyncio.ensure_future(retry_with_backoff(
+            'firebase_init', connect_firestore, readiness, 0, WARMUP_BACKOFF_SECONDS, WARMUP_MAX_BACKOFF_SECONDS))
+    attached = None
+    try:
+        while not host_lease.try_acquire():
+            attached = await attach_published(attached)
+            if corpus.loaded and not readiness.ready:
+                readiness.enter(PHASE_READY)
+                logger.info(f"✅ Following the corpus leader, ready {readiness.ready_seconds:.2f}s after process start")
+            await asyncio.sleep(CORPUS_ATTACH_POLL_SECONDS)
+    except BaseException:
+        if connecting is not None:
+            connecting.cancel()
+        raise
+    logger.info("👑 Took over as the host's corpus leader")
+    if connecting is not None:
+        await connecting
+
+async def write_snapshots() -> None:
+    """Rewrite the snapshot whenever the indexes have changed, checking every CORPUS_SNAPSHOT_INTERVAL_SECONDS
+    (CORPUS_PUBLISH_SECONDS when followers read it)"""
+    global snapshot_versions
+    loop = asyncio.get_running_loop()
+    publisher = host_lease.token if host_lease is not None else None
+    while True:
+        versions = index_versions()
+        if versions != snapshot_versions:
+            started = time.perf_counter()
+            try:
+                size = await loop.run_in_executor(
+                    None, lambda: save_snapshot(CORPUS_SNAPSHOT_PATH, corpus, corpus_index, publisher=publisher))
+            except Exception as e:  # Keep snapshotting; the next pass retries with whatever changed since
+                snapshot_stats["error"] = str(e)
+                logger.warning(f"⚠️ Writing corpus snapshot failed: {e}", exc_info=not isinstance(e, OSError))
+            else:
+                if size is not None:
+                    snapshot_versions = versions
+                    snapshot_stats.update(written_at=datetime.now().isoformat(), bytes=size,
+                                          seconds=time.perf_counter() - started, error=None)
+                    logger.info(f"💾 Wrote corpus snapshot ({size} bytes) in {snapshot_stats['seconds']:.2f}s")
+        await asyncio.sleep(CORPUS_PUBLISH_SECONDS if host_lease is not None else CORPUS_SNAPSHOT_INTERVAL_SECONDS)
+
+async def start_corpus():
+    """Restore the last snapshot, connect to Firestore, load the corpus and warm the indexes,
+    retrying each step with backoff; a worker sharing the corpus follows the leader until it leads"""
+    global snapshot_task, snapshot_versions, probe_task
+    try:
+        if host_lease is not None and not host_lease.try_acquire():
+            await follow_leader()
+            # Nobody keeps the attached corpus current until this worker has loaded it
+            if corpus.loaded:
+                corpus.stale = True
+        if not corpus.loaded:
+            await restore_corpus()
+        # A worker already serving a snapshot keeps trying to reach Firestore for as long as it runs
+        attempts = 0 if corpus.loaded else WARMUP_ATTEMPTS
+        if not db:
+            readiness.enter(PHASE_CONNECTING)
+            await retry_with_backoff('firebase_init', connect_firestore, readiness, attempts,
+                                     WARMUP_BACKOFF_SECONDS, WARMUP_MAX_BACKOFF_SECONDS)
+        readiness.enter(PHASE_LOADING)
+        await retry_with_backoff('corpus_load', load_corpus, readiness, attempts,
+                                 WARMUP_BACKOFF_SECONDS, WARMUP_MAX_BACKOFF_SECONDS)
+        readiness.enter(PHASE_READY)
+        logger.info(f"✅ Ready {readiness.ready_seconds:.2f}s after process start",
+                    extra={"phase_seconds": readiness.phase_seconds})
+        if host_lease is not None:
+            # Publish at once, stamped with this leader's token, so followers see a current corpus
+            snapshot_versions = None
     except Exception as e:
-        print(f"❌ Firebase connection test failed: {e}")
-        db = None
-        
-except FileNotFoundError:
-    print("❌ serviceAccountKey.json not found in backend directory")
-    db = None
-except Exception as e:
-    print(f"❌ Error initializing Firebase: {e}")
-    import traceback
-    traceback.print_exc()
-    db = None
+        readiness.fail(e)
+        logger.error(f"❌ Warm-up failed: {e}")
+        return
+    if CORPUS_SNAPSHOT_PATH and snapshot_task is None:
+        snapshot_task = asyncio.ensure_future(write_snapshots())
+    if probe_task is None:
+        probe_task = asyncio.ensure_future(watch_firestore())
+
+@app.on_event("startup")
+async def start_warmup():
+    """Return at once and warm up in the background; /health/ready turns 200 when it is done"""
+    global warmup_task
+    warmup_task = asyncio.ensure_future(start_corpus())
+
+@app.on_event("shutdown")
+async def stop_corpus():
+    """Stop the warm-up and snapshot writer, detach the corpus listeners and stop the scoring threads"""
+    for task in (warmup_task, snapshot_task, reload_task, probe_task):
+        if task is not None:
+            task.cancel()
+    corpus.stop_listeners()
+    if host_lease is not None:
+        host_lease.release()
+    if scoring_executor is not None:
+        scoring_executor.shutdown(wait=False)
+    if sharded_scorer is not None:
+        sharded_scorer.stop()
 
 class SearchInput(BaseModel):
     query: str
     top_n: int = 5
+    use_cache: bool = True
+    # Only ids, display fields and scores
+    compact: bool = False
+    # Whole documents read back from Firestore instead of the resident fields
+    hydrate: bool = False
+    # 'similarity' or 'bm25'; RECOMMENDATION_RANKING when not given
+    ranking: Optional[str] = None
 
 class RecommendationResponse(BaseModel):
     student_projects: List[Dict[str, Any]]
@@ -69,394 +509,661 @@ class RecommendationResponse(BaseModel):
     mentor_profiles: List[Dict[str, Any]]
     research_projects: List[Dict[str, Any]]
 
-# Define query categories and their associated keywords
-QUERY_CATEGORIES = {
-    'skills': ['skill', 'technology', 'tech', 'programming', 'language', 'framework', 'tool', 'expertise', 'proficient', 'know', 'learn', 'master'],
-    'domains': ['domain', 'field', 'area', 'industry', 'sector', 'vertical', 'category', 'type', 'kind'],
-    'locations': ['location', 'place', 'city', 'remote', 'onsite', 'hybrid', 'bangalore', 'mumbai', 'delhi', 'hyderabad', 'chennai', 'pune'],
-    'companies': ['company', 'startup', 'organization', 'firm', 'enterprise', 'corporate', 'google', 'microsoft', 'amazon', 'meta', 'apple'],
-    'institutes': ['college', 'university', 'institute', 'iit', 'nit', 'bits', 'school', 'academy'],
-    'roles': ['role', 'position', 'job', 'title', 'designation', 'professor', 'mentor', 'student', 'developer', 'engineer'],
-    'experience': ['experience', 'years', 'senior', 'junior', 'fresher', 'expert', 'beginner', 'intermediate', 'advanced'],
-    'projects': ['project', 'work', 'build', 'develop', 'create', 'implement', 'design', 'research', 'study']
-}
+class RecommendationPayload(NamedTuple):
+    """Serialized /recommend body with per-category result counts for logging"""
+    body: bytes
+    counts: Dict[str, int]
+
+# Response views: resident fields, compact display fields, or hydrated full documents
+VIEW_RESIDENT = 'resident'
+VIEW_COMPACT = 'compact'
+VIEW_HYDRATED = 'hydrated'
+
+# Compiled category matcher with a memo of parsed queries. QUERY_VOCABULARY_PATH
+# points at a JSON file of {category: [keywords]} that replaces QUERY_CATEGORIES
+# and is reloaded when it changes.
+query_parser = QueryParser(
+    QUERY_CATEGORIES,
+    vocabulary_path=os.environ.get('QUERY_VOCABULARY_PATH') or None,
+    memo_size=int(os.environ.get('QUERY_PARSE_CACHE_SIZE', '4096')),
+    check_interval=float(os.environ.get('QUERY_VOCABULARY_CHECK_SECONDS', '5'))
+)
 
 def parse_search_query(query: str) -> Dict[str, List[str]]:
     """Parse search query into categorized tokens"""
-    query_lower = query.lower().strip()
-    
-    # Split on various delimiters
-    tokens = re.split(r'[;,\n\t]+|\s{2,}|\s+', query_lower)
-    tokens = [t.strip() for t in tokens if t.strip() and len(t) > 1]
-    
-    categorized_tokens = {
-        'skills': [],
-        'domains': [],
-        'locations': [],
-        'companies': [],
-        'institutes': [],
-        'roles': [],
-        'experience': [],
-        'projects': [],
-        'general': []
-    }
+    return query_parser.parse(query)
+
+def calculate_similarity_score(categorized_tokens: Dict[str, List[str]], item_data: Dict[str, Any], item_type: str) -> float:
+    """Calculate comprehensive similarity score between query and item data"""
+    record = build_record(item_data.get('id'), item_data, item_type)
+    return score_record(prepare_query(categorized_tokens, item_type), record)
+
+# Candidates scored between top-N merges, so scoring and selection are timed apart in bounded memory
+SCORE_BATCH_SIZE = 4096
+
+def rank_collection(collection_name: str, categorized_tokens: Dict[str, List[str]], top_n: int,
+                    ranking: str = RANKING_SIMILARITY) -> List[tuple]:
+    """Top (doc_id, score) pairs of one collection using the requested ranking and the configured scoring engine"""
+    if ranking == RANKING_BM25:
+        return rank_collection_bm25(collection_name, categorized_tokens, top_n)
+    if RECOMMENDATION_ENGINE == 'vectorized':
+        started = time.perf_counter()
+        view = vector_engine.view(collection_name)
+        fetched = time.perf_counter()
+        if top_n <= 0 or not len(view):
+            return []
+        scores = view.score(categorized_tokens)
+        scored = time.perf_counter()
+        top, matched = view.select_top(scores, top_n)
+        observe_stage('fetch', collection_name, fetched - started)
+        observe_stage('score', collection_name, scored - fetched)
+        observe_stage('select', collection_name, time.perf_counter() - scored)
+        count_documents(collection_name, len(view), matched)
+        return top
+    if sharded(collection_name):
+        try:
+            return rank_collection_sharded(collection_name, [(categorized_tokens, top_n)])[0]
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"⚠️ Sharded scoring failed, scoring in process: {e}")
     
-    for token in tokens:
-        categorized = False
-        
-        # Check each category
-        for category, keywords in QUERY_CATEGORIES.items():
-            if any(keyword in token or token in keyword for keyword in keywords):
-                categorized_tokens[category].append(token)
-                categorized = True
-                break
-        
-        # If not categorized, add to general
-        if not categorized:
-            categorized_tokens['general'].append(token)
+    # Score only the documents the index says can match, keeping a bounded top-N between batches
+    item_type = COLLECTION_ITEM_TYPES[collection_name]
+    index = corpus_index.indexes[collection_name]
+    started = time.perf_counter()
+    prepared_query = prepare_query(categorized_tokens, item_type)
+    query_tokens = [token for tokens in categorized_tokens.values() for token in tokens]
+    candidate_ids = index.candidates(query_tokens)
+    observe_stage('fetch', collection_name, time.perf_counter() - started)
+    logger.debug("Scoring %d candidates", len(candidate_ids), extra={"collection": collection_name})
     
-    return categorized_tokens
+    records = index.iter_records(candidate_ids)
+    top: List[Tuple[str, float]] = []
+    scanned = matched = 0
+    score_seconds = select_seconds = 0.0
+    while True:
+        started = time.perf_counter()
+        batch_matches, batch_scanned = score_records(prepared_query, islice(records, SCORE_BATCH_SIZE))
+        scored = time.perf_counter()
+        if batch_matches:
+            top = select_top_matches(top + batch_matches, top_n)
+        score_seconds += scored - started
+        select_seconds += time.perf_counter() - scored
+        scanned += batch_scanned
+        matched += len(batch_matches)
+        if batch_scanned < SCORE_BATCH_SIZE:
+            break
+    observe_stage('score', collection_name, score_seconds)
+    observe_stage('select', collection_name, select_seconds)
+    count_documents(collection_name, scanned, matched)
+    return top
 
-def calculate_fuzzy_similarity(text1: str, text2: str) -> float:
-    """Calculate fuzzy similarity between two strings"""
-    if not text1 or not text2:
-        return 0.0
-    
-    text1_lower = text1.lower()
-    text2_lower = text2.lower()
+def rank_collection_batch(collection_name: str, queries: List[Tuple[Dict[str, List[str]], int]]) -> List[List[tuple]]:
+    """Top (doc_id, score) pairs for several (categorized_tokens, top_n) queries in one pass over the collection"""
+    if RECOMMENDATION_ENGINE == 'vectorized':
+        return [rank_collection(collection_name, categorized_tokens, top_n) for categorized_tokens, top_n in queries]
+    if sharded(collection_name):
+        try:
+            return rank_collection_sharded(collection_name, queries)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"⚠️ Sharded scoring failed, scoring in process: {e}")
     
-    # Exact match gets highest score
-    if text1_lower == text2_lower:
-        return 1.0
+    item_type = COLLECTION_ITEM_TYPES[collection_name]
+    index = corpus_index.indexes[collection_name]
+    started = time.perf_counter()
+    prepared_queries = [prepare_query(categorized_tokens, item_type) for categorized_tokens, _ in queries]
+    candidate_sets = [
+        index.candidates([token for tokens in categorized_tokens.values() for token in tokens])
+        for categorized_tokens, _ in queries
+    ]
+    fetched = time.perf_counter()
     
-    # Contains match
-    if text1_lower in text2_lower or text2_lower in text1_lower:
-        return 0.8
+    # Walk every document any query can match once, scoring it against each query that can match it
+    matches = [TopMatches(top_n, SCORE_BATCH_SIZE) for _, top_n in queries]
+    for record in index.iter_records(set().union(*candidate_sets)):
+        token_scores = {}  # Tokens shared by several queries are compared with the record's fields once
+        for query_matches, prepared_query, candidate_ids in zip(matches, prepared_queries, candidate_sets):
+            if record.doc_id in candidate_ids:
+                score = score_record(prepared_query, record, token_scores)
+                if score > 0.1:
+                    query_matches.add(record.doc_id, score)
+    scored = time.perf_counter()
+    top = [query_matches.top() for query_matches in matches]
     
-    # Word-level matching
-    words1 = set(text1_lower.split())
-    words2 = set(text2_lower.split())
+    observe_stage('fetch', collection_name, fetched - started)
+    observe_stage('score', collection_name, scored - fetched)
+    observe_stage('select', collection_name, time.perf_counter() - scored)
+    scanned = sum(len(ids) for ids in candidate_sets)
+    count_documents(collection_name, scanned, sum(query_matches.matched for query_matches in matches))
+    logger.debug("Scored %d candidates for %d queries", scanned, len(queries), extra={"collection": collection_name})
+    return top
+
+def rank_collection_bm25(collection_name: str, categorized_tokens: Dict[str, List[str]], top_n: int) -> List[tuple]:
+    """Top (doc_id, score) pairs of one collection by BM25F, skipping documents that cannot reach the top N"""
+    started = time.perf_counter()
+    bm25 = bm25_engine.collection(collection_name)  # Built from the index on first use
+    fetched = time.perf_counter()
+    top, scored = bm25.top_matches(categorized_tokens, top_n)
+    observe_stage('fetch', collection_name, fetched - started)
+    observe_stage('score', collection_name, time.perf_counter() - fetched)
+    # Every document BM25 scores contains a query term, so all of them count as matches
+    count_documents(collection_name, scored, scored)
+    logger.debug("Scored %d of %d documents by BM25", scored, len(bm25), extra={"collection": collection_name})
+    return top
+
+def sharded(collection_name: str) -> bool:
+    """Whether a collection is ranked by the scoring shards, starting them in the background
+    when the collection has grown past the threshold since warm-up"""
+    if sharded_scorer is None or corpus.count(collection_name) < PARALLEL_SCORING_MIN_DOCUMENTS:
+        return False
+    if not sharded_scorer.ready and sharded_scorer.error is None and not shard_start_lock.locked():
+        threading.Thread(target=start_scoring_shards, name='scoring-shards-start', daemon=True).start()
+    return sharded_scorer.ready
+
+def rank_collection_sharded(collection_name: str, queries: List[Tuple[Dict[str, List[str]], int]]) -> List[List[tuple]]:
+    """Top (doc_id, score) pairs for (categorized_tokens, top_n) queries, ranked in parallel by the scoring shards"""
+    started = time.perf_counter()
+    results = sharded_scorer.rank(collection_name, queries)
+    # Candidate lookup, scoring and the shards' own selection all happen in the shard processes
+    observe_stage('score', collection_name, time.perf_counter() - started)
+    count_documents(collection_name, sum(scanned for _, scanned, _ in results), sum(matched for _, _, matched in results))
+    logger.debug("Ranked %d queries on %d scoring shards", len(queries), SCORING_PROCESSES,
+                 extra={"collection": collection_name})
+    return [top for top, _, _ in results]
+
+def score_records(prepared_query: tuple, records: Iterable) -> Tuple[List[Tuple[str, float]], int]:
+    """(doc_id, score) pairs above the recommendation threshold and the number of records scored"""
+    matches = []
+    scanned = 0
+    for record in records:
+        scanned += 1
+        score = score_record(prepared_query, record)
+        if score > 0.1:  # Lower threshold for better recall
+            matches.append((record.doc_id, score))
+    return matches, scanned
+
+def recommend_collection(collection_name: str, categorized_tokens: Dict[str, List[str]], top_n: int,
+                         view: str = VIEW_RESIDENT, ranking: str = RANKING_SIMILARITY) -> List[Dict[str, Any]]:
+    """Rank one collection and build its response documents"""
+    logger.debug("🔍 Processing %s...", COLLECTION_ITEM_TYPES[collection_name].replace('_', ' '))
+    return build_result_documents(collection_name, rank_collection(collection_name, categorized_tokens, top_n, ranking), view)
+
+def recommend_collection_batch(collection_name: str,
+                               queries: List[Tuple[Dict[str, List[str]], int, str, str]]) -> List[List[Dict[str, Any]]]:
+    """Rank one collection for several (categorized_tokens, top_n, view, ranking) queries and build their documents"""
+    logger.debug("🔍 Processing %s for %d queries...", COLLECTION_ITEM_TYPES[collection_name].replace('_', ' '), len(queries))
+    # Similarity queries share one pass over the collection; BM25 queries each walk their own postings
+    similarity = [position for position, query in enumerate(queries) if query[3] != RANKING_BM25]
+    ranked: List[List[tuple]] = [[] for _ in queries]
+    if similarity:
+        batch = rank_collection_batch(collection_name, [queries[position][:2] for position in similarity])
+        for position, matches in zip(similarity, batch):
+            ranked[position] = matches
+    for position, (categorized_tokens, top_n, _, ranking) in enumerate(queries):
+        if ranking == RANKING_BM25:
+            ranked[position] = rank_collection_bm25(collection_name, categorized_tokens, top_n)
+    return [build_result_documents(collection_name, matches, view) for matches, (_, _, view, _) in zip(ranked, queries)]
+
+async def run_scoring(func, *args):
+    """Run CPU-bound scoring on the scoring executor, or inline when it is disabled"""
+    if scoring_executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(scoring_executor, func, *args)
+
+def build_result_documents(collection_name: str, matches: List[tuple], view: str = VIEW_RESIDENT) -> List[Dict[str, Any]]:
+    """Turn (doc_id, score) pairs into response documents from the resident corpus"""
+    display_fields = DISPLAY_FIELDS[COLLECTION_ITEM_TYPES[collection_name]]
+    documents = []
+    for doc_id, score in matches:
+        doc_data = corpus.get(collection_name, doc_id)
+        if doc_data is None:
+            continue
+        if view == VIEW_COMPACT:
+            data = {field: doc_data[field] for field in display_fields if field in doc_data}
+        else:
+            data = dict(doc_data)
+        data['id'] = doc_id
+        data['similarity_score'] = score
+        documents.append(data)
+    return documents
+
+def hydrate_documents(collection_name: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace resident documents with their full Firestore documents in one batched read"""
+    if not documents:
+        return documents
+    started = time.perf_counter()
+    collection = db.collection(collection_name)
+    snapshots = db.get_all([collection.document(doc['id']) for doc in documents])
+    full_documents = {snapshot.id: snapshot.to_dict() for snapshot in snapshots if snapshot.exists}
+    hydrated = []
+    for doc in documents:
+        data = full_documents.get(doc['id'])
+        if data is None:  # Deleted since it was ranked
+            continue
+        data['id'] = doc['id']
+        data['similarity_score'] = doc['similarity_score']
+        hydrated.append(data)
+    observe_stage('hydrate', collection_name, time.perf_counter() - started)
+    return hydrated
+
+def encode_recommendations(results: Dict[str, List[Dict[str, Any]]]) -> RecommendationPayload:
+    """Serialize results straight to JSON, skipping per-document pydantic validation"""
+    started = time.perf_counter()
+    body = fast_json.dumps(results)
+    observe_stage('serialize', 'all', time.perf_counter() - started)
+    return RecommendationPayload(
+        body=body,
+        counts={item_type: len(documents) for item_type, documents in results.items()}
+    )
+
+async def compute_recommendations(categorized_tokens: Dict[str, List[str]], top_n: int, view: str,
+                                  ranking: str, cache_key: tuple) -> RecommendationPayload:
+    """Score every collection for a parsed query and cache the serialized response"""
+    corpus_version = corpus.version
     
-    if words1 and words2:
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        if union:
-            jaccard_similarity = len(intersection) / len(union)
-            return jaccard_similarity * 0.6
+    # Score the four collections concurrently, off the event loop
+    ranked = await asyncio.gather(*(
+        run_scoring(recommend_collection, collection_name, categorized_tokens, top_n, view, ranking)
+        for collection_name in COLLECTION_ITEM_TYPES
+    ))
+    return await finish_recommendations(ranked, view, cache_key, corpus_version)
+
+async def compute_batch_recommendations(queries: List[Tuple[Dict[str, List[str]], int, str, str, tuple]]) -> List[RecommendationPayload]:
+    """Score several parsed (categorized_tokens, top_n, view, ranking, cache_key) queries with one pass per collection"""
+    corpus_version = corpus.version
+    scoring_queries = [query[:4] for query in queries]
     
-    # Sequence matcher for partial matches
-    return SequenceMatcher(None, text1_lower, text2_lower).ratio() * 0.4
+    # One scoring task per collection covers every query in the batch
+    ranked = await asyncio.gather(*(
+        run_scoring(recommend_collection_batch, collection_name, scoring_queries)
+        for collection_name in COLLECTION_ITEM_TYPES
+    ))
+    return await asyncio.gather(*(
+        finish_recommendations([collection_results[position] for collection_results in ranked], view, cache_key, corpus_version)
+        for position, (_, _, view, _, cache_key) in enumerate(queries)
+    ))
 
-def calculate_similarity_score(categorized_tokens: Dict[str, List[str]], item_data: Dict[str, Any], item_type: str) -> float:
-    """Calculate comprehensive similarity score between query and item data"""
-    score = 0.0
+async def finish_recommendations(ranked: List[List[Dict[str, Any]]], view: str, cache_key: tuple,
+                                 corpus_version: int) -> RecommendationPayload:
+    """Hydrate, serialize and cache per-collection results, given in COLLECTION_ITEM_TYPES order"""
+    if view == VIEW_HYDRATED:
+        loop = asyncio.get_running_loop()
+        ranked = await asyncio.gather(*(
+            loop.run_in_executor(None, hydrate_documents, collection_name, documents)
+            for collection_name, documents in zip(COLLECTION_ITEM_TYPES, ranked)
+        ))
+    result = encode_recommendations(dict(zip(COLLECTION_ITEM_TYPES.values(), ranked)))
     
-    # Extract all text fields from the item
-    all_text_fields = []
+    # Edits to unprojected fields do not move the corpus version, so hydrated bodies are not cached
+    if result_cache.enabled and view != VIEW_HYDRATED:
+        result_cache.put(cache_key, corpus_version, result, len(result.body))
+    return result
+
+def response_view(compact: bool, hydrate: bool) -> str:
+    """Response view for the request flags; hydrating an unprojected corpus reads it from memory,
+    as does hydrating while only a restored snapshot is available"""
+    if compact:
+        return VIEW_COMPACT
+    if hydrate and corpus.projected and db:
+        return VIEW_HYDRATED
+    return VIEW_RESIDENT
+
+def stream_event(event: str, payload: Dict[str, Any], sse: bool) -> bytes:
+    """One NDJSON line, or one Server-Sent Event named after the event"""
+    data = fast_json.dumps(payload)
+    if sse:
+        return b'event: ' + event.encode('utf-8') + b'\ndata: ' + data + b'\n\n'
+    return data + b'\n'
+
+async def rank_category(collection_name: str, categorized_tokens: Dict[str, List[str]], top_n: int,
+                        view: str, ranking: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """Response documents of one collection, hydrated when the view asks for it"""
+    documents = await run_scoring(recommend_collection, collection_name, categorized_tokens, top_n, view, ranking)
+    if view == VIEW_HYDRATED:
+        documents = await asyncio.get_running_loop().run_in_executor(None, hydrate_documents, collection_name, documents)
+    return collection_name, documents
+
+async def stream_recommendations(categorized_tokens: Dict[str, List[str]], top_n: int, view: str, ranking: str,
+                                 cache_key: tuple, use_cache: bool, sse: bool,
+                                 started: float) -> AsyncIterator[bytes]:
+    """Emit each category as soon as its ranking completes, then a final 'done' event"""
+    results: Dict[str, List[Dict[str, Any]]] = {}
     
-    if item_type == "student_projects":
-        # Student projects fields
-        title = item_data.get('title', '')
-        description = item_data.get('description', '')
-        skills_required = item_data.get('skillsRequired', [])
-        domain = item_data.get('domain', '')
-        difficulty = item_data.get('difficulty', '')
-        type_project = item_data.get('type', '')
-        
-        all_text_fields = [
-            ('title', title, 3.0),
-            ('description', description, 1.5),
-            ('domain', domain, 2.5),
-            ('difficulty', difficulty, 1.0),
-            ('type', type_project, 1.0)
-        ]
-        
-        # Handle skills array
-        for skill in skills_required:
-            all_text_fields.append(('skill', skill, 2.0))
-            
-    elif item_type == "startup_projects":
-        # Startup fields
-        name = item_data.get('name', '')
-        description = item_data.get('description', '')
-        domain = item_data.get('domain', '')
-        location = item_data.get('location', '')
-        mission = item_data.get('mission', '')
-        founder = item_data.get('founder', '')
-        funding = item_data.get('funding', '')
-        
-        all_text_fields = [
-            ('name', name, 3.0),
-            ('description', description, 1.5),
-            ('domain', domain, 2.5),
-            ('location', location, 1.5),
-            ('mission', mission, 2.0),
-            ('founder', founder, 1.0),
-            ('funding', funding, 0.5)
-        ]
-        
-    elif item_type == "mentor_profiles":
-        # Mentor fields
-        name = item_data.get('name', '')
-        expertise = item_data.get('expertise', [])
-        bio = item_data.get('bio', '')
-        current_company = item_data.get('currentCompany', '')
-        designation = item_data.get('designation', '')
-        experience = str(item_data.get('experience', ''))
-        
-        all_text_fields = [
-            ('name', name, 2.0),
-            ('bio', bio, 1.5),
-            ('currentCompany', current_company, 2.0),
-            ('designation', designation, 1.5),
-            ('experience', experience, 1.0)
+    cached = result_cache.get(cache_key, corpus.version) if use_cache and result_cache.enabled else None
+    if cached is not None or not any(categorized_tokens.values()):
+        cached_results = json.loads(cached.body) if cached is not None else {}
+        for item_type in COLLECTION_ITEM_TYPES.values():
+            results[item_type] = cached_results.get(item_type, [])
+            yield stream_event(item_type, {"category": item_type, "results": results[item_type]}, sse)
+    else:
+        corpus_version = corpus.version
+        tasks = [
+            asyncio.ensure_future(rank_category(collection_name, categorized_tokens, top_n, view, ranking))
+            for collection_name in COLLECTION_ITEM_TYPES
         ]
+        try:
+            for next_ranked in asyncio.as_completed(tasks):
+                collection_name, documents = await next_ranked
+                item_type = COLLECTION_ITEM_TYPES[collection_name]
+                results[item_type] = documents
+                yield stream_event(item_type, {"category": item_type, "results": documents}, sse)
+        finally:
+            # The client went away or a collection failed; stop waiting on the rest
+            for task in tasks:
+                task.cancel()
         
-        # Handle expertise array
-        for exp in expertise:
-            all_text_fields.append(('expertise', exp, 3.0))
-            
-    elif item_type == "research_projects":
-        # Faculty/Research fields
-        name = item_data.get('name', '')
-        research_areas = item_data.get('researchAreas', [])
-        bio = item_data.get('bio', '')
-        department = item_data.get('department', '')
-        institute = item_data.get('institute', '')
-        designation = item_data.get('designation', '')
-        experience = str(item_data.get('experience', ''))
-        
-        all_text_fields = [
-            ('name', name, 2.0),
-            ('bio', bio, 1.5),
-            ('department', department, 2.0),
-            ('institute', institute, 1.5),
-            ('designation', designation, 1.5),
-            ('experience', experience, 1.0)
-        ]
-        
-        # Handle research areas array
-        for area in research_areas:
-            all_text_fields.append(('researchArea', area, 3.0))
-    
-    # Calculate scores for each category of tokens
-    for category, tokens in categorized_tokens.items():
-        if not tokens:
-            continue
-            
-        for token in tokens:
-            max_token_score = 0.0
-            
-            # Check against all text fields
-            for field_name, field_value, field_weight in all_text_fields:
-                if not field_value:
-                    continue
-                
-                # Convert field value to string if it's not already
-                field_str = str(field_value)
-                
-                # Calculate similarity
-                similarity = calculate_fuzzy_similarity(token, field_str)
-                token_score = similarity * field_weight
-                
-                max_token_score = max(max_token_score, token_score)
-            
-            # Add category-specific bonuses
-            if category == 'skills' and item_type in ['student_projects', 'mentor_profiles']:
-                max_token_score *= 1.2
-            elif category == 'domains' and item_type in ['student_projects', 'startup_projects']:
-                max_token_score *= 1.2
-            elif category == 'companies' and item_type == 'mentor_profiles':
-                max_token_score *= 1.2
-            elif category == 'institutes' and item_type == 'research_projects':
-                max_token_score *= 1.2
-            elif category == 'locations' and item_type == 'startup_projects':
-                max_token_score *= 1.2
-            
-            score += max_token_score
-    
-    # Add bonus for having multiple matching tokens
-    total_tokens = sum(len(tokens) for tokens in categorized_tokens.values())
-    if total_tokens > 1 and score > 0:
-        score *= 1.1  # 10% bonus for multiple matches
+        if result_cache.enabled and view != VIEW_HYDRATED:
+            result = encode_recommendations({item_type: results[item_type] for item_type in COLLECTION_ITEM_TYPES.values()})
+            result_cache.put(cache_key, corpus_version, result, len(result.body))
     
-    return score
+    counts = {item_type: len(documents) for item_type, documents in results.items()}
+    logger.debug("✅ Streamed %d total recommendations", sum(counts.values()))
+    yield stream_event("done", {"done": True, "counts": counts, "stale": corpus.stale}, sse)
+    observe_request('recommend_stream', started)
+    readiness.served_request()
 
-async def get_recommendations_from_firebase(query: str, top_n: int = 5) -> RecommendationResponse:
-    """Get recommendations from Firebase collections"""
+def request_ranking(ranking: Optional[str]) -> str:
+    """The ranking a request asked for, or the configured default; 400 for an unknown one"""
+    if ranking is None:
+        return RECOMMENDATION_RANKING
+    if ranking.lower() not in RANKINGS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranking '{ranking}', expected one of: {', '.join(RANKINGS)}")
+    return ranking.lower()
+
+def require_db() -> None:
+    """Fail the request unless Firestore is available: 503 while warming up, 500 once warm-up has given up"""
     if not db:
+        if readiness.warming:
+            raise HTTPException(status_code=503, detail="Backend is starting up", headers={"Retry-After": "1"})
         raise HTTPException(status_code=500, detail="Firebase not initialized")
+
+def require_corpus() -> None:
+    """Recommendations only need the resident corpus, which a restored snapshot provides before Firestore does"""
+    if not corpus.loaded:
+        require_db()
+
+def corpus_headers() -> Dict[str, str]:
+    """Mark responses ranked against a corpus Firestore has not confirmed: a restored snapshot not
+    reloaded yet, or the loaded corpus while Firestore or its listeners are down"""
+    track_firestore_outage()
+    if not corpus.stale:
+        return {}
+    headers = {"X-Corpus-Stale": "true"}
+    confirmed_at = corpus_outage_since or (restored_snapshot.created_at if restored_snapshot is not None else None)
+    if confirmed_at is not None:
+        headers["X-Corpus-Snapshot-Age"] = str(int((datetime.now() - confirmed_at).total_seconds()))
+    return headers
+
+async def get_recommendations_from_firebase(query: str, top_n: int = 5, use_cache: bool = True,
+                                            compact: bool = False, hydrate: bool = False,
+                                            ranking: Optional[str] = None) -> RecommendationPayload:
+    """Get recommendations from Firebase collections"""
+    require_corpus()
+    ranking = request_ranking(ranking)
     
-    print(f"🔍 Processing query: '{query}'")
+    logger.debug("🔍 Processing query: '%s'", query)
     
     # Parse query into categories
+    started = time.perf_counter()
     categorized_tokens = parse_search_query(query)
-    print(f"📝 Query categories: {categorized_tokens}")
+    observe_stage('parse', 'all', time.perf_counter() - started)
+    logger.debug("📝 Query categories: %s", categorized_tokens)
     
     # Check if we have any meaningful tokens
     total_tokens = sum(len(tokens) for tokens in categorized_tokens.values())
     if total_tokens == 0:
-        print("⚠️ No meaningful tokens found in query")
-        return RecommendationResponse(
-            student_projects=[],
-            startup_projects=[],
-            mentor_profiles=[],
-            research_projects=[]
-        )
+        logger.debug("⚠️ No meaningful tokens found in query")
+        return encode_recommendations({item_type: [] for item_type in COLLECTION_ITEM_TYPES.values()})
+    
+    if not corpus.loaded:
+        raise HTTPException(status_code=503, detail="Recommendation corpus not loaded yet")
+    
+    view = response_view(compact, hydrate)
+    cache_key = query_cache_key(categorized_tokens, top_n) + (view, ranking)
+    if use_cache and result_cache.enabled:
+        cached = result_cache.get(cache_key, corpus.version)
+        if cached is not None:
+            logger.debug("⚡ Serving cached recommendations")
+            return cached
     
     try:
-        # Fetch data from correct collections
-        projects_ref = db.collection('projects')
-        startups_ref = db.collection('startups')
-        mentors_ref = db.collection('mentors')
-        faculty_ref = db.collection('faculty')
-        
-        print("📊 Fetching data from collections...")
-        
-        # Get documents from each collection
-        projects_docs = projects_ref.stream()
-        startups_docs = startups_ref.stream()
-        mentors_docs = mentors_ref.stream()
-        faculty_docs = faculty_ref.stream()
-        
-        # Convert to dictionaries and calculate scores
-        student_projects = []
-        startup_projects = []
-        mentor_profiles = []
-        research_projects = []
-        
-        # Process projects (student projects)
-        print("🔍 Processing student projects...")
-        for doc in projects_docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            score = calculate_similarity_score(categorized_tokens, data, "student_projects")
-            if score > 0.1:  # Lower threshold for better recall
-                data['similarity_score'] = score
-                student_projects.append(data)
-        print(f"   Found {len(student_projects)} matching student projects")
-        
-        # Process startups (startup projects)
-        print("🔍 Processing startup projects...")
-        for doc in startups_docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            score = calculate_similarity_score(categorized_tokens, data, "startup_projects")
-            if score > 0.1:
-                data['similarity_score'] = score
-                startup_projects.append(data)
-        print(f"   Found {len(startup_projects)} matching startup projects")
-        
-        # Process mentors (mentor profiles)
-        print("🔍 Processing mentor profiles...")
-        for doc in mentors_docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            score = calculate_similarity_score(categorized_tokens, data, "mentor_profiles")
-            if score > 0.1:
-                data['similarity_score'] = score
-                mentor_profiles.append(data)
-        print(f"   Found {len(mentor_profiles)} matching mentor profiles")
-        
-        # Process faculty (research projects)
-        print("🔍 Processing research projects...")
-        for doc in faculty_docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            score = calculate_similarity_score(categorized_tokens, data, "research_projects")
-            if score > 0.1:
-                data['similarity_score'] = score
-                research_projects.append(data)
-        print(f"   Found {len(research_projects)} matching research projects")
-        
-        # Sort by similarity score and get top N
-        student_projects.sort(key=lambda x: x['similarity_score'], reverse=True)
-        startup_projects.sort(key=lambda x: x['similarity_score'], reverse=True)
-        mentor_profiles.sort(key=lambda x: x['similarity_score'], reverse=True)
-        research_projects.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        result = RecommendationResponse(
-            student_projects=student_projects[:top_n],
-            startup_projects=startup_projects[:top_n],
-            mentor_profiles=mentor_profiles[:top_n],
-            research_projects=research_projects[:top_n]
+        result = await recommendation_flights.do(
+            cache_key, lambda: compute_recommendations(categorized_tokens, top_n, view, ranking, cache_key)
         )
         
-        print(f"✅ Final results: {len(result.student_projects)} + {len(result.startup_projects)} + {len(result.mentor_profiles)} + {len(result.research_projects)} = {len(result.student_projects) + len(result.startup_projects) + len(result.mentor_profiles) + len(result.research_projects)} total")
-        
+        logger.debug("✅ Final results: %s", result.counts)
         return result
     except Exception as e:
-        print(f"❌ Error fetching recommendations: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error fetching recommendations: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching recommendations: {str(e)}")
 
+async def get_batch_recommendations(inputs: List[SearchInput]) -> List[RecommendationPayload]:
+    """Recommendations for several queries, scoring the uncached ones together"""
+    require_corpus()
+    
+    payloads: List[Any] = [None] * len(inputs)
+    # cache_key -> (categorized_tokens, top_n, view, ranking, positions); identical queries are scored once
+    pending: Dict[tuple, Tuple[Dict[str, List[str]], int, str, str, List[int]]] = {}
+    rankings = [request_ranking(search_input.ranking) for search_input in inputs]
+    for position, (search_input, ranking) in enumerate(zip(inputs, rankings)):
+        started = time.perf_counter()
+        categorized_tokens = parse_search_query(search_input.query)
+        observe_stage('parse', 'all', time.perf_counter() - started)
+        if not any(categorized_tokens.values()):
+            payloads[position] = encode_recommendations({item_type: [] for item_type in COLLECTION_ITEM_TYPES.values()})
+            continue
+        if not corpus.loaded:
+            raise HTTPException(status_code=503, detail="Recommendation corpus not loaded yet")
+        
+        view = response_view(search_input.compact, search_input.hydrate)
+        cache_key = query_cache_key(categorized_tokens, search_input.top_n) + (view, ranking)
+        if search_input.use_cache and result_cache.enabled and cache_key not in pending:
+            cached = result_cache.get(cache_key, corpus.version)
+            if cached is not None:
+                payloads[position] = cached
+                continue
+        pending.setdefault(cache_key, (categorized_tokens, search_input.top_n, view, ranking, []))[4].append(position)
+    
+    if pending:
+        logger.debug("🔍 Scoring %d distinct queries of a batch of %d", len(pending), len(inputs))
+        computed = await compute_batch_recommendations([
+            (categorized_tokens, top_n, view, ranking, cache_key)
+            for cache_key, (categorized_tokens, top_n, view, ranking, _) in pending.items()
+        ])
+        for (_, _, _, _, positions), payload in zip(pending.values(), computed):
+            for position in positions:
+                payloads[position] = payload
+    return payloads
+
 @app.post('/recommend', response_model=RecommendationResponse)
 async def recommend_profiles(input: SearchInput):
     """
     Get recommendations from all collections based on search query
     """
+    started = time.perf_counter()
     try:
-        print(f"🔍 Recommendation request: {input.query}")
-        recommendations = await get_recommendations_from_firebase(input.query, input.top_n)
+        logger.debug("🔍 Recommendation request: %s", input.query)
+        recommendations = await get_recommendations_from_firebase(
+            input.query, input.top_n, input.use_cache, input.compact, input.hydrate, input.ranking
+        )
         
         # Log the results
-        total_results = (len(recommendations.student_projects) + 
-                        len(recommendations.startup_projects) + 
-                        len(recommendations.mentor_profiles) + 
-                        len(recommendations.research_projects))
+        counts = recommendations.counts
+        logger.debug("✅ Found %d total recommendations", sum(counts.values()), extra={"counts": counts})
         
-        print(f"✅ Found {total_results} total recommendations")
-        print(f"   Student Projects: {len(recommendations.student_projects)}")
-        print(f"   Startup Projects: {len(recommendations.startup_projects)}")
-        print(f"   Mentor Profiles: {len(recommendations.mentor_profiles)}")
-        print(f"   Research Projects: {len(recommendations.research_projects)}")
-        
-        return recommendations
+        # The body is already JSON; returning a Response skips response_model validation
+        observe_request('recommend', started)
+        readiness.served_request()
+        return Response(content=recommendations.body, media_type="application/json", headers=corpus_headers())
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error in recommendation endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error in recommendation endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting recommendations: {str(e)}")
 
+@app.post('/recommend/batch', response_model=List[RecommendationResponse])
+async def recommend_profiles_batch(inputs: List[SearchInput]):
+    """
+    Get recommendations for a list of search queries, one response per query in request order
+    """
+    if len(inputs) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    started = time.perf_counter()
+    try:
+        logger.debug("🔍 Batch recommendation request: %d queries", len(inputs))
+        payloads = await get_batch_recommendations(inputs)
+        logger.debug("✅ Found %d total recommendations", sum(sum(payload.counts.values()) for payload in payloads))
+        observe_request('recommend_batch', started)
+        readiness.served_request()
+        return Response(content=b'[' + b','.join(payload.body for payload in payloads) + b']', media_type="application/json",
+                        headers=corpus_headers())
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"❌ Error in batch recommendation endpoint: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting recommendations: {str(e)}")
+
+@app.post('/recommend/stream')
+async def recommend_profiles_stream(input: SearchInput, request: Request):
+    """
+    Stream recommendations one category at a time as NDJSON, or as Server-Sent
+    Events when the client accepts text/event-stream
+    """
+    require_corpus()
+    ranking = request_ranking(input.ranking)
+    
+    logger.debug("🔍 Streaming recommendation request: %s", input.query)
+    started = time.perf_counter()
+    categorized_tokens = parse_search_query(input.query)
+    observe_stage('parse', 'all', time.perf_counter() - started)
+    if any(categorized_tokens.values()) and not corpus.loaded:
+        raise HTTPException(status_code=503, detail="Recommendation corpus not loaded yet")
+    
+    view = response_view(input.compact, input.hydrate)
+    cache_key = query_cache_key(categorized_tokens, input.top_n) + (view, ranking)
+    sse = 'text/event-stream' in request.headers.get('accept', '')
+    return StreamingResponse(
+        stream_recommendations(categorized_tokens, input.top_n, view, ranking, cache_key, input.use_cache, sse, started),
+        media_type='text/event-stream' if sse else 'application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **corpus_headers()}
+    )
+
+@app.get('/recommend/stream')
+async def recommend_profiles_stream_get(request: Request,
+                                        query: str = Query(..., description="Search query"),
+                                        top_n: int = 5, use_cache: bool = True,
+                                        compact: bool = False, hydrate: bool = False,
+                                        ranking: Optional[str] = None):
+    """
+    GET form of /recommend/stream for EventSource clients
+    """
+    search_input = SearchInput(query=query, top_n=top_n, use_cache=use_cache, compact=compact, hydrate=hydrate,
+                               ranking=ranking)
+    return await recommend_profiles_stream(search_input, request)
+
+@app.get('/suggest')
+async def suggest(q: str = Query(..., description="What the user has typed so far"),
+                  limit: int = Query(5, ge=1, description="Completions to return")):
+    """
+    Complete a partial skill, domain, expertise, research area, location, institute or company,
+    most frequent first
+    """
+    require_corpus()
+    started = time.perf_counter()
+    # Off the event loop, so a lookup waiting for the index lock never stalls other requests
+    suggestions = await asyncio.get_running_loop().run_in_executor(
+        None, suggest_index.suggest, q, min(limit, SUGGEST_MAX_RESULTS))
+    observe_request('suggest', started)
+    return Response(content=fast_json.dumps({"query": q, "suggestions": suggestions}), media_type="application/json",
+                    headers=corpus_headers())
+
+def probe_firestore() -> Dict[str, Any]:
+    """One small Firestore read that shows whether the database is reachable"""
+    started = time.perf_counter()
+    list(db.collection('projects').limit(1).stream())
+    return {"latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+def count_collection(collection_name: str) -> int:
+    """Document count from a Firestore aggregation query, which does not read the documents"""
+    result = db.collection(collection_name).count(alias='count').get()
+    return int(result[0][0].value)
+
+def count_collections() -> Dict[str, int]:
+    return {collection_name: count_collection(collection_name) for collection_name in COLLECTION_ITEM_TYPES}
+
+# Probes and counts are cached so frequent health checks and dashboards don't multiply Firestore reads
+firestore_probe = CachedProbe(probe_firestore, float(os.environ.get('HEALTH_PROBE_SECONDS', '30')))
+collection_counts = CachedProbe(count_collections, float(os.environ.get('COLLECTIONS_INFO_REFRESH_SECONDS', '60')))
+
+async def readiness_report() -> Dict[str, Any]:
+    """Cached Firestore connectivity, warm-up progress and the resident corpus's freshness"""
+    firebase_status = "not connected"
+    probe: Dict[str, Any] = {}
+    if db:
+        try:
+            probe = await firestore_probe.get()
+            firebase_status = "connected" if firestore_probe.error is None else "error"
+        except Exception:
+            firebase_status = "error"
+        probe = {**probe, **firestore_probe.stats()}
+    track_firestore_outage()
+    
+    collections_info = {
+        collection_name: {
+            "status": "resident" if corpus.loaded else "not loaded",
+            "documents": corpus.count(collection_name),
+            "version": corpus.collection_versions[collection_name]
+        }
+        for collection_name in corpus.collections
+    }
+    if corpus_role() == 'follower':
+        # Followers serve whatever the leader last published
+        ready = corpus.loaded
+    else:
+        # A worker serving a restored snapshot, or its loaded corpus through a Firestore outage, is ready
+        # in degraded mode until Firestore confirms the corpus
+        ready = corpus.loaded and (corpus.stale or (readiness.ready and firebase_status == "connected"))
+    return {
+        "status": ("degraded" if corpus.stale else "healthy") if ready else "unhealthy",
+        "ready": ready,
+        "firebase_status": firebase_status,
+        "firebase_probe": probe,
+        "startup": readiness.stats(),
+        "corpus": {
+            "loaded": corpus.loaded,
+            "listening": corpus.listening,
+            "stale": corpus.stale,
+            "outage_since": corpus_outage_since.isoformat() if corpus_outage_since else None,
+            "version": corpus.version,
+            "last_updated": corpus.last_updated.isoformat() if corpus.last_updated else None,
+            "age_seconds": (datetime.now() - corpus.last_updated).total_seconds() if corpus.last_updated else None
+        },
+        "collections": collections_info,
+        "snapshot": {
+            "path": CORPUS_SNAPSHOT_PATH or None,
+            "restored_from": restored_snapshot.created_at.isoformat() if restored_snapshot else None,
+            **snapshot_stats
+        },
+        "sharing": {
+            "role": corpus_role(),
+            "pid": os.getpid(),
+            "leader": host_lease.holder() if host_lease is not None else None
+        },
+        "ranking": {
+            "default": RECOMMENDATION_RANKING,
+            "bm25_collections": bm25_engine.stats()
+        },
+        "sharded_scoring": {
+            "min_documents": PARALLEL_SCORING_MIN_DOCUMENTS,
+            **sharded_scorer.stats()
+        } if sharded_scorer is not None else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get('/health')
 async def health_check():
     """Health check endpoint"""
     try:
-        status = "healthy"
-        firebase_status = "connected"
-        collections_info = {}
-        
-        if not db:
-            status = "unhealthy"
-            firebase_status = "not connected"
-        else:
-            # Test Firebase connection by checking collections
-            try:
-                collections = ['projects', 'startups', 'mentors', 'faculty']
-                for collection_name in collections:
-                    try:
-                        docs = list(db.collection(collection_name).limit(1).stream())
-                        collections_info[collection_name] = {
-                            "status": "accessible",
-                            "sample_count": len(docs)
-                        }
-                    except Exception as e:
-                        collections_info[collection_name] = {
-                            "status": "error",
-                            "error": str(e)
-                        }
-                        firebase_status = "partial"
-            except Exception as e:
-                firebase_status = "error"
-                status = "unhealthy"
-        
-        return {
-            "status": status,
-            "firebase_status": firebase_status,
-            "collections": collections_info,
-            "timestamp": datetime.now().isoformat()
-        }
+        return await readiness_report()
     except Exception as e:
         return {
             "status": "error",
@@ -464,18 +1171,29 @@ async def health_check():
             "timestamp": datetime.now().isoformat()
         }
 
+@app.get('/health/live')
+async def liveness_check():
+    """Liveness probe: the process is serving requests; never touches Firestore"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get('/health/ready')
+async def readiness_check():
+    """Readiness probe: 200 once warm-up has finished and Firestore is reachable, or while a restored
+    snapshot or the loaded corpus is served stale; 503 until then"""
+    report = await readiness_report()
+    return JSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
 @app.get('/debug-query')
 async def debug_query(query: str = Query(..., description="Search query to debug")):
     """Debug endpoint to understand query processing"""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firebase not initialized")
+    require_db()
     
     try:
-        print(f"🔍 Debugging query: {query}")
+        logger.debug(f"🔍 Debugging query: {query}")
         
         # Parse query into categories
         categorized_tokens = parse_search_query(query)
-        print(f"📝 Categorized tokens: {categorized_tokens}")
+        logger.debug(f"📝 Categorized tokens: {categorized_tokens}")
         
         # Get sample data from each collection
         sample_data = {}
@@ -487,11 +1205,11 @@ async def debug_query(query: str = Query(..., description="Search query to debug
                 docs = list(db.collection(collection_name).limit(1).stream())
                 if docs:
                     sample_data[collection_name] = docs[0].to_dict()
-                    print(f"✅ Got sample from {collection_name}")
+                    logger.debug(f"✅ Got sample from {collection_name}")
                 else:
-                    print(f"⚠️ No data in {collection_name}")
+                    logger.debug(f"⚠️ No data in {collection_name}")
             except Exception as e:
-                print(f"❌ Error getting sample from {collection_name}: {e}")
+                logger.warning(f"❌ Error getting sample from {collection_name}: {e}")
         
         # Calculate sample scores
         sample_scores = {}
@@ -509,9 +1227,9 @@ async def debug_query(query: str = Query(..., description="Search query to debug
                 elif collection_name == 'faculty':
                     score = calculate_similarity_score(categorized_tokens, data, "research_projects")
                     sample_scores['research_projects'] = score
-                print(f"📊 Score for {collection_name}: {sample_scores.get(list(sample_scores.keys())[-1] if sample_scores else 'unknown')}")
+                logger.debug(f"📊 Score for {collection_name}: {sample_scores.get(list(sample_scores.keys())[-1] if sample_scores else 'unknown')}")
             except Exception as e:
-                print(f"❌ Error calculating score for {collection_name}: {e}")
+                logger.warning(f"❌ Error calculating score for {collection_name}: {e}")
                 sample_scores[collection_name] = 0.0
         
         result = {
@@ -521,28 +1239,61 @@ async def debug_query(query: str = Query(..., description="Search query to debug
             "sample_data": sample_data
         }
         
-        print(f"✅ Debug result: {result}")
+        logger.debug(f"✅ Debug result: {result}")
         return result
         
     except Exception as e:
-        print(f"❌ Error in debug endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error in debug endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Error debugging query: {str(e)}")
 
+@app.get('/cache-stats')
+async def get_cache_stats():
+    """Recommendation result cache and request coalescing counters"""
+    return {
+        **result_cache.stats(),
+        "corpus_version": corpus.version,
+        "single_flight": recommendation_flights.stats(),
+        "query_parser": query_parser.stats()
+    }
+
+@app.get('/metrics')
+async def get_metrics():
+    """Prometheus text exposition of the pipeline histograms, counters and cache state"""
+    for collection_name in corpus.collections:
+        corpus_documents.set(collection_name, value=corpus.count(collection_name))
+    for collection_name, seconds in corpus.fetch_seconds.items():
+        corpus_fetch_seconds.set(collection_name, value=seconds)
+    corpus_version_gauge.set(value=corpus.version)
+    corpus_stale.set(value=1 if corpus.stale else 0)
+    corpus_leader.set(value=0 if corpus_role() == 'follower' else 1)
+    
+    # Mirror the totals the caches already keep rather than counting on the request path
+    cache = result_cache.stats()
+    parser = query_parser.stats()
+    for cache_name, stats in (('result', cache), ('query_parser', parser)):
+        cache_lookups.set(cache_name, 'hit', value=stats['hits'])
+        cache_lookups.set(cache_name, 'miss', value=stats['misses'])
+    result_cache_bytes.set(value=cache['bytes'])
+    collapsed_requests.set(value=recommendation_flights.stats()['collapsed'])
+    for milestone, seconds in (('ready', readiness.ready_seconds), ('first_request', readiness.first_request_seconds)):
+        if seconds is not None:
+            startup_seconds.set(milestone, value=seconds)
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get('/collections-info')
 async def get_collections_info():
     """Get information about available collections"""
-    if not db:
-        raise HTTPException(status_code=500, detail="Firebase not initialized")
+    require_corpus()
     
     try:
-        collections = ['projects', 'startups', 'mentors', 'faculty']
-        info = {}
+        # The resident corpus already knows its counts; otherwise ask Firestore to aggregate them
+        if corpus.loaded:
+            counts = {collection_name: corpus.count(collection_name) for collection_name in COLLECTION_ITEM_TYPES}
+        else:
+            counts = await collection_counts.get()
         
-        for collection_name in collections:
-            docs = db.collection(collection_name).stream()
-            count = len(list(docs))
+        info = {}
+        for collection_name, count in counts.items():
             info[collection_name] = {
                 "count": count,
                 "description": get_collection_description(collection_name)
@@ -0,0 +1,430 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from corpus_store import COLLECTION_ITEM_TYPES, CHANGE_REMOVED, CorpusStore
+from doc_records import DocRecord, build_record
+
+# Postings map a key to {doc_id: bitmask of field ids containing it}
+Postings = Dict[str, int]
+
+
+def text_grams(text: str) -> Set[str]:
+    """Character bigrams and trigrams of a text"""
+    grams = set()
+    for size in (2, 3):
+        for i in range(len(text) - size + 1):
+            grams.add(text[i:i + size])
+    return grams
+
+
+class FrozenPostings:
+    """Read-only key -> postings table over flat arrays, e.g. views of a memory-mapped snapshot.
+
+    The postings of key i are rows[offsets[i]:offsets[i + 1]], in ascending
+    row order, with their field masks at the same positions in masks.
+    """
+
+    def __init__(self, keys: List[str], offsets: np.ndarray, rows: np.ndarray, masks: np.ndarray):
+        self.keys = keys
+        self.slots = {key: slot for slot, key in enumerate(keys)}
+        self.offsets = offsets
+        self.rows = rows
+        self.masks = masks
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        start, end = self.offsets[slot], self.offsets[slot + 1]
+        return self.rows[start:end], self.masks[start:end]
+
+
+class TableExport(NamedTuple):
+    """A postings table flattened the way FrozenPostings reads it"""
+    keys: List[str]
+    offsets: np.ndarray
+    rows: np.ndarray
+    masks: np.ndarray
+
+
+class IndexExport(NamedTuple):
+    """Every indexed document of a SearchIndex, in row order, with its gram and value tables"""
+    version: int
+    doc_ids: List[str]
+    grams: TableExport
+    values: TableExport
+
+
+class SnapshotLayer:
+    """Index state restored from a snapshot: documents by row and their frozen postings.
+
+    `document(row)` returns the document a row was indexed from; records are
+    built from it the first time a row is scored.
+    """
+
+    def __init__(self, doc_ids: List[str], grams: FrozenPostings, values: FrozenPostings,
+                 document: Callable[[int], Dict[str, Any]]):
+        self.doc_ids = doc_ids
+        self.rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        self.grams = grams
+        self.values = values
+        self.document = document
+
+
+def intersect_postings(rows: np.ndarray, masks: np.ndarray, other_rows: np.ndarray,
+                       other_masks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows in both ascending postings arrays whose combined field mask is non-zero"""
+    if len(rows) > len(other_rows):
+        rows, masks, other_rows, other_masks = other_rows, other_masks, rows, masks
+    positions = np.searchsorted(other_rows, rows)
+    found = positions < len(other_rows)
+    found[found] = other_rows[positions[found]] == rows[found]
+    combined = masks[found] & other_masks[positions[found]]
+    keep = combined != 0
+    return rows[found][keep], combined[keep]
+
+
+class SearchIndex:
+    """Inverted index over the scored fields of one collection.
+
+    field_similarity only gives a whitespace-free query token a
+    non-zero score against a field when one string contains the other (the
+    word-overlap and sequence-ratio fallbacks cannot match otherwise), and the
+    smallest such contribution is well above the 0.1 recommendation threshold.
+    A document is therefore a candidate exactly when some field contains the
+    token, found through character gram postings, or some field value is a
+    substring of the token, found through whole-value postings.
+
+    An index restored from a snapshot keeps the snapshot's postings frozen as a
+    base layer; documents changed since then are dropped from the base and
+    indexed again in the mutable tables, so every document lives in one layer.
+    """
+
+    def __init__(self, item_type: str):
+        self.item_type = item_type
+        self._lock = threading.RLock()
+        self._grams: Dict[str, Postings] = {}
+        self._values: Dict[str, Postings] = {}
+        self._doc_keys: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._base: Optional[SnapshotLayer] = None
+        self._base_alive: Optional[np.ndarray] = None
+        self._count = 0
+        # Odd while the tables are being changed, so export() can read them without the lock
+        self._sequence = 0
+        self.records: Dict[str, DocRecord] = {}
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def restore(self, base: SnapshotLayer, version: int = 0) -> None:
+        """Replace the index contents with a snapshot's frozen postings"""
+        with self._lock:
+            self._sequence += 1
+            self._grams = {}
+            self._values = {}
+            self._doc_keys = {}
+            self.records = {}
+            self._base = base
+            self._base_alive = np.ones(len(base.doc_ids), dtype=bool)
+            self._count = len(base.doc_ids)
+            self.version = version
+            self._sequence += 1
+
+    def add(self, doc_id: str, item_data: Dict[str, Any]) -> None:
+        """Index a document, replacing any previous version of it"""
+        record = build_record(doc_id, item_data, self.item_type)
+        gram_masks: Dict[str, int] = {}
+        value_masks: Dict[str, int] = {}
+        for field_id, text, _, _ in record.fields:
+            bit = 1 << field_id
+            value_masks[text] = value_masks.get(text, 0) | bit
+            for gram in text_grams(text):
+                gram_masks[gram] = gram_masks.get(gram, 0) | bit
+
+        with self._lock:
+            self._sequence += 1
+            self._remove_locked(doc_id)
+            for gram, mask in gram_masks.items():
+                self._grams.setdefault(gram, {})[doc_id] = mask
+            for value, mask in value_masks.items():
+                self._values.setdefault(value, {})[doc_id] = mask
+            self._doc_keys[doc_id] = (tuple(gram_masks), tuple(value_masks))
+            self.records[doc_id] = record
+            self._count += 1
+            self.version += 1
+            self._sequence += 1
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a document from the index"""
+        with self._lock:
+            self._sequence += 1
+            if self._remove_locked(doc_id):
+                self.version += 1
+            self._sequence += 1
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        self.records.pop(doc_id, None)
+        keys = self._doc_keys.pop(doc_id, None)
+        if keys is None:
+            row = self._base.rows.get(doc_id) if self._base is not None else None
+            if row is None or not self._base_alive[row]:
+                return False
+            self._base_alive[row] = False
+            self._count -= 1
+            return True
+        grams, values = keys
+        for table, table_keys in ((self._grams, grams), (self._values, values)):
+            for key in table_keys:
+                postings = table.get(key)
+                if postings is None:
+                    continue
+                postings.pop(doc_id, None)
+                if not postings:
+                    del table[key]
+        self._count -= 1
+        return True
+
+    def _merge_base(self, matches: Postings, postings: Optional[Tuple[np.ndarray, np.ndarray]]) -> None:
+        """Add frozen postings of documents still in the base layer to matches"""
+        if postings is None:
+            return
+        rows, masks = postings
+        alive = self._base_alive[rows]
+        doc_ids = self._base.doc_ids
+        for row, mask in zip(rows[alive].tolist(), masks[alive].tolist()):
+            doc_id = doc_ids[row]
+            matches[doc_id] = matches.get(doc_id, 0) | mask
+
+    def token_matches(self, token: str) -> Postings:
+        """Documents (with field masks) that may match a query token"""
+        with self._lock:
+            matches = self._containing(token)
+            base = self._base
+            # Field values that are themselves substrings of the token
+            for i in range(len(token)):
+                for j in range(i + 1, len(token) + 1):
+                    value = token[i:j]
+                    postings = self._values.get(value)
+                    if postings:
+                        for doc_id, mask in postings.items():
+                            matches[doc_id] = matches.get(doc_id, 0) | mask
+                    if base is not None:
+                        self._merge_base(matches, base.values.get(value))
+            return matches
+
+    def _containing(self, token: str) -> Postings:
+        if len(token) < 2:
+            return {}
+        if len(token) == 2:
+            result = dict(self._grams.get(token, {}))
+            if self._base is not None:
+                self._merge_base(result, self._base.grams.get(token))
+            return result
+
+        grams = [gram for gram in text_grams(token) if len(gram) == 3]
+        result = self._containing_live(grams)
+        if self._base is not None:
+            self._merge_base(result, self._containing_base(grams))
+        return result
+
+    def _containing_live(self, grams: List[str]) -> Postings:
+        postings = []
+        for gram in grams:
+            gram_postings = self._grams.get(gram)
+            if not gram_postings:
+                return {}
+            postings.append(gram_postings)
+        postings.sort(key=len)
+
+        # Intersect starting from the rarest gram so cost follows the match count
+        result = dict(postings[0])
+        for gram_postings in postings[1:]:
+            narrowed = {}
+            for doc_id, mask in result.items():
+                mask &= gram_postings.get(doc_id, 0)
+                if mask:
+                    narrowed[doc_id] = mask
+            result = narrowed
+            if not result:
+                break
+        return result
+
+    def _containing_base(self, grams: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        postings = []
+        for gram in grams:
+            gram_postings = self._base.grams.get(gram)
+            if gram_postings is None:
+                return None
+            postings.append(gram_postings)
+        postings.sort(key=lambda rows_masks: len(rows_masks[0]))
+
+        rows, masks = postings[0]
+        for other_rows, other_masks in postings[1:]:
+            rows, masks = intersect_postings(rows, masks, other_rows, other_masks)
+            if not len(rows):
+                break
+        return rows, masks
+
+    def candidates(self, tokens: Iterable[str]) -> Set[str]:
+        """Ids of documents that can score above the recommendation threshold"""
+        doc_ids: Set[str] = set()
+        for token in {token.lower() for token in tokens}:
+            doc_ids.update(self.token_matches(token))
+        return doc_ids
+
+    def _base_record(self, doc_id: str) -> Optional[DocRecord]:
+        """Build the record of a document still in the base layer, or None"""
+        base = self._base
+        row = base.rows.get(doc_id) if base is not None else None
+        if row is None or not self._base_alive[row]:
+            return None
+        record = build_record(doc_id, base.document(row), self.item_type)
+        with self._lock:
+            # Keep it only if the document was not changed while it was being built
+            if self._base is base and self._base_alive[row]:
+                return self.records.setdefault(doc_id, record)
+            return self.records.get(doc_id)
+
+    def get_records(self, doc_ids: Iterable[str]) -> List[DocRecord]:
+        """Records for the given ids that are still indexed"""
+        return list(self.iter_records(doc_ids))
+
+    def iter_records(self, doc_ids: Iterable[str]) -> Iterator[DocRecord]:
+        """Lazily yield records for the given ids that are still indexed"""
+        # Single dict lookups are atomic, so no lock is held while the caller scores
+        records = self.records
+        for doc_id in doc_ids:
+            record = records.get(doc_id)
+            if record is None and self._base is not None:
+                record = self._base_record(doc_id)
+            if record is not None:
+                yield record
+
+    def doc_ids(self) -> List[str]:
+        """Ids of every indexed document"""
+        with self._lock:
+            doc_ids = list(self._doc_keys)
+            if self._base is not None:
+                base_ids = self._base.doc_ids
+                doc_ids.extend(base_ids[row] for row in np.flatnonzero(self._base_alive).tolist())
+            return doc_ids
+
+    def snapshot_records(self) -> Tuple[int, List[DocRecord]]:
+        """Index version together with every record at that version"""
+        if self._base is not None:
+            # Build base records up front; no document joins the base layer later
+            for _ in self.iter_records(self.doc_ids()):
+                pass
+        with self._lock:
+            return self.version, list(self.records.values())
+
+    def export(self, attempts: int = 5) -> IndexExport:
+        """Flatten the index into row-ordered tables, reading without holding the lock.
+
+        The tables are read optimistically and the read is retried when a
+        change lands in the middle of it, so queries are never blocked behind
+        an export.
+        """
+        for _ in range(attempts):
+            sequence = self._sequence
+            if sequence % 2:
+                continue
+            try:
+                exported = self._export()
+            except (RuntimeError, KeyError, IndexError):
+                # A table changed size, or a document was added after its rows were numbered
+                continue
+            if self._sequence == sequence:
+                return exported
+        # Changes keep landing; take the lock so the export finishes
+        with self._lock:
+            return self._export()
+
+    def _export(self) -> IndexExport:
+        version = self.version
+        base, base_alive = self._base, self._base_alive
+        live_ids = list(self._doc_keys)
+        base_rows = np.flatnonzero(base_alive) if base is not None else np.zeros(0, dtype=np.int64)
+        doc_ids = sorted(live_ids + [base.doc_ids[row] for row in base_rows.tolist()] if base is not None else live_ids)
+        row_of = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+
+        remap = None
+        if base is not None:
+            remap = np.full(len(base.doc_ids), -1, dtype=np.int64)
+            remap[base_rows] = [row_of[base.doc_ids[row]] for row in base_rows.tolist()]
+        return IndexExport(
+            version=version,
+            doc_ids=doc_ids,
+            grams=self._export_table(self._grams, base.grams if base is not None else None, remap, row_of),
+            values=self._export_table(self._values, base.values if base is not None else None, remap, row_of)
+        )
+
+    @staticmethod
+    def _export_table(live: Dict[str, Postings], frozen: Optional[FrozenPostings], remap: Optional[np.ndarray],
+                      row_of: Dict[str, int]) -> TableExport:
+        keys: List[str] = []
+        slots: Dict[str, int] = {}
+        part_slots, part_rows, part_masks = [], [], []
+        if frozen is not None:
+            keys.extend(frozen.keys)
+            slots.update(frozen.slots)
+            lengths = np.diff(frozen.offsets)
+            part_slots.append(np.repeat(np.arange(len(frozen.keys), dtype=np.int64), lengths))
+            part_rows.append(remap[frozen.rows])
+            part_masks.append(np.asarray(frozen.masks, dtype=np.int64))
+
+        live_slots, live_rows, live_masks = [], [], []
+        for key, postings in list(live.items()):
+            slot = slots.get(key)
+            if slot is None:
+                slot = slots[key] = len(keys)
+                keys.append(key)
+            for doc_id, mask in list(postings.items()):
+                live_slots.append(slot)
+                live_rows.append(row_of[doc_id])
+                live_masks.append(mask)
+        part_slots.append(np.asarray(live_slots, dtype=np.int64))
+        part_rows.append(np.asarray(live_rows, dtype=np.int64))
+        part_masks.append(np.asarray(live_masks, dtype=np.int64))
+
+        slot_array = np.concatenate(part_slots)
+        row_array = np.concatenate(part_rows)
+        mask_array = np.concatenate(part_masks)
+        keep = row_array >= 0  # Base rows dropped since the snapshot
+        slot_array, row_array, mask_array = slot_array[keep], row_array[keep], mask_array[keep]
+
+        # Drop keys left without postings, then sort by key slot and row
+        used = np.zeros(len(keys), dtype=bool)
+        used[slot_array] = True
+        new_slot = np.cumsum(used) - 1
+        keys = [key for key, is_used in zip(keys, used.tolist()) if is_used]
+        slot_array = new_slot[slot_array]
+        order = np.lexsort((row_array, slot_array))
+        slot_array, row_array, mask_array = slot_array[order], row_array[order], mask_array[order]
+        offsets = np.searchsorted(slot_array, np.arange(len(keys) + 1)).astype(np.int64)
+        return TableExport(keys, offsets, row_array.astype(np.uint32), mask_array.astype(np.uint32))
+
+
+class CorpusIndex:
+    """One SearchIndex per collection, maintained from CorpusStore change events"""
+
+    def __init__(self, store: Optional[CorpusStore] = None):
+        self.indexes = {name: SearchIndex(item_type) for name, item_type in COLLECTION_ITEM_TYPES.items()}
+        if store is not None:
+            store.subscribe(self.on_change)
+
+    def on_change(self, collection: str, change_type: str, doc_id: str,
+                  data: Optional[Dict[str, Any]]) -> None:
+        index = self.indexes.get(collection)
+        if index is None:
+            return
+        if change_type == CHANGE_REMOVED:
+            index.remove(doc_id)
+        else:
+            index.add(doc_id, data or {})
@@ -0,0 +1,260 @@
+import itertools
+import logging
+import multiprocessing
+import threading
+import zlib
+from concurrent.futures import Future
+from multiprocessing.reduction import ForkingPickler
+from typing import Any, Dict, List, Optional, Tuple
+
+from corpus_store import CHANGE_REMOVED, COLLECTION_ITEM_TYPES, CorpusStore
+from doc_records import TopMatches, prepare_query, score_record, select_top_matches
+from search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# (categorized_tokens, top_n)
+ShardQuery = Tuple[Dict[str, List[str]], int]
+# (top (doc_id, score) pairs, documents scored, documents above the threshold)
+ShardResult = Tuple[List[Tuple[str, float]], int, int]
+
+
+def shard_of(doc_id: str, shards: int) -> int:
+    """Shard a document lives on, stable across processes and restarts"""
+    return zlib.crc32(doc_id.encode('utf-8')) % shards
+
+
+def rank_shard(index: SearchIndex, queries: List[ShardQuery]) -> List[ShardResult]:
+    """Rank the documents of one index for several queries, walking each candidate once"""
+    prepared_queries = [prepare_query(categorized_tokens, index.item_type) for categorized_tokens, _ in queries]
+    candidate_sets = [
+        index.candidates([token for tokens in categorized_tokens.values() for token in tokens])
+        for categorized_tokens, _ in queries
+    ]
+    matches = [TopMatches(top_n) for _, top_n in queries]
+    for record in index.iter_records(set().union(*candidate_sets)):
+        token_scores = {}
+        for query_matches, prepared_query, candidate_ids in zip(matches, prepared_queries, candidate_sets):
+            if record.doc_id in candidate_ids:
+                score = score_record(prepared_query, record, token_scores)
+                if score > 0.1:
+                    query_matches.add(record.doc_id, score)
+    return [
+        (query_matches.top(), len(candidate_ids), query_matches.matched)
+        for query_matches, candidate_ids in zip(matches, candidate_sets)
+    ]
+
+
+def serve_shard(connection) -> None:
+    """Shard process: index this shard's documents of every collection and rank them on request.
+
+    Messages are handled in the order they were sent, so a ranking request
+    always sees the changes the parent sent ahead of it.
+    """
+    indexes: Dict[str, SearchIndex] = {}
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        kind = message[0]
+        if kind == 'reset':
+            indexes = {name: SearchIndex(item_type) for name, item_type in COLLECTION_ITEM_TYPES.items()}
+            for collection, documents in message[1].items():
+                for doc_id, data in documents:
+                    indexes[collection].add(doc_id, data)
+        elif kind == 'changes':
+            for collection, change_type, doc_id, data in message[1]:
+                if change_type == CHANGE_REMOVED:
+                    indexes[collection].remove(doc_id)
+                else:
+                    indexes[collection].add(doc_id, data or {})
+        elif kind == 'rank':
+            _, request_id, collection, queries = message
+            try:
+                connection.send((request_id, rank_shard(indexes[collection], queries), None))
+            except Exception as e:
+                connection.send((request_id, None, f"{type(e).__name__}: {e}"))
+        elif kind == 'stop':
+            return
+
+
+class ShardedScorer:
+    """Persistent processes that each hold one shard of every collection and rank it on request.
+
+    Documents reach a shard once, when the pool starts or is reset, and after
+    that as corpus changes batched ahead of the next ranking request. A request
+    carries only the query tokens; each shard answers with its own top N, which
+    are merged here into exactly the ranking a single process would produce.
+    """
+
+    def __init__(self, corpus: CorpusStore, processes: int):
+        self.corpus = corpus
+        self.processes = processes
+        self.error: Optional[str] = None
+        self._shards: List[Tuple[Any, Any]] = []  # (process, connection)
+        # Guards the pending changes and keeps every message to the shards in one order
+        self._lock = threading.Lock()
+        self._pending_changes: List[Tuple[str, str, str, Optional[Dict[str, Any]]]] = []
+        # Bumped by every reset; changes are held back while one is being built, since the
+        # shards would drop any that reached them ahead of it
+        self._generation = 0
+        self._resetting = False
+        self._requests: Dict[int, Future] = {}
+        self._request_ids = itertools.count()
+        self._subscribed = False
+        self._ready = False
+        self._stopping = False
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def start(self) -> None:
+        """Spawn the shard processes and send them the corpus"""
+        context = multiprocessing.get_context('spawn')
+        for shard in range(self.processes):
+            connection, child_connection = context.Pipe()
+            process = context.Process(target=serve_shard, args=(child_connection,),
+                                      name=f'scoring-shard-{shard}', daemon=True)
+            process.start()
+            child_connection.close()
+            self._shards.append((process, connection))
+            threading.Thread(target=self._receive, args=(shard,), name=f'scoring-shard-{shard}-results',
+                             daemon=True).start()
+        if not self._subscribed:
+            self.corpus.subscribe(self.on_change)
+            self._subscribed = True
+        self.reset()
+        self._ready = True
+
+    def on_change(self, collection: str, change_type: str, doc_id: str,
+                  data: Optional[Dict[str, Any]]) -> None:
+        if self.error is not None:
+            return
+        with self._lock:
+            self._pending_changes.append((collection, change_type, doc_id, data))
+
+    def apply(self, changes: List[Tuple[str, str, str, Optional[Dict[str, Any]]]]) -> None:
+        """Queue changes the corpus made without notifying, e.g. the difference between two attached snapshots"""
+        with self._lock:
+            self._pending_changes.extend(changes)
+
+    def reset(self) -> None:
+        """Send every shard its documents again, e.g. after the corpus was replaced by a snapshot.
+
+        The payloads are copied and pickled without the lock, so change
+        notifications and rankings against the previous generation carry on
+        meanwhile; the lock is held only to write the finished payloads.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._resetting = True
+            # Changes notified after this point are replayed on top; replaying one already in the copy is harmless
+            self._pending_changes = []
+            shards = len(self._shards)
+        try:
+            documents = [{name: [] for name in self.corpus.collections} for _ in range(shards)]
+            for name in self.corpus.collections:
+                for doc_id, data in self.corpus.documents(name):
+                    documents[shard_of(doc_id, shards)][name].append((doc_id, data))
+            payloads = [bytes(ForkingPickler.dumps(('reset', shard_documents))) for shard_documents in documents]
+        except BaseException:
+            with self._lock:
+                if self._generation == generation:
+                    self._resetting = False
+            raise
+        with self._lock:
+            if self._generation != generation:  # A later reset read a newer corpus
+                return
+            self._resetting = False
+            for (_, connection), payload in zip(self._shards, payloads):
+                connection.send_bytes(payload)
+            self._send_changes_locked()
+
+    def _send_changes_locked(self) -> None:
+        if not self._pending_changes or self._resetting:
+            return
+        changes = [[] for _ in self._shards]
+        for change in self._pending_changes:
+            changes[shard_of(change[2], len(self._shards))].append(change)
+        self._pending_changes = []
+        for (_, connection), shard_changes in zip(self._shards, changes):
+            if shard_changes:
+                connection.send(('changes', shard_changes))
+
+    def rank(self, collection: str, queries: List[ShardQuery]) -> List[ShardResult]:
+        """Rank a collection for several queries on every shard and merge the shards' top N;
+        raises RuntimeError when the pool cannot answer"""
+        futures = []
+        with self._lock:
+            if not self._ready:
+                raise RuntimeError(self.error or "scoring shards are not running")
+            self._send_changes_locked()
+            for _, connection in self._shards:
+                request_id = next(self._request_ids)
+                future = Future()
+                self._requests[request_id] = future
+                connection.send(('rank', request_id, collection, queries))
+                futures.append(future)
+        shard_results = [future.result() for future in futures]
+        merged = []
+        for position, (_, top_n) in enumerate(queries):
+            results = [results[position] for results in shard_results]
+            top = select_top_matches([match for shard_top, _, _ in results for match in shard_top], top_n)
+            merged.append((top, sum(scanned for _, scanned, _ in results), sum(matched for _, _, matched in results)))
+        return merged
+
+    def _receive(self, shard: int) -> None:
+        _, connection = self._shards[shard]
+        while True:
+            try:
+                request_id, result, error = connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._requests.pop(request_id, None)
+            if future is None:
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(f"scoring shard {shard}: {error}"))
+        if not self._stopping:
+            self._fail(f"scoring shard {shard} exited")
+
+    def _fail(self, error: str) -> None:
+        """Stop routing requests to the pool and fail the ones waiting on it"""
+        with self._lock:
+            self._ready = False
+            self.error = error
+            requests, self._requests = self._requests, {}
+        for future in requests.values():
+            future.set_exception(RuntimeError(error))
+        logger.error(f"❌ Sharded scoring stopped: {error}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping = True
+        self._ready = False
+        with self._lock:
+            for _, connection in self._shards:
+                try:
+                    connection.send(('stop',))
+                except OSError:
+                    pass
+        for process, connection in self._shards:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self._shards = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": len(self._shards),
+            "ready": self._ready,
+            "in_flight": len(self._requests),
+            "pending_changes": len(self._pending_changes),
+            "error": self.error
+        }
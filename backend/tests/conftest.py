@@ -0,0 +1,42 @@
+import pytest
+
+from corpus_store import CorpusStore
+from fake_firestore import FakeFirestoreClient
+from search_index import CorpusIndex
+
+SEED_DOCUMENTS = {
+    'projects': [
+        {'id': 'p1', 'title': 'Crop Yield Forecasting', 'description': 'Predict harvests with machine learning.',
+         'domain': 'AgriTech', 'skillsRequired': ['Python', 'Machine Learning']},
+        {'id': 'p2', 'title': 'Campus Marketplace', 'description': 'Buy and sell, between students.',
+         'domain': 'E-commerce', 'skillsRequired': ['React', 'Node.js']}
+    ],
+    'startups': [
+        {'id': 's1', 'name': 'LedgerLeaf', 'description': 'Bookkeeping for small shops.', 'domain': 'FinTech',
+         'location': 'Bangalore'}
+    ],
+    'mentors': [
+        {'id': 'm1', 'name': 'Asha Rao', 'bio': 'Builds ranking systems.', 'currentCompany': 'Google',
+         'expertise': ['Machine Learning', 'Python']}
+    ],
+    'faculty': [
+        {'id': 'f1', 'name': 'R. Iyer', 'department': 'Computer Science', 'institute': 'IIT Madras',
+         'researchAreas': ['Robotics', 'Machine Learning']}
+    ]
+}
+
+
+@pytest.fixture
+def client():
+    return FakeFirestoreClient({name: [dict(doc) for doc in docs] for name, docs in SEED_DOCUMENTS.items()})
+
+
+@pytest.fixture
+def corpus(client):
+    """Store and index loaded from the fake client, following it through listeners"""
+    store = CorpusStore()
+    index = CorpusIndex(store)
+    store.load(client)
+    store.start_listeners(client)
+    yield store, index
+    store.stop_listeners()
@@ -0,0 +1,49 @@
+import pytest
+
+from bm25_scoring import BM25Collection, BM25Engine, bm25_terms
+from corpus_store import CHANGE_ADDED, CHANGE_MODIFIED, CHANGE_REMOVED
+from doc_records import build_record, select_top_matches
+
+
+def test_terms_drop_punctuation():
+    assert bm25_terms('Qwertyplan, roadmap. (Strategy!) node.js e-commerce') == [
+        'qwertyplan', 'roadmap', 'strategy', 'node', 'js', 'e', 'commerce']
+
+
+@pytest.mark.parametrize('query', ['harvests', 'learning', 'Learning.', 'students'])
+def test_punctuated_words_match(corpus, query):
+    store, index = corpus
+    top, _ = BM25Engine(store, index).top_matches('projects', {'general': [query]}, 5)
+    assert top and top[0][0] in {'p1', 'p2'}
+
+
+@pytest.mark.parametrize('tokens', [
+    {'general': ['machine learning']}, {'skills': ['python'], 'general': ['crop']},
+    {'general': ['react', 'marketplace']}, {'general': ['nothing-matches']}
+])
+def test_top_matches_agree_with_a_full_scan(corpus, tokens):
+    store, index = corpus
+    bm25 = BM25Engine(store, index).collection('projects')
+    for top_n in (1, 5):
+        top, _ = bm25.top_matches(tokens, top_n)
+        assert top == select_top_matches(bm25.score_all(tokens), top_n)
+
+
+def test_incremental_postings_match_a_rebuild(client, corpus):
+    store, index = corpus
+    engine = BM25Engine(store, index)
+    tokens = {'general': ['machine learning', 'robotics']}
+    engine.collection('projects').score_all(tokens)
+
+    store.apply_change('projects', CHANGE_ADDED, 'p3', {'title': 'Robotics Arm', 'skillsRequired': ['Machine Learning']})
+    store.apply_change('projects', CHANGE_MODIFIED, 'p1', {'title': 'Crop Robotics'})
+    client.collection('projects').document('p2').delete()
+
+    rebuilt = BM25Collection('student_projects')
+    for doc_id, data in store.documents('projects'):
+        rebuilt.add(build_record(doc_id, data, 'student_projects'))
+    scores = dict(engine.collection('projects').score_all(tokens))
+    assert scores.keys() == {'p1', 'p3'}
+    assert scores == pytest.approx(dict(rebuilt.score_all(tokens)))
+    store.apply_change('projects', CHANGE_REMOVED, 'p3')
+    assert 'p3' not in dict(engine.collection('projects').score_all(tokens))
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore
+
+from corpus_snapshot import decode_document, encode_document, restore_snapshot, save_snapshot, snapshot_changes
+from corpus_store import CHANGE_ADDED, CHANGE_MODIFIED, CHANGE_REMOVED, CorpusStore
+from search_index import CorpusIndex
+
+
+def typed_document():
+    client = firestore.Client(project='snapshot-test', credentials=AnonymousCredentials())
+    return {'title': 'Typed values', 'created': datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+            'location': firestore.GeoPoint(12.97, 77.59), 'owner': client.document('mentors/m1'),
+            'related': [client.document('faculty/f1')], 'avatar': b'\x89PNG\x00'}
+
+
+def restored(path, attach=False):
+    store = CorpusStore()
+    index = CorpusIndex(store)
+    snapshot = restore_snapshot(path, store, index, attach=attach)
+    return store, index, snapshot
+
+
+def test_encode_decode_round_trips_firestore_values():
+    typed = typed_document()
+    assert decode_document(encode_document(typed)) == typed
+
+
+def test_restore_matches_the_saved_corpus(corpus, tmp_path):
+    store, index = corpus
+    typed = typed_document()
+    store.apply_change('projects', CHANGE_ADDED, 'typed', typed)
+    path = str(tmp_path / 'corpus.snapshot')
+    save_snapshot(path, store, index)
+
+    for attach in (False, True):
+        restored_store, restored_index, _ = restored(path, attach)
+        assert restored_store.get('projects', 'typed') == typed
+        for collection in store.collections:
+            assert dict(restored_store.documents(collection)) == dict(store.documents(collection))
+            assert (sorted(restored_index.indexes[collection].doc_ids())
+                    == sorted(index.indexes[collection].doc_ids()))
+        assert restored_index.indexes['projects'].candidates(['marketplace']) == {'p2'}
+
+
+def test_restored_copy_follows_edits(corpus, tmp_path):
+    store, index = corpus
+    path = str(tmp_path / 'corpus.snapshot')
+    save_snapshot(path, store, index)
+    restored_store, restored_index, _ = restored(path)
+
+    restored_store.apply_change('projects', CHANGE_MODIFIED, 'p2', {'title': 'Zyxquark Exchange'})
+    restored_store.apply_change('mentors', CHANGE_REMOVED, 'm1')
+    assert restored_index.indexes['projects'].candidates(['marketplace']) == set()
+    assert restored_index.indexes['projects'].candidates(['zyxquark']) == {'p2'}
+    assert restored_index.indexes['mentors'].doc_ids() == []
+
+
+def test_snapshot_changes_replay_one_snapshot_into_the_next(corpus, tmp_path):
+    store, index = corpus
+    first_path, second_path = str(tmp_path / 'first.snapshot'), str(tmp_path / 'second.snapshot')
+    save_snapshot(first_path, store, index)
+    store.apply_change('projects', CHANGE_MODIFIED, 'p1', {'title': 'Soil Sensors'})
+    store.apply_change('startups', CHANGE_REMOVED, 's1')
+    store.apply_change('faculty', CHANGE_ADDED, 'f2', {'name': 'K. Menon'})
+    save_snapshot(second_path, store, index)
+
+    first = restored(first_path, attach=True)[2]
+    second = restored(second_path, attach=True)[2]
+    changes = snapshot_changes(first, second, store.collections)
+    assert sorted((collection, change_type, doc_id) for collection, change_type, doc_id, _ in changes) == [
+        ('faculty', CHANGE_ADDED, 'f2'), ('projects', CHANGE_MODIFIED, 'p1'), ('startups', CHANGE_REMOVED, 's1')]
+
+    documents = {name: dict(first.documents(name)) for name in store.collections}
+    for collection, change_type, doc_id, data in changes:
+        if change_type == CHANGE_REMOVED:
+            del documents[collection][doc_id]
+        else:
+            documents[collection][doc_id] = data
+    assert documents == {name: dict(store.documents(name)) for name in store.collections}
@@ -0,0 +1,58 @@
+from result_cache import ResultCache
+
+
+def test_initial_replay_leaves_the_corpus_unchanged(client, corpus):
+    store, _ = corpus
+    assert store.listening
+    assert store.count('projects') == 2
+    assert store.get('mentors', 'm1')['currentCompany'] == 'Google'
+
+
+def test_listener_added_modified_removed(client, corpus):
+    store, index = corpus
+    reference = client.collection('mentors').document('m2')
+
+    version = store.version
+    reference.set({'name': 'Zyxquark Lab', 'expertise': ['Rust']})
+    assert store.version == version + 1
+    assert store.get('mentors', 'm2') == {'name': 'Zyxquark Lab', 'expertise': ['Rust']}
+    assert index.indexes['mentors'].candidates(['zyxquark']) == {'m2'}
+
+    reference.update({'name': 'Qwvortex Lab'})
+    assert store.version == version + 2
+    assert store.get('mentors', 'm2')['name'] == 'Qwvortex Lab'
+    assert index.indexes['mentors'].candidates(['zyxquark']) == set()
+    assert index.indexes['mentors'].candidates(['qwvortex']) == {'m2'}
+
+    reference.delete()
+    assert store.version == version + 3
+    assert store.get('mentors', 'm2') is None
+    assert index.indexes['mentors'].candidates(['qwvortex']) == set()
+
+
+def test_identical_set_keeps_the_version(client, corpus):
+    store, _ = corpus
+    reference = client.collection('projects').document('p1')
+    version = store.version
+    reference.set(reference.get().to_dict())
+    assert store.version == version
+
+
+def test_listener_change_invalidates_cached_results(client, corpus):
+    store, _ = corpus
+    cache = ResultCache()
+    cache.put('react', store.version, ['p2'], 64)
+    assert cache.get('react', store.version) == ['p2']
+
+    client.collection('projects').document('p2').update({'domain': 'Retail'})
+    assert cache.get('react', store.version) is None
+    assert cache.invalidations == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_stopped_listeners_no_longer_apply_writes(client, corpus):
+    store, _ = corpus
+    store.stop_listeners()
+    assert not store.listening
+    client.collection('startups').document('s1').delete()
+    assert store.get('startups', 's1') is not None
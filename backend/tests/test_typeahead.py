@@ -0,0 +1,61 @@
+import threading
+
+from corpus_store import CHANGE_ADDED, CHANGE_MODIFIED, CHANGE_REMOVED
+from typeahead import SuggestIndex
+
+
+def completions(suggestions, prefix, limit=5):
+    return [(suggestion['text'], suggestion['count']) for suggestion in suggestions.suggest(prefix, limit)]
+
+
+def test_completions_rank_by_document_count(corpus):
+    store, _ = corpus
+    suggestions = SuggestIndex(store)
+    suggestions.rebuild()
+    assert completions(suggestions, 'mac') == [('Machine Learning', 3)]
+    assert completions(suggestions, 'lea') == [('Machine Learning', 3)]
+    assert completions(suggestions, 'p') == [('Python', 2)]
+    assert suggestions.suggest('mac', 5)[0]['fields'] == ['expertise', 'researchAreas', 'skillsRequired']
+    assert completions(suggestions, 'zz') == []
+    assert completions(suggestions, '') == []
+
+
+def test_listener_changes_update_completions(client, corpus):
+    store, _ = corpus
+    suggestions = SuggestIndex(store)
+    suggestions.rebuild()
+
+    client.collection('mentors').document('m1').update({'expertise': ['Python']})
+    assert completions(suggestions, 'mac') == [('Machine Learning', 2)]
+    client.collection('startups').document('s2').set({'location': 'Bangalore'})
+    assert completions(suggestions, 'ban') == [('Bangalore', 2)]
+    client.collection('startups').document('s1').delete()
+    client.collection('startups').document('s2').delete()
+    assert completions(suggestions, 'ban') == []
+
+
+def test_repeated_word_starts_are_added_and_removed_once(corpus):
+    store, _ = corpus
+    suggestions = SuggestIndex(store)
+    suggestions.rebuild()
+    size = len(suggestions)
+    repeated = ' '.join(['ab'] * 40)
+
+    store.apply_change('projects', CHANGE_ADDED, 'repeated', {'skillsRequired': [repeated]})
+    assert completions(suggestions, 'ab ab') == [(repeated, 1)]
+    store.apply_change('projects', CHANGE_REMOVED, 'repeated')
+    assert completions(suggestions, 'ab') == []
+    assert len(suggestions) == size
+
+
+def test_rebuild_keeps_changes_made_while_it_runs(corpus):
+    store, _ = corpus
+    suggestions = SuggestIndex(store)
+    rebuilding = threading.Thread(target=suggestions.rebuild)
+    rebuilding.start()
+    for n in range(50):
+        store.apply_change('projects', CHANGE_ADDED, f'q{n}', {'domain': 'Quantum'})
+    store.apply_change('projects', CHANGE_MODIFIED, 'q0', {'domain': 'Marine'})
+    rebuilding.join()
+    assert completions(suggestions, 'qu') == [('Quantum', 49)]
+    assert completions(suggestions, 'mar') == [('Marine', 1)]
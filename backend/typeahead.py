@@ -0,0 +1,218 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from corpus_store import CHANGE_REMOVED, CorpusStore
+
+# Document fields whose distinct values are offered as completions
+SUGGEST_FIELDS = ('skillsRequired', 'domain', 'expertise', 'researchAreas', 'location', 'institute', 'currentCompany')
+# Characters of a value indexed from each word start; longer prefixes are matched on these
+MAX_KEY_CHARS = 48
+
+# (-documents, key) orders completions by frequency, ties alphabetically
+Ranked = Tuple[int, str]
+
+
+class TrieNode:
+    __slots__ = ('children', 'keys', 'top')
+
+    def __init__(self):
+        self.children: Dict[str, 'TrieNode'] = {}
+        # Values with a word that ends the path here
+        self.keys: set = set()
+        # Best completions under this node, or None after a change below it
+        self.top: Optional[List[Ranked]] = None
+
+
+def value_key(value: str) -> str:
+    return ' '.join(value.lower().split())
+
+
+def document_values(data: Dict[str, Any]) -> Dict[Tuple[str, str], str]:
+    """(field, key) -> display text of every suggestible value of a document"""
+    values = {}
+    for field in SUGGEST_FIELDS:
+        value = data.get(field)
+        for text in (value if isinstance(value, list) else [value]):
+            if isinstance(text, str):
+                key = value_key(text)
+                if key:
+                    values.setdefault((field, key), ' '.join(text.split()))
+    return values
+
+
+class SuggestTrie:
+    """The values, counts and prefix trie a SuggestIndex serves; not thread-safe on its own"""
+
+    def __init__(self, max_results: int):
+        self.max_results = max_results
+        self.root = TrieNode()
+        # key -> field -> documents holding the value in that field
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.display: Dict[str, str] = {}
+        # (collection, doc_id) -> the document's (field, key) pairs
+        self.doc_values: Dict[Tuple[str, str], Tuple[Tuple[str, str], ...]] = {}
+
+    def set_document(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]) -> None:
+        values = document_values(data) if data is not None else {}
+        previous = self.doc_values.pop((collection, doc_id), ())
+        for field, key in previous:
+            if (field, key) not in values:
+                self._count(key, field, -1)
+        for (field, key), display in values.items():
+            if (field, key) not in previous:
+                self.display.setdefault(key, display)
+                self._count(key, field, 1)
+        if values:
+            self.doc_values[(collection, doc_id)] = tuple(values)
+
+    def _count(self, key: str, field: str, delta: int) -> None:
+        fields = self.counts.get(key)
+        if fields is None:
+            fields = self.counts[key] = {}
+            self._insert(key)
+        fields[field] = fields.get(field, 0) + delta
+        if not fields[field]:
+            del fields[field]
+        if not fields:
+            del self.counts[key]
+            del self.display[key]
+            self._delete(key)
+        else:
+            self._invalidate(key)
+
+    def _word_keys(self, key: str) -> List[str]:
+        """The distinct keys indexed from the value's word starts; repeated words can truncate to the same one"""
+        starts = [0] + [position + 1 for position, char in enumerate(key) if char == ' ']
+        return list(dict.fromkeys(key[start:start + MAX_KEY_CHARS] for start in starts))
+
+    def _insert(self, key: str) -> None:
+        for word_key in self._word_keys(key):
+            node = self.root
+            node.top = None
+            for char in word_key:
+                node = node.children.setdefault(char, TrieNode())
+                node.top = None
+            node.keys.add(key)
+
+    def _invalidate(self, key: str) -> None:
+        for word_key in self._word_keys(key):
+            node = self.root
+            node.top = None
+            for char in word_key:
+                node = node.children[char]
+                node.top = None
+
+    def _delete(self, key: str) -> None:
+        for word_key in self._word_keys(key):
+            path = [self.root]
+            for char in word_key:
+                path.append(path[-1].children[char])
+            path[-1].keys.discard(key)
+            for node in path:
+                node.top = None
+            # Drop the nodes left with nothing under them
+            for depth in range(len(word_key), 0, -1):
+                node = path[depth]
+                if node.keys or node.children:
+                    break
+                del path[depth - 1].children[word_key[depth - 1]]
+
+    def top(self, node: TrieNode) -> List[Ranked]:
+        if node.top is None:
+            candidates = [(-sum(self.counts[key].values()), key) for key in node.keys]
+            for child in node.children.values():
+                candidates.extend(self.top(child))
+            # A value can sit under several children through different words; each child's list
+            # is its own best, so the best distinct values of their union are this node's best
+            top = []
+            for ranked in sorted(set(candidates)):
+                top.append(ranked)
+                if len(top) == self.max_results:
+                    break
+            node.top = top
+        return node.top
+
+    def lookup(self, key: str, limit: int) -> List[Dict[str, Any]]:
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [
+            {"text": self.display[value], "count": -count, "fields": sorted(self.counts[value])}
+            for count, value in self.top(node)[:limit]
+        ]
+
+
+class SuggestIndex:
+    """Prefix trie over the distinct values of SUGGEST_FIELDS, ranked by how many documents hold them.
+
+    Every word of a value starts a path, so "lea" completes "Machine Learning"
+    as well as "Leadership". Each node caches its best max_results completions;
+    a change clears the caches along the paths of the values it touches, and
+    they are rebuilt from the children's caches on the next lookup there.
+    A rebuild fills a new trie without the lock and swaps it in, replaying
+    the changes that arrived meanwhile, so lookups never wait behind it.
+    """
+
+    def __init__(self, store: CorpusStore, max_results: int = 10):
+        self.store = store
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._trie = SuggestTrie(max_results)
+        # Changes made while a rebuild reads the store, replayed onto the new trie
+        self._replay: Optional[List[Tuple[str, str, Optional[Dict[str, Any]]]]] = None
+        store.subscribe(self.on_change)
+
+    def __len__(self) -> int:
+        return len(self._trie.counts)
+
+    def on_change(self, collection: str, change_type: str, doc_id: str,
+                  data: Optional[Dict[str, Any]]) -> None:
+        self.apply([(collection, change_type, doc_id, data)])
+
+    def apply(self, changes: List[Tuple[str, str, str, Optional[Dict[str, Any]]]]) -> None:
+        """Apply changes the store made, including ones it made without notifying, e.g. the
+        difference between two attached snapshots"""
+        with self._lock:
+            for collection, change_type, doc_id, data in changes:
+                data = None if change_type == CHANGE_REMOVED else data
+                self._trie.set_document(collection, doc_id, data)
+                if self._replay is not None:
+                    self._replay.append((collection, doc_id, data))
+
+    def rebuild(self) -> None:
+        """Index the store's documents from scratch, e.g. after a snapshot replaced them without change events"""
+        with self._rebuild_lock:
+            with self._lock:
+                self._replay = []
+            try:
+                trie = SuggestTrie(self.max_results)
+                for collection in self.store.collections:
+                    for doc_id, data in self.store.documents(collection):
+                        trie.set_document(collection, doc_id, data)
+                trie.top(trie.root)
+            except BaseException:
+                with self._lock:
+                    self._replay = None
+                raise
+            with self._lock:
+                # Documents read after one of these changes already hold it; setting it again is harmless
+                for collection, doc_id, data in self._replay:
+                    trie.set_document(collection, doc_id, data)
+                self._replay = None
+                self._trie = trie
+
+    def warm(self) -> None:
+        """Fill every node's cache, so no lookup pays for the changes since the last one"""
+        with self._lock:
+            self._trie.top(self._trie.root)
+
+    def suggest(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` values with a word starting with `prefix`, most frequent first"""
+        key = value_key(prefix)[:MAX_KEY_CHARS]
+        if not key or limit <= 0:
+            return []
+        with self._lock:
+            return self._trie.lookup(key, limit)
@@ -0,0 +1,323 @@
+import logging
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from corpus_store import COLLECTION_ITEM_TYPES, CorpusStore
+from doc_records import FIELD_SCHEMA, MULTI_TOKEN_BONUS, DocRecord, prepare_query, score_record, select_top_matches
+from fuzzy_match import sequence_ratio
+from search_index import CorpusIndex
+
+logger = logging.getLogger(__name__)
+
+TERM_SEPARATOR = '\x00'
+# Documents changed since a collection was encoded that are scored record by record
+# before it is re-encoded in the background
+REENCODE_AFTER_CHANGES = 64
+
+
+class FieldMatrix:
+    """Sparse document-term matrix of one weighted field, stored row-sorted in COO form"""
+
+    def __init__(self, weight: float, doc_rows: List[int], term_ids: List[int]):
+        self.weight = weight
+        self.term_ids = np.asarray(term_ids, dtype=np.int64)
+        rows = np.asarray(doc_rows, dtype=np.int64)
+        # Segment boundaries so a per-document max is a single reduceat
+        if len(rows):
+            boundaries = np.flatnonzero(np.diff(rows)) + 1
+            self.segment_starts = np.concatenate(([0], boundaries))
+            self.segment_rows = rows[self.segment_starts]
+        else:
+            self.segment_starts = np.zeros(0, dtype=np.int64)
+            self.segment_rows = np.zeros(0, dtype=np.int64)
+
+
+class EncodedCollection:
+    """Vocabulary of distinct field values plus one FieldMatrix per weighted field"""
+
+    def __init__(self, item_type: str, records: list, version: int):
+        self.item_type = item_type
+        self.version = version
+        records = sorted(records, key=lambda record: record.doc_id)
+        self.doc_ids = [record.doc_id for record in records]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+
+        term_lookup: Dict[str, int] = {}
+        terms: List[str] = []
+        term_words: List[frozenset] = []
+        schema = FIELD_SCHEMA[item_type]
+        field_rows: List[List[int]] = [[] for _ in schema]
+        field_terms: List[List[int]] = [[] for _ in schema]
+        for row, record in enumerate(records):
+            for field_id, text, words, _ in record.fields:
+                term_id = term_lookup.get(text)
+                if term_id is None:
+                    term_id = term_lookup[text] = len(terms)
+                    terms.append(text)
+                    term_words.append(words)
+                field_rows[field_id].append(row)
+                field_terms[field_id].append(term_id)
+
+        self.term_lookup = term_lookup
+        self.terms = terms
+        self.fields = [FieldMatrix(spec.weight, field_rows[i], field_terms[i]) for i, spec in enumerate(schema)]
+
+        # Terms joined into one string so containment is a C-level find over the vocabulary
+        self.joined_terms = TERM_SEPARATOR.join(terms)
+        self.term_offsets = []
+        offset = 0
+        for term in terms:
+            self.term_offsets.append(offset)
+            offset += len(term) + 1
+
+        # Word -> term ids and word counts for the Jaccard component
+        word_terms: Dict[str, List[int]] = {}
+        for term_id, words in enumerate(term_words):
+            for word in words:
+                word_terms.setdefault(word, []).append(term_id)
+        self.word_terms = {word: np.asarray(ids, dtype=np.int64) for word, ids in word_terms.items()}
+        self.term_word_counts = np.fromiter((len(words) for words in term_words), dtype=np.float64, count=len(terms))
+        self.wordless_terms = np.flatnonzero(self.term_word_counts == 0)
+
+    def term_similarities(self, token: str, token_words: frozenset) -> np.ndarray:
+        """field_similarity(token, term) for every vocabulary term at once"""
+        similarities = np.zeros(len(self.terms), dtype=np.float64)
+        if not len(self.terms):
+            return similarities
+
+        # Word-level Jaccard for terms with words, the fuzzy ratio for the rest
+        if token_words:
+            intersections = np.zeros(len(self.terms), dtype=np.float64)
+            for word in token_words:
+                term_ids = self.word_terms.get(word)
+                if term_ids is not None:
+                    intersections[term_ids] += 1
+            has_words = self.term_word_counts > 0
+            unions = len(token_words) + self.term_word_counts - intersections
+            similarities[has_words] = intersections[has_words] / unions[has_words] * 0.6
+            sequence_terms = self.wordless_terms
+        else:
+            sequence_terms = range(len(self.terms))
+        for term_id in sequence_terms:
+            similarities[term_id] = sequence_ratio(token, self.terms[term_id]) * 0.4
+
+        # Containment in either direction
+        contains = self._terms_containing(token)
+        for i in range(len(token)):
+            for j in range(i + 1, len(token) + 1):
+                term_id = self.term_lookup.get(token[i:j])
+                if term_id is not None:
+                    contains.append(term_id)
+        if contains:
+            similarities[np.asarray(contains, dtype=np.int64)] = 0.8
+
+        exact = self.term_lookup.get(token)
+        if exact is not None:
+            similarities[exact] = 1.0
+        return similarities
+
+    def _terms_containing(self, token: str) -> List[int]:
+        if not token or TERM_SEPARATOR in token:
+            return []
+        term_ids = []
+        joined = self.joined_terms
+        offsets = self.term_offsets
+        position = joined.find(token)
+        while position != -1:
+            term_id = bisect_right(offsets, position) - 1
+            term_ids.append(term_id)
+            # Resume at the next term so each matching term is visited once
+            if term_id + 1 >= len(offsets):
+                break
+            position = joined.find(token, offsets[term_id + 1])
+        return term_ids
+
+    def score(self, categorized_tokens: Dict[str, List[str]]) -> np.ndarray:
+        """Similarity scores of every document, matching calculate_similarity_score"""
+        tokens, total_tokens = prepare_query(categorized_tokens, self.item_type)
+        scores = np.zeros(len(self.doc_ids), dtype=np.float64)
+        for _, token, token_words, bonus in tokens:
+            similarities = self.term_similarities(token, token_words)
+            max_token_scores = np.zeros(len(self.doc_ids), dtype=np.float64)
+            for field in self.fields:
+                if not len(field.term_ids):
+                    continue
+                token_scores = similarities[field.term_ids] * field.weight
+                field_max = np.maximum.reduceat(token_scores, field.segment_starts)
+                rows = field.segment_rows
+                max_token_scores[rows] = np.maximum(max_token_scores[rows], field_max)
+            if bonus is not None:
+                max_token_scores *= bonus
+            scores += max_token_scores
+
+        # Bonus for having multiple matching tokens
+        if total_tokens > 1:
+            scores = np.where(scores > 0, scores * MULTI_TOKEN_BONUS, scores)
+        return scores
+
+    def top_matches(self, categorized_tokens: Dict[str, List[str]], top_n: int,
+                    threshold: float = 0.1) -> List[Tuple[str, float]]:
+        """Top (doc_id, score) pairs above the threshold, ties kept in document id order"""
+        if top_n <= 0 or not self.doc_ids:
+            return []
+        return self.select_top(self.score(categorized_tokens), top_n, threshold)[0]
+
+    def select_top(self, scores: np.ndarray, top_n: int,
+                   threshold: float = 0.1) -> Tuple[List[Tuple[str, float]], int]:
+        """Top (doc_id, score) pairs of a score() result and the number of documents above the threshold"""
+        rows = np.flatnonzero(scores > threshold)
+        matched = len(rows)
+        if top_n <= 0:
+            return [], matched
+        if len(rows) > top_n:
+            # argpartition finds the cut-off; keep every row tied with it so ordering stays stable
+            kth = rows[np.argpartition(-scores[rows], top_n - 1)[:top_n]]
+            cutoff = scores[kth].min()
+            rows = rows[scores[rows] >= cutoff]
+        order = np.lexsort((rows, -scores[rows]))[:top_n]
+        return [(self.doc_ids[row], float(scores[row])) for row in rows[order]], matched
+
+
+class CollectionView:
+    """An encoding plus the documents changed since it was built: their rows are masked out
+    and their current records scored one by one, so rankings match the live index"""
+
+    def __init__(self, encoded: EncodedCollection, stale_rows: np.ndarray, records: List[DocRecord]):
+        self.encoded = encoded
+        self.stale_rows = stale_rows
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.encoded.doc_ids) - len(self.stale_rows) + len(self.records)
+
+    def score(self, categorized_tokens: Dict[str, List[str]]) -> Tuple[np.ndarray, List[Tuple[str, float]]]:
+        """Scores of the encoded rows, and (doc_id, score) pairs of the changed documents"""
+        scores = self.encoded.score(categorized_tokens)
+        scores[self.stale_rows] = 0.0
+        if not self.records:
+            return scores, []
+        prepared_query = prepare_query(categorized_tokens, self.encoded.item_type)
+        return scores, [(record.doc_id, score_record(prepared_query, record)) for record in self.records]
+
+    def select_top(self, scored: Tuple[np.ndarray, List[Tuple[str, float]]], top_n: int,
+                   threshold: float = 0.1) -> Tuple[List[Tuple[str, float]], int]:
+        """Top (doc_id, score) pairs of a score() result and the number of documents above the threshold"""
+        scores, changed = scored
+        top, matched = self.encoded.select_top(scores, top_n, threshold)
+        changed = [match for match in changed if match[1] > threshold]
+        if changed:
+            top = select_top_matches(top + changed, top_n)
+        return top, matched + len(changed)
+
+    def top_matches(self, categorized_tokens: Dict[str, List[str]], top_n: int,
+                    threshold: float = 0.1) -> List[Tuple[str, float]]:
+        if top_n <= 0 or not len(self):
+            return []
+        return self.select_top(self.score(categorized_tokens), top_n, threshold)[0]
+
+
+class VectorEngine:
+    """Batch scorer over EncodedCollections kept current from the corpus change events.
+
+    A collection is encoded on first use. Documents changed after that are
+    logged and scored on top of the encoding through a CollectionView; once
+    reencode_after of them pile up, the collection is re-encoded on a
+    background thread while requests keep using the previous encoding, so no
+    request waits for a full re-encode. The engine must subscribe to the store
+    after the index does, so a logged change is already in the index.
+    """
+
+    def __init__(self, store: CorpusStore, index: CorpusIndex, reencode_after: int = REENCODE_AFTER_CHANGES):
+        self.index = index
+        self.reencode_after = reencode_after
+        # Guards the encodings, the change logs and the set of collections being encoded
+        self._lock = threading.Lock()
+        # Serializes encodes a request has to wait for
+        self._build_lock = threading.Lock()
+        # collection -> (encoding, position in the collection's change log it includes)
+        self._encoded: Dict[str, Tuple[EncodedCollection, int]] = {}
+        # collection -> ids of changed documents, oldest first, and the log position of the first of them
+        self._changes: Dict[str, List[str]] = {name: [] for name in COLLECTION_ITEM_TYPES}
+        self._changes_start: Dict[str, int] = {name: 0 for name in COLLECTION_ITEM_TYPES}
+        self._encoding: Set[str] = set()
+        # Bumped by invalidate() so encodes started before it are discarded
+        self._generation = 0
+        store.subscribe(self.on_change)
+
+    def on_change(self, collection: str, change_type: str, doc_id: str,
+                  data: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            # Until a collection is first encoded, the encoding will read its changes from the index
+            if collection in self._encoded or collection in self._encoding:
+                self._changes[collection].append(doc_id)
+
+    def _start_encode_locked(self, collection: str) -> Tuple[int, int]:
+        self._encoding.add(collection)
+        return self._generation, self._changes_start[collection] + len(self._changes[collection])
+
+    def _encode(self, collection: str, generation: int, position: int) -> Optional[Tuple[EncodedCollection, int]]:
+        """Encode the index's records of a collection, which include every change logged before `position`"""
+        try:
+            version, records = self.index.indexes[collection].snapshot_records()
+            encoded = EncodedCollection(COLLECTION_ITEM_TYPES[collection], records, version)
+            with self._lock:
+                if generation != self._generation:
+                    return None
+                self._encoded[collection] = (encoded, position)
+                del self._changes[collection][:position - self._changes_start[collection]]
+                self._changes_start[collection] = position
+                return encoded, position
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._encoding.discard(collection)
+
+    def _encode_in_background(self, collection: str, generation: int, position: int) -> None:
+        try:
+            self._encode(collection, generation, position)
+        except Exception as e:  # The previous encoding and its change log keep serving
+            logger.exception(f"❌ Re-encoding {collection} failed: {e}")
+
+    def view(self, collection: str) -> CollectionView:
+        """Current encoding of a collection with the changes it does not include yet"""
+        with self._lock:
+            state = self._encoded.get(collection)
+        if state is None:
+            with self._build_lock:
+                with self._lock:
+                    state = self._encoded.get(collection)
+                    if state is None:
+                        generation, position = self._start_encode_locked(collection)
+                if state is None:
+                    state = self._encode(collection, generation, position)
+                    if state is None:  # Invalidated meanwhile; the next request encodes again
+                        return self.view(collection)
+
+        with self._lock:
+            # The encoding may have been replaced since it was read; the log only covers the current one
+            encoded, position = self._encoded.get(collection, state)
+            changes = self._changes[collection]
+            changed = list(dict.fromkeys(changes[max(position - self._changes_start[collection], 0):]))
+            if len(changed) >= self.reencode_after and collection not in self._encoding:
+                generation, next_position = self._start_encode_locked(collection)
+                threading.Thread(target=self._encode_in_background, args=(collection, generation, next_position),
+                                 name=f'encode-{collection}', daemon=True).start()
+        stale_rows = np.fromiter((encoded.rows[doc_id] for doc_id in changed if doc_id in encoded.rows), dtype=np.int64)
+        return CollectionView(encoded, stale_rows, self.index.indexes[collection].get_records(changed))
+
+    def invalidate(self) -> None:
+        """Drop every encoding, e.g. after the index was replaced by a snapshot without change events"""
+        with self._lock:
+            self._generation += 1
+            self._encoded = {}
+            self._encoding = set()
+            for collection, changes in self._changes.items():
+                self._changes_start[collection] += len(changes)
+                changes.clear()
+
+    def top_matches(self, collection: str, categorized_tokens: Dict[str, List[str]],
+                    top_n: int) -> List[Tuple[str, float]]:
+        return self.view(collection).top_matches(categorized_tokens, top_n)
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASE_STARTING = 'starting'
+PHASE_RESTORING = 'restoring'
+PHASE_FOLLOWING = 'following'
+PHASE_CONNECTING = 'connecting'
+PHASE_LOADING = 'loading'
+PHASE_READY = 'ready'
+PHASE_FAILED = 'failed'
+
+
+class Readiness:
+    """Progress of the background warm-up and how long the worker took to get warm"""
+
+    def __init__(self, started: float):
+        # time.perf_counter() when the process started importing the app
+        self.started = started
+        self.phase = PHASE_STARTING
+        self.attempts: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.phase_seconds: Dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+        self.first_request_seconds: Optional[float] = None
+        self.ready_at: Optional[datetime] = None
+        self._phase_started = started
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == PHASE_READY
+
+    @property
+    def warming(self) -> bool:
+        """Still starting up; requests should be told to retry rather than fail"""
+        return self.phase not in (PHASE_READY, PHASE_FAILED)
+
+    def enter(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phase_seconds[self.phase] = self.phase_seconds.get(self.phase, 0.0) + now - self._phase_started
+        self.phase = phase
+        self._phase_started = now
+        if phase == PHASE_READY:
+            self.error = None
+            self.ready_seconds = now - self.started
+            self.ready_at = datetime.now()
+
+    def fail(self, error: Exception) -> None:
+        self.error = str(error) or type(error).__name__
+        self.enter(PHASE_FAILED)
+
+    def served_request(self) -> None:
+        """Record the first request answered since the process started"""
+        if self.first_request_seconds is None:
+            self.first_request_seconds = time.perf_counter() - self.started
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "attempts": dict(self.attempts),
+            "error": self.error,
+            "phase_seconds": dict(self.phase_seconds),
+            "ready_seconds": self.ready_seconds,
+            "first_request_seconds": self.first_request_seconds,
+            "ready_at": self.ready_at.isoformat() if self.ready_at else None
+        }
+
+
+async def retry_with_backoff(name: str, func: Callable[[], Awaitable[Any]], readiness: Readiness,
+                             attempts: int = 5, base_delay: float = 1.0, max_delay: float = 30.0) -> Any:
+    """Await func until it succeeds, sleeping an exponentially growing, jittered
+    delay between failures; attempts <= 0 retries forever. The last error is raised."""
+    attempt = 0
+    while True:
+        attempt += 1
+        readiness.attempts[name] = attempt
+        try:
+            return await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            readiness.error = str(e) or type(e).__name__
+            if 0 < attempts <= attempt:
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+            delay *= 0.5 + random.random() / 2  # Jitter so restarted workers don't retry in lockstep
+            logger.warning(f"⚠️ {name} failed (attempt {attempt}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -53,7 +53,7 @@ const Navbar = () => {
           {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ query: value, top_n: 5 })
+            body: JSON.stringify({ query: value, top_n: 5, compact: true })
           }
         );
         const data = await res.json();
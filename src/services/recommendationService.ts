@@ -8,6 +8,8 @@ export interface RecommendationResponse {
 export interface SearchInput {
   query: string;
   top_n?: number;
+  compact?: boolean;
+  hydrate?: boolean;
 }
 
 const RECOMMENDATION_API_BASE_URL = import.meta.env.VITE_RECOMMENDATION_API_URL || 'http://localhost:8000';